@@ -0,0 +1 @@
+"""Throughput benchmarks against a local fake Buildium API (see ``benchmarks.run``)."""
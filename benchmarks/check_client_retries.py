@@ -0,0 +1,75 @@
+"""Check which failed requests ``BuildiumClient`` sends again.
+
+Usage: ``python -m benchmarks.check_client_retries``
+
+Starts a local server whose endpoints answer with a scripted sequence of
+statuses (or stall past the client timeout) and counts how often each one
+is hit. Requires that a POST is resent after a 429 but never after a 5xx,
+a timeout or a connection error, while GETs and PUTs still retry 5xx and
+timeouts. Prints a JSON line per case and exits non-zero if any fails.
+"""
+
+import asyncio
+import json
+import sys
+
+import aiohttp
+from aiohttp import web
+
+import rate_limiter
+from buildium_client import BuildiumClient
+
+PORT = 8797
+STALL = "stall"
+SHORT_TIMEOUT = aiohttp.ClientTimeout(total=0.3)
+
+# name: (method, scripted answers, request kwargs, expected hits, expected final status)
+CASES = {
+    "post_502": ("POST", [502, 201], {}, 1, 502),
+    "post_429": ("POST", [429, 201], {}, 2, 201),
+    "post_timeout": ("POST", [STALL, 201], {"timeout": SHORT_TIMEOUT}, 1, None),
+    "post_idempotent_502": ("POST", [502, 201], {"idempotent": True}, 2, 201),
+    "get_502": ("GET", [502, 200], {"cache": False}, 2, 200),
+    "get_timeout": ("GET", [STALL, 200], {"cache": False, "timeout": SHORT_TIMEOUT}, 2, 200),
+    "put_503": ("PUT", [503, 200], {}, 2, 200),
+}
+
+
+def make_app(hits: dict) -> web.Application:
+    async def handler(request):
+        name = request.match_info["name"]
+        script = CASES[name][1]
+        answer = script[min(hits[name], len(script) - 1)]
+        hits[name] += 1
+        if answer == STALL:
+            await asyncio.sleep(1)
+            answer = 504
+        return web.json_response({}, status=answer, headers={"Retry-After": "0"})
+
+    app = web.Application()
+    app.router.add_route("*", "/v1/{name}", handler)
+    return app
+
+
+async def main() -> int:
+    rate_limiter.set_account("check")
+    hits = {name: 0 for name in CASES}
+    runner = web.AppRunner(make_app(hits))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    failed = False
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = BuildiumClient(session, {}, base_url=f"http://127.0.0.1:{PORT}/v1", max_attempts=3)
+            for name, (method, _, kwargs, want_hits, want_status) in CASES.items():
+                resp = await client.request(method, name, json={} if method != "GET" else None, **kwargs)
+                ok = hits[name] == want_hits and resp.status == want_status
+                failed |= not ok
+                print(json.dumps({"case": name, "ok": ok, "hits": hits[name], "status": resp.status}))
+    finally:
+        await runner.cleanup()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
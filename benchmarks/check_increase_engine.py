@@ -0,0 +1,129 @@
+"""Differential check of the NumPy increase engine against ``processcharges``.
+
+Usage: ``python -m benchmarks.check_increase_engine [--leases 20000] [--seed 7]``
+
+Generates leases with the charge shapes seen in production and a few that
+are not (no charges, several rent charges, integer amounts, amounts near a
+half cent), runs ``calculate_increase.generate_increases`` with both
+engines and requires the JSON of the two summaries to be identical. It
+also checks the array :mod:`money` kernel against the scalar one. Prints
+a JSON line with the timings and exits non-zero on the first mismatch.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+import calculate_increase
+import increase_engine
+import money
+
+GUIDELINE = 2.5
+
+
+def _amount(rng: random.Random):
+    kind = rng.random()
+    if kind < 0.15:
+        return rng.randint(50, 3000)                      # whole dollars, as int
+    if kind < 0.25:
+        return rng.randint(100, 300000) / 100 + 0.005     # near a half cent
+    return round(rng.uniform(20, 3500), 2)
+
+
+def _charges(rng: random.Random, lease_id: int) -> list:
+    shape = rng.random()
+    if shape < 0.02:
+        return []
+    charges = [{"Id": lease_id * 10, "Amount": _amount(rng), "Gl": 3, "Memo": "Rent", "RentId": lease_id}]
+    for k in range(rng.choice([0, 0, 1, 1, 2, 3])):
+        charges.append({
+            "Id": lease_id * 10 + k + 1,
+            "Amount": _amount(rng),
+            "Gl": rng.choice([7, 144073, 144077]),
+            "Memo": "Parking",
+            "RentId": rng.choice([None, lease_id]),
+        })
+    if shape > 0.97:
+        charges.append({"Id": lease_id * 10 + 9, "Amount": _amount(rng), "Gl": 3, "Memo": "Rent 2", "RentId": None})
+    rng.shuffle(charges)
+    return charges
+
+
+def generate_leases(n: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    buildings = {}
+    for lease_id in range(1, n + 1):
+        agi = rng.random() < 0.3
+        total = round(GUIDELINE + rng.choice([0, 1.5, 3.0, 4.25]), 2)
+        lease = {
+            "leaseid": lease_id,
+            "unitnumber": str(lease_id),
+            "address": f"{lease_id} Main St",
+            "tenantname": f"Tenant {lease_id}",
+            "alltenantnames": f"Tenant {lease_id}",
+            "tenantids": [lease_id],
+            "buildingname": f"Building {lease_id % 97}",
+            "recurringinfo": _charges(rng, lease_id),
+            "total_increase_percentage": total if agi else GUIDELINE,
+            "calculationpercentage": total if agi else GUIDELINE,
+            "agi": [{"approved": True}] if agi else None,
+            "agiinfo": [{"date_of_first_increase": date(rng.choice([2023, 2025, 2026]), 1, 1)}],
+            "marketrent": rng.choice([0, 1800, 2500, 4000]),
+            "eligible": rng.random() > 0.1,
+            "agitype": "AGI" if agi else None,
+            "reason": "",
+        }
+        buildings.setdefault(lease_id % 97, []).append(lease)
+    return buildings
+
+
+def check_money(n: int, seed: int) -> int:
+    """The array kernel must agree with the scalar one."""
+    rng = random.Random(seed)
+    amounts = [_amount(rng) for _ in range(n)]
+    percentages = [rng.choice([2.5, 2.75, 4.25, 5.5, -0.25, 1.75]) for _ in range(n)]
+    got = money.increase_array(
+        money.cents_array(amounts), np.array([money.rate_units(p) for p in percentages])
+    ).tolist()
+    want = [money.increase(money.to_cents(a), p) for a, p in zip(amounts, percentages)]
+    mismatches = sum(g != w for g, w in zip(got, want))
+    if mismatches:
+        i = next(i for i, (g, w) in enumerate(zip(got, want)) if g != w)
+        print(f"money mismatch: {amounts[i]!r} @ {percentages[i]}% -> {got[i]}, scalar gives {want[i]}", file=sys.stderr)
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leases", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if check_money(200000, args.seed):
+        return 1
+
+    buildings = generate_leases(args.leases, args.seed)
+    increasedate = date(2027, 2, 1)
+    timings = {}
+    outputs = {}
+    for name, batch in (
+        ("python", calculate_increase.processcharges_batch),
+        ("numpy", increase_engine.processcharges_batch),
+    ):
+        started = time.perf_counter()
+        summary = calculate_increase.generate_increases(buildings, increasedate, GUIDELINE, batch=batch)
+        timings[name] = round(time.perf_counter() - started, 3)
+        outputs[name] = json.dumps(summary, default=str, sort_keys=True)
+
+    identical = outputs["python"] == outputs["numpy"]
+    print(json.dumps({"leases": args.leases, "identical": identical, "seconds": timings}))
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
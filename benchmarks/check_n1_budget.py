@@ -0,0 +1,90 @@
+"""Check that N1 processing finishes under a tiny rendered-bytes budget.
+
+Usage: ``python -m benchmarks.check_n1_budget [--leases 800] [--budget-kb 256]``
+
+Runs the ``process`` scenario against an in-process fake Buildium API twice
+with the same increase file: once with the default ``N1_MEMORY_BUDGET`` and
+once with a budget of a few notices. Buildings are large so that many
+notices of several buildings are in flight together. Requires that the
+tiny-budget run finishes within ``--timeout`` seconds, uploads as many N1s
+as the default run, and leaves every budget with nothing held. Prints a
+JSON line and exits non-zero on failure.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import aiohttp
+
+from benchmarks.fake_buildium import FakeBuildium
+from benchmarks.portfolio import generate
+
+LEASE_UPLOADS = "POST /v1/files/uploadrequests"
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leases", type=int, default=800)
+    parser.add_argument("--building-size", type=int, default=200)
+    parser.add_argument("--budget-kb", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args(argv)
+
+    server = FakeBuildium(generate(args.leases, mean_building_size=args.building_size), latency=0.005)
+    runner = await server.start()
+    os.environ.update({
+        "BUILDIUM_API_BASE": f"{server.base_url}/v1",
+        "BENCH_BASE": server.base_url,
+        "BUILDIUM_REQS_PER_SEC": "500",
+        "BUILDIUM_GLOBAL_REQS_PER_SEC": "500",
+        "BUILDIUM_MAX_CONCURRENT_REQUESTS": "50",
+        "BUILDIUM_GLOBAL_MAX_CONCURRENT_REQUESTS": "50",
+    })
+    # Read the environment at import time
+    import processincreaseinfo
+    import rate_limiter
+    import workers
+    from benchmarks import scenarios
+
+    budgets = []
+
+    class RecordingBudget(processincreaseinfo.N1Budget):
+        def __init__(self, limit):
+            super().__init__(limit)
+            budgets.append(self)
+
+    processincreaseinfo.N1Budget = RecordingBudget
+    rate_limiter.set_account(scenarios.ACCOUNT)
+    result = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            run = await scenarios.prepare_process(session)
+            for name, limit in (("default", processincreaseinfo.N1_MEMORY_BUDGET), ("tiny", args.budget_kb * 1024)):
+                processincreaseinfo.N1_MEMORY_BUDGET = limit
+                await scenarios._control(session, "POST", "reset")
+                try:
+                    await asyncio.wait_for(run(), args.timeout)
+                except asyncio.TimeoutError:
+                    result[name] = "timed out"
+                    break
+                stats = await scenarios._control(session, "GET", "stats")
+                result[name] = stats["by_route"].get(LEASE_UPLOADS, 0)
+    finally:
+        await runner.cleanup()
+        workers.shutdown(wait=True)
+
+    result["held_after"] = [budget.used for budget in budgets]
+    ok = (
+        isinstance(result.get("tiny"), int)
+        and result["tiny"] == result["default"] > 0
+        and not any(result["held_after"])
+    )
+    print(json.dumps({"ok": ok, "lease_uploads": result}))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,84 @@
+"""Check that the AIMD token bucket survives 429 bursts and recovers in time.
+
+Usage: ``python -m benchmarks.check_rate_limiter``
+
+Simulates, on a fake clock, a client issuing requests at the bucket's rate
+with a fixed round-trip latency against a server that answers 429 to every
+request sent during a burst, and 2xx otherwise. Requires that
+
+* a burst shorter than one round trip costs exactly one cut, however many
+  of the in-flight requests come back 429;
+* after either burst, including a long one that pushes the rate to its
+  floor, the rate is back at its maximum within ``--max-recovery`` seconds
+  of the burst ending.
+
+Prints a JSON line per case and exits non-zero if either fails.
+"""
+
+import argparse
+import json
+import sys
+
+from rate_limiter import AdaptiveTokenBucket
+
+TICK = 0.005
+
+
+def simulate(max_rate: float, latency: float, burst: tuple, horizon: float) -> dict:
+    """Run the client for *horizon* seconds; requests sent during *burst* get 429."""
+    now = [0.0]
+    bucket = AdaptiveTokenBucket(max_rate, min_rate=1.0, max_rate=max_rate, clock=lambda: now[0])
+    in_flight = []  # (completes_at, issued_at)
+    next_issue = 0.0
+    cuts = 0
+    lowest = max_rate
+    recovered_at = None
+    while now[0] < horizon:
+        while next_issue <= now[0]:
+            in_flight.append((next_issue + latency, next_issue))
+            next_issue += 1.0 / bucket.rate
+        done = [r for r in in_flight if r[0] <= now[0]]
+        in_flight = [r for r in in_flight if r[0] > now[0]]
+        for _, issued_at in done:
+            if burst[0] <= issued_at < burst[1]:
+                before = bucket.rate
+                bucket.on_throttled(issued_at)
+                if bucket.rate < before:
+                    cuts += 1
+                    recovered_at = None
+            else:
+                bucket.on_success()
+        lowest = min(lowest, bucket.rate)
+        if recovered_at is None and cuts and bucket.rate >= max_rate:
+            recovered_at = now[0]
+        now[0] += TICK
+    return {
+        "max_rate": max_rate,
+        "cuts": cuts,
+        "lowest_rate": round(lowest, 2),
+        "recovery_s": None if recovered_at is None else round(recovered_at - burst[1], 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--max-recovery", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for max_rate in (9.0, 100.0):
+        # Every request of one round trip is rejected: one cut only
+        short = simulate(max_rate, args.latency, (1.0, 1.0 + args.latency * 0.9), 2.0 + args.max_recovery)
+        # Rejections for several seconds push the rate to the floor
+        long = simulate(max_rate, args.latency, (1.0, 6.0), 6.0 + args.max_recovery + 5.0)
+        ok = short["cuts"] == 1 and all(
+            case["recovery_s"] is not None and case["recovery_s"] <= args.max_recovery for case in (short, long)
+        )
+        failed |= not ok
+        print(json.dumps({"ok": ok, "short_burst": short, "long_burst": long}))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
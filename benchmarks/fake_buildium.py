@@ -0,0 +1,330 @@
+"""In-process fake of the Buildium endpoints the service calls.
+
+Serves a :class:`~benchmarks.portfolio.Portfolio` over aiohttp with
+configurable latency, optional 429 injection (random and/or a requests per
+second ceiling with ``Retry-After``), ETag revalidation, presigned uploads to
+a fake S3 bucket and task history with attachments. Counters are exposed at
+``/_bench/stats`` and reset with ``POST /_bench/reset`` so a scenario can
+measure only its timed section.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+from typing import Optional
+
+from aiohttp import web
+
+from benchmarks.portfolio import Portfolio
+
+
+class FakeBuildium:
+    def __init__(
+        self,
+        portfolio: Portfolio,
+        *,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        throttle_rate: float = 0.0,
+        max_rps: Optional[float] = None,
+        seed: int = 11,
+    ) -> None:
+        self.portfolio = portfolio
+        self.leases_by_id = portfolio.lease_by_id
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.base_url = ""
+        self._rng = random.Random(seed)
+        self._recent = deque()
+        self._ids = itertools.count(700000)
+        self.tasks = {}        # task id -> list of history entries (newest last)
+        self.blobs = {}        # blob key -> bytes
+        self.file_categories = []
+        self.task_categories = []
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.throttled = 0
+        self.not_modified = 0
+        self.uploaded_bytes = 0
+        self.by_route = Counter()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "not_modified": self.not_modified,
+            "uploaded_bytes": self.uploaded_bytes,
+            "by_route": dict(self.by_route),
+        }
+
+    # ------------------------------------------------------------------
+    # middleware: latency, counters, 429 injection
+    # ------------------------------------------------------------------
+    def _over_limit(self) -> bool:
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.max_rps:
+            return True
+        self._recent.append(now)
+        return False
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path.startswith("/_bench"):
+            return await handler(request)
+        self.requests += 1
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.by_route[f"{request.method} {route}"] += 1
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if request.path.startswith("/v1") and (
+            self._over_limit() or (self.throttle_rate and self._rng.random() < self.throttle_rate)
+        ):
+            self.throttled += 1
+            return web.json_response({"Message": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+        return await handler(request)
+
+    def _json(self, request, body, status: int = 200, headers: Optional[dict] = None):
+        text = json.dumps(body)
+        headers = dict(headers or {})
+        if request.method == "GET" and status == 200:
+            etag = '"' + hashlib.sha1(text.encode()).hexdigest() + '"'
+            headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                self.not_modified += 1
+                return web.Response(status=304, headers=headers)
+        return web.Response(text=text, status=status, content_type="application/json", headers=headers)
+
+    # ------------------------------------------------------------------
+    # leases
+    # ------------------------------------------------------------------
+    async def leases(self, request):
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 1000))
+        rows = self.portfolio.leases
+        return self._json(request, rows[offset:offset + limit], headers={"X-Total-Count": str(len(rows))})
+
+    async def lease(self, request):
+        lease = self.leases_by_id.get(int(request.match_info["id"]))
+        if lease is None:
+            return web.json_response({"Message": "Not found"}, status=404)
+        if request.method == "PUT":
+            return self._json(request, {**lease, **(await request.json())})
+        return self._json(request, lease)
+
+    async def lease_notes(self, request):
+        return self._json(request, self.portfolio.lease_notes.get(int(request.match_info["id"]), []))
+
+    async def recurring(self, request):
+        return self._json(request, self.portfolio.recurring.get(int(request.match_info["id"]), []))
+
+    async def transactions(self, request):
+        rows = self.portfolio.transactions.get(int(request.match_info["id"]), [])
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 1000))
+        return self._json(request, rows[offset:offset + limit], headers={"X-Total-Count": str(len(rows))})
+
+    async def renewal(self, request):
+        await request.read()
+        return self._json(request, {"Id": next(self._ids)}, status=201)
+
+    # ------------------------------------------------------------------
+    # rentals
+    # ------------------------------------------------------------------
+    async def rental(self, request):
+        rental = self.portfolio.rentals.get(int(request.match_info["id"]))
+        if rental is None:
+            return web.json_response({"Message": "Not found"}, status=404)
+        return self._json(request, rental)
+
+    async def rentals(self, request):
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 1000))
+        rows = list(self.portfolio.rentals.values())
+        if "propertyids" in request.query:
+            wanted = {int(i) for i in request.query.getall("propertyids")}
+            rows = [row for row in rows if row["Id"] in wanted]
+        return self._json(request, rows[offset:offset + limit], headers={"X-Total-Count": str(len(rows))})
+
+    async def rental_notes(self, request):
+        return self._json(request, self.portfolio.building_notes.get(int(request.match_info["id"]), []))
+
+    async def unit(self, request):
+        unit = self.portfolio.units.get(int(request.match_info["id"]))
+        if unit is None:
+            return web.json_response({"Message": "Not found"}, status=404)
+        return self._json(request, unit)
+
+    # ------------------------------------------------------------------
+    # categories and tasks
+    # ------------------------------------------------------------------
+    def _categories(self, store: list):
+        async def handler(request):
+            if request.method == "POST":
+                body = await request.json()
+                cat = {"Id": next(self._ids), "Name": body.get("Name")}
+                store.append(cat)
+                return self._json(request, cat, status=201)
+            return self._json(request, store)
+        return handler
+
+    def _new_history(self, task_id: int) -> dict:
+        entry = {"Id": next(self._ids), "Date": f"2025-01-01T00:{len(self.tasks[task_id]):05d}", "files": []}
+        self.tasks[task_id].append(entry)
+        return entry
+
+    async def create_task(self, request):
+        await request.json()
+        task_id = next(self._ids)
+        self.tasks[task_id] = []
+        self._new_history(task_id)
+        return self._json(request, {"Id": task_id}, status=201)
+
+    async def update_task(self, request):
+        task_id = int(request.match_info["id"])
+        await request.json()
+        self.tasks.setdefault(task_id, [])
+        self._new_history(task_id)
+        return self._json(request, {"Id": task_id})
+
+    async def task_history(self, request):
+        entries = self.tasks.get(int(request.match_info["id"]), [])
+        return self._json(request, [{"Id": h["Id"], "Date": h["Date"]} for h in entries])
+
+    def _history_entry(self, request):
+        task_id = int(request.match_info["id"])
+        hid = int(request.match_info["hid"])
+        for h in self.tasks.get(task_id, []):
+            if h["Id"] == hid:
+                return h
+        return None
+
+    async def history_files(self, request):
+        entry = self._history_entry(request)
+        if entry is None:
+            return web.json_response({"Message": "Not found"}, status=404)
+        return self._json(request, [{"Id": f["Id"], "FileName": f["FileName"]} for f in entry["files"]])
+
+    async def download_request(self, request):
+        entry = self._history_entry(request)
+        fid = int(request.match_info["fid"])
+        for f in (entry or {}).get("files", []):
+            if f["Id"] == fid:
+                return self._json(request, {"DownloadUrl": f"{self.base_url}/s3/download/{f['key']}"}, status=201)
+        return web.json_response({"Message": "Not found"}, status=404)
+
+    def _presign(self, key: str) -> dict:
+        return {
+            "BucketUrl": f"{self.base_url}/s3/upload",
+            "FormData": {"Key": key, "ACL": "private", "Policy": "bench", "X-Amz-Signature": "bench"},
+        }
+
+    async def task_upload_request(self, request):
+        entry = self._history_entry(request)
+        if entry is None:
+            return web.json_response({"Message": "Not found"}, status=404)
+        body = await request.json()
+        key = f"task/{request.match_info['id']}/{entry['Id']}/{next(self._ids)}/{body.get('FileName')}"
+        return self._json(request, self._presign(key), status=201)
+
+    async def file_upload_request(self, request):
+        body = await request.json()
+        key = f"lease/{body.get('EntityId')}/{next(self._ids)}/{body.get('FileName')}"
+        return self._json(request, self._presign(key), status=201)
+
+    # ------------------------------------------------------------------
+    # fake S3
+    # ------------------------------------------------------------------
+    async def s3_upload(self, request):
+        form = await request.post()
+        key = form.get("Key")
+        upload = form.get("file")
+        data = upload.file.read() if hasattr(upload, "file") else bytes(upload or b"")
+        self.uploaded_bytes += len(data)
+        if key and key.startswith("task/"):
+            _, task_id, hid, _, name = key.split("/", 4)
+            for h in self.tasks.get(int(task_id), []):
+                if h["Id"] == int(hid):
+                    h["files"].append({"Id": next(self._ids), "FileName": name, "key": key})
+            self.blobs[key] = data
+        return web.Response(status=204)
+
+    async def s3_download(self, request):
+        data = self.blobs.get(request.match_info["key"])
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data, content_type="application/octet-stream")
+
+    # ------------------------------------------------------------------
+    # benchmark control
+    # ------------------------------------------------------------------
+    async def bench_stats(self, request):
+        return web.json_response(self.stats())
+
+    async def bench_reset(self, request):
+        self.reset()
+        return web.json_response({})
+
+    async def bench_attach(self, request):
+        """Create a task whose history holds ``?filler=N`` entries plus one file."""
+        task_id = int(request.match_info["id"])
+        name = request.query.get("name", "data.json")
+        filler = int(request.query.get("filler", 0))
+        data = await request.read()
+        self.tasks[task_id] = []
+        attached = self._new_history(task_id)
+        key = f"task/{task_id}/{attached['Id']}/{next(self._ids)}/{name}"
+        attached["files"].append({"Id": next(self._ids), "FileName": name, "key": key})
+        self.blobs[key] = data
+        for _ in range(filler):
+            self._new_history(task_id)
+        return web.json_response({"Id": task_id})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware], client_max_size=256 * 1024 ** 2)
+        r = app.router
+        r.add_get("/v1/leases", self.leases)
+        r.add_route("*", "/v1/leases/{id:\\d+}", self.lease)
+        r.add_get("/v1/leases/{id}/notes", self.lease_notes)
+        r.add_get("/v1/leases/{id}/recurringtransactions", self.recurring)
+        r.add_get("/v1/leases/{id}/transactions", self.transactions)
+        r.add_post("/v1/leases/{id}/renewals", self.renewal)
+        r.add_get("/v1/rentals", self.rentals)
+        r.add_get("/v1/rentals/units/{id}", self.unit)
+        r.add_get("/v1/rentals/{id:\\d+}", self.rental)
+        r.add_get("/v1/rentals/{id}/notes", self.rental_notes)
+        r.add_route("*", "/v1/files/categories", self._categories(self.file_categories))
+        r.add_post("/v1/files/uploadrequests", self.file_upload_request)
+        r.add_route("*", "/v1/tasks/categories", self._categories(self.task_categories))
+        r.add_post("/v1/tasks/todorequests", self.create_task)
+        r.add_put("/v1/tasks/todorequests/{id}", self.update_task)
+        r.add_get("/v1/tasks/{id}/history", self.task_history)
+        r.add_get("/v1/tasks/{id}/history/{hid}/files", self.history_files)
+        r.add_post("/v1/tasks/{id}/history/{hid}/files/uploadrequests", self.task_upload_request)
+        r.add_post("/v1/tasks/{id}/history/{hid}/files/{fid}/downloadrequest", self.download_request)
+        r.add_post("/s3/upload", self.s3_upload)
+        r.add_get("/s3/download/{key:.+}", self.s3_download)
+        r.add_get("/_bench/stats", self.bench_stats)
+        r.add_post("/_bench/reset", self.bench_reset)
+        r.add_post("/_bench/tasks/{id}/attach", self.bench_attach)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Start serving; ``base_url`` is set to the bound address."""
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound = runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound}"
+        return runner
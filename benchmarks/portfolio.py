@@ -0,0 +1,121 @@
+"""Deterministic synthetic Buildium portfolios for the benchmarks.
+
+Building sizes are skewed the way real portfolios are: most buildings have a
+few dozen units and a handful are much larger. A third of the buildings carry
+an AGI note, some leases are ignored or moving out, and part of them hold a
+last month's rent deposit so the LMR scenario has balances to sum.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+LMR_GL_ACCOUNT_ID = 191645
+
+
+@dataclass
+class Portfolio:
+    leases: list
+    rentals: dict                       # property id -> rental record
+    building_notes: dict                # property id -> notes list
+    units: dict                         # unit id -> unit record
+    lease_notes: dict = field(default_factory=dict)
+    recurring: dict = field(default_factory=dict)
+    transactions: dict = field(default_factory=dict)
+
+    @property
+    def lease_by_id(self) -> dict:
+        return {lease["Id"]: lease for lease in self.leases}
+
+
+def _building_sizes(rng: random.Random, n_leases: int, mean: int) -> list:
+    sizes = []
+    remaining = n_leases
+    while remaining > 0:
+        size = max(1, min(remaining, int(rng.paretovariate(1.6) * mean / 2.6)))
+        sizes.append(size)
+        remaining -= size
+    return sizes
+
+
+def generate(n_leases: int, *, mean_building_size: int = 50, seed: int = 7) -> Portfolio:
+    """Return a portfolio with *n_leases* active leases."""
+    rng = random.Random(seed)
+    today = date.today()
+    leases, rentals, building_notes, units = [], {}, {}, {}
+    lease_notes, recurring, transactions = {}, {}, {}
+
+    lease_id = 1
+    for b, size in enumerate(_building_sizes(rng, n_leases, mean_building_size)):
+        property_id = 1000 + b
+        rentals[property_id] = {
+            "Id": property_id,
+            "Name": f"Building {property_id}",
+            "RentalManager": {"Id": 500 + b % 7},
+        }
+        has_agi = b % 3 == 0
+        building_notes[property_id] = [{
+            "Note": (
+                "AGI: Approved\nDate of First Increase: 01/01/2024\n"
+                "First Year Increase: 3%\nSecond Year Increase: 2%\nThird Year Increase: 1.5%"
+            )
+        }] if has_agi else []
+
+        for _ in range(size):
+            unit_id = 50000 + lease_id
+            rent = rng.randrange(900, 2600)
+            ends = today - timedelta(days=rng.randrange(1, 300))
+            leases.append({
+                "Id": lease_id,
+                "PropertyId": property_id,
+                "UnitId": unit_id,
+                "UnitNumber": str(100 + lease_id % 900),
+                "LeaseType": "FixedWithRollover",
+                "LeaseFromDate": (ends - timedelta(days=365)).isoformat(),
+                "LeaseToDate": ends.isoformat(),
+                "IsEvictionPending": False,
+                "AccountDetails": {"Rent": rent, "SecurityDeposit": rent},
+                "MoveOutData": [{"MoveOutDate": today.isoformat()}] if lease_id % 41 == 0 else [],
+                "Tenants": [{"Id": 90000 + lease_id}],
+                "CurrentTenants": [{
+                    "Id": 90000 + lease_id,
+                    "FirstName": f"Tenant{lease_id}",
+                    "LastName": "Example",
+                    "Address": {
+                        "AddressLine1": f"{lease_id} Main Street",
+                        "City": "Toronto",
+                        "State": "ON",
+                        "PostalCode": "M5V 2T6",
+                    },
+                }],
+            })
+            units[unit_id] = {
+                "Id": unit_id,
+                "PropertyId": property_id,
+                "BuildingName": f"Building {property_id}",
+                "UnitNumber": str(100 + lease_id % 900),
+                "MarketRent": rent + rng.randrange(0, 800),
+            }
+            if has_agi:
+                lease_notes[lease_id] = [{"Note": "AGI 2024"}] if lease_id % 2 else []
+            recurring[lease_id] = [
+                {"Id": lease_id * 10, "TransactionType": "Charge", "Frequency": "Monthly",
+                 "Duration": "UntilEndOfTerm", "Amount": rent, "Lines": [{"GLAccountId": 3}],
+                 "PostDaysInAdvance": 5, "Memo": "Rent", "RentId": 1},
+                {"Id": lease_id * 10 + 1, "TransactionType": "Charge", "Frequency": "Monthly",
+                 "Duration": "UntilEndOfTerm", "Amount": 55.5, "Lines": [{"GLAccountId": 7}],
+                 "PostDaysInAdvance": 5, "Memo": "Parking", "RentId": None},
+            ]
+            if lease_id % 4 == 0:
+                transactions[lease_id] = [
+                    {"TransactionType": "Payment",
+                     "Journal": {"Memo": "LMR", "Lines": [
+                         {"GLAccount": {"Id": LMR_GL_ACCOUNT_ID}, "Amount": -rent}]}},
+                ] + [
+                    {"TransactionType": "Charge",
+                     "Journal": {"Memo": "Rent", "Lines": [{"GLAccount": {"Id": 3}, "Amount": rent}]}}
+                    for _ in range(rng.randrange(6, 24))
+                ]
+            lease_id += 1
+
+    return Portfolio(leases, rentals, building_notes, units, lease_notes, recurring, transactions)
@@ -0,0 +1,110 @@
+"""Run the benchmark scenarios against a local fake Buildium API.
+
+Example::
+
+    python -m benchmarks.run --scenario gather --leases 1000,10000,50000
+    python -m benchmarks.run --scenario all --leases 1000 --throttle-rate 0.02 --json results.json
+
+Each scenario/size pair gets a freshly generated portfolio and fake server in
+this process, and runs in its own child process so wall time and peak RSS are
+not skewed by earlier runs. The client's rate limits default to values high
+enough to measure the code rather than the limiter; pass ``--rps 9
+--concurrency 9`` to reproduce production limits, and ``--max-rps`` to make
+the fake server enforce a ceiling with 429s.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from benchmarks.fake_buildium import FakeBuildium
+from benchmarks.portfolio import generate
+
+# Kept in sync with benchmarks.scenarios.SCENARIOS; not imported so the
+# server process does not load the application modules.
+SCENARIOS = ("gather", "process", "lmr")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+COLUMNS = ("scenario", "leases", "wall_s", "requests", "req_per_s", "server_429", "client_429", "peak_rss_mb", "worker_rss_mb")
+
+
+async def run_one(scenario: str, leases: int, args) -> dict:
+    server = FakeBuildium(
+        generate(leases, seed=args.seed),
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        max_rps=args.max_rps,
+    )
+    runner = await server.start()
+    env = {
+        **os.environ,
+        "BUILDIUM_API_BASE": f"{server.base_url}/v1",
+        "BENCH_BASE": server.base_url,
+        "BUILDIUM_REQS_PER_SEC": str(args.rps),
+        "BUILDIUM_GLOBAL_REQS_PER_SEC": str(args.rps),
+        "BUILDIUM_MAX_CONCURRENT_REQUESTS": str(args.concurrency),
+        "BUILDIUM_GLOBAL_MAX_CONCURRENT_REQUESTS": str(args.concurrency),
+    }
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks.scenarios", scenario,
+            cwd=REPO_ROOT, env=env, stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return {"scenario": scenario, "leases": leases, "error": f"timed out after {args.timeout}s"}
+    finally:
+        await runner.cleanup()
+
+    lines = stdout.decode().strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"scenario": scenario, "leases": leases, "error": f"exit code {proc.returncode}"}
+    return {"leases": leases, **json.loads(lines[-1])}
+
+
+def _print_row(row: dict) -> None:
+    if "error" in row:
+        print(f"{row['scenario']:<8} {row['leases']:>7}  ERROR: {row['error']}")
+        return
+    print("  ".join(f"{row.get(c, '')!s:>11}" for c in COLUMNS))
+
+
+async def main(argv=None) -> list:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", default="all", choices=["all", *SCENARIOS])
+    parser.add_argument("--leases", default="1000,10000,50000", help="comma-separated portfolio sizes")
+    parser.add_argument("--latency", type=float, default=0.02, help="base server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="extra random latency in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of API calls answered 429")
+    parser.add_argument("--max-rps", type=float, default=None, help="server-side requests/sec ceiling")
+    parser.add_argument("--rps", type=float, default=500, help="client token rate per account")
+    parser.add_argument("--concurrency", type=int, default=50, help="client concurrent requests")
+    parser.add_argument("--timeout", type=float, default=3600, help="per-run timeout in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="write all results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    sizes = [int(s) for s in args.leases.split(",") if s.strip()]
+
+    print("  ".join(f"{c:>11}" for c in COLUMNS))
+    results = []
+    for scenario in scenarios:
+        for leases in sizes:
+            row = await run_one(scenario, leases, args)
+            _print_row(row)
+            results.append(row)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
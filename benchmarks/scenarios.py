@@ -0,0 +1,116 @@
+"""Benchmark scenarios, run one per process by :mod:`benchmarks.run`.
+
+Usage: ``python -m benchmarks.scenarios <gather|process|lmr>`` with
+``BUILDIUM_API_BASE`` pointing at a running fake server. Prints a single
+JSON line with the wall time, request count, requests per second and 429
+counts of the timed section, the peak RSS of the process and the peak RSS
+of its largest worker process.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+import aiohttp
+from cryptography.fernet import Fernet
+
+import build_increase_json
+import calculate_increase
+import decodefile
+import get_eligible_leases
+import processincreaseinfo
+import rate_limiter
+import runlmrinterest
+import workers
+from session_manager import session_manager
+
+BENCH_BASE = os.getenv("BENCH_BASE", "http://127.0.0.1:8770")
+GUIDELINE = 2.5
+ACCOUNT = "bench"
+HEADERS = {
+    "x-buildium-client-id": ACCOUNT,
+    "x-buildium-client-secret": "bench",
+    "Content-Type": "application/json",
+}
+BENCH_TASK_ID = 1
+
+
+async def _control(session, method: str, path: str, **kwargs):
+    async with session.request(method, f"{BENCH_BASE}/_bench/{path}", **kwargs) as response:
+        return await response.json()
+
+
+async def prepare_gather(session):
+    async def run():
+        await get_eligible_leases.gather_leases_for_increase(session, HEADERS, GUIDELINE)
+    return run
+
+
+async def prepare_process(session):
+    """Build the approved increase file and attach it to a task, as the approval run does."""
+    leases_by_building, effective_date = await get_eligible_leases.gather_leases_for_increase(
+        session, HEADERS, GUIDELINE
+    )
+    summary, _, _ = calculate_increase.generate_increases(leases_by_building, effective_date, GUIDELINE)
+    key = Fernet.generate_key()
+    encrypted = build_increase_json.buildincreasejson(summary, effective_date, key)
+    await _control(session, "POST", f"tasks/{BENCH_TASK_ID}/attach", params={"name": "data.json"}, data=encrypted)
+
+    async def run():
+        increaseinfo = await decodefile.decode(session, HEADERS, {"Id": BENCH_TASK_ID}, key)
+        await processincreaseinfo.process(session, HEADERS, increaseinfo, ACCOUNT)
+    return run
+
+
+async def prepare_lmr(session):
+    task_data = {"Id": BENCH_TASK_ID, "Category": {"Id": 1}, "AssignedToUserId": 1}
+
+    async def run():
+        await runlmrinterest.lmrinterestprogram(task_data, HEADERS, GUIDELINE)
+    return run
+
+
+SCENARIOS = {
+    "gather": prepare_gather,
+    "process": prepare_process,
+    "lmr": prepare_lmr,
+}
+
+
+async def main(name: str) -> dict:
+    rate_limiter.set_account(ACCOUNT)
+    async with aiohttp.ClientSession() as session:
+        run = await SCENARIOS[name](session)
+        await _control(session, "POST", "reset")
+        started = time.perf_counter()
+        await run()
+        wall = time.perf_counter() - started
+        server = await _control(session, "GET", "stats")
+    await session_manager.close_all()
+    worker_rss_kb = await workers.peak_rss_kb()
+    workers.shutdown(wait=True)
+
+    client_429 = sum(a["throttled"] for a in rate_limiter.controller.snapshot().values())
+    return {
+        "scenario": name,
+        "wall_s": round(wall, 3),
+        "requests": server["requests"],
+        "req_per_s": round(server["requests"] / wall, 1) if wall else None,
+        "server_429": server["throttled"],
+        "client_429": client_429,
+        "not_modified": server["not_modified"],
+        "uploaded_mb": round(server["uploaded_bytes"] / 1024 ** 2, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "worker_rss_mb": round(worker_rss_kb / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+    logging.getLogger().setLevel(os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+    result = asyncio.run(main(sys.argv[1]))
+    print(json.dumps(result))
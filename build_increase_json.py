@@ -62,6 +62,10 @@ def buildincreasejson(increase_summary, increase_effective_date, client_secret):
         for lease in increases:
             if lease['reason'].startswith("Moving"):
                 continue
+            if lease.get('incomplete'):
+                # Nothing reliable to renew or notify; the report lists it for review
+                logging.warning(f"Skipping incomplete lease {lease['leaseid']} in building {building_id}")
+                continue
 
             try:
                 increasenotice = increaseportion(lease, increase_effective_date)
@@ -3,7 +3,12 @@ from collections import defaultdict
 from io import BytesIO
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
+import asyncio
+import hashlib
 import logging
+import os
+import time
+from xml.sax.saxutils import escape
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import LETTER, landscape
@@ -13,36 +18,80 @@ from reportlab.platypus import (
     Image, KeepInFrame
 )
 from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 
+import pdf_split
+
 try:
     from PIL import Image as PILImage  # optional; used to downscale/re-encode
 except Exception:
     PILImage = None
 
+# Prepared logos are kept per (source, box, dpi) for LOGO_CACHE_TTL seconds,
+# in memory and, when LOGO_CACHE_DIR is set, on disk across restarts.
+LOGO_CACHE_DIR = os.getenv("LOGO_CACHE_DIR")
+LOGO_CACHE_TTL = float(os.getenv("LOGO_CACHE_TTL", "86400"))
+
+_logo_cache: dict[tuple, tuple[float, tuple[bytes, float, float]]] = {}
+
 
 # ---------- Canvas with page numbers ----------
 class NumberedCanvas(canvas.Canvas):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._saved_page_states = []
+    """Canvas that stamps "Page X of Y" on every page as it is finished.
+
+    Y is a form referenced from each page and only defined in ``save()``, so
+    pages are written out immediately instead of being kept until the end.
+    """
+    TOTAL_FORM = "pageTotal"
 
     def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
+        self._draw_page_number()
+        super().showPage()
 
     def save(self):
-        total_pages = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self._draw_page_number(total_pages)
-            super().showPage()
+        if self._code:
+            self.showPage()
+        total_pages = self._pageNumber - 1
+        w, _h = self._pagesize
+        self.beginForm(self.TOTAL_FORM)
+        self.setFont("Helvetica", 8)
+        self.drawString(w - 36 - self._total_width(), 20, str(total_pages))
+        self.endForm()
         super().save()
 
-    def _draw_page_number(self, total_pages):
+    def _total_width(self):
+        # room reserved for Y, right-aligned to the margin like the old footer
+        return self.stringWidth("0000", "Helvetica", 8)
+
+    def _draw_page_number(self):
         self.setFont("Helvetica", 8)
         w, _h = self._pagesize
-        self.drawRightString(w - 36, 20, f"Page {self._pageNumber} of {total_pages}")
+        self.drawRightString(w - 36 - self._total_width(), 20, f"Page {self._pageNumber} of ")
+        self.doForm(self.TOTAL_FORM)
+
+
+class _StreamingStory(list):
+    """A story that pulls sections from an iterator as the document consumes it.
+
+    ``doc.build`` takes flowables off the front of the list; refilling only
+    when it runs empty keeps a single building's flowables alive at a time.
+    """
+
+    def __init__(self, sections, more):
+        super().__init__()
+        self._sections = iter(sections)
+        self._more = iter(more)
+
+    def __len__(self):
+        while not list.__len__(self):
+            section = next(self._sections, None)
+            if section is None:
+                section = next(self._more, None)
+            if section is None:
+                break
+            self.extend(section)
+        return list.__len__(self)
 
 
 # ---------- helpers ----------
@@ -89,20 +138,15 @@ def _fetch_logo_bytes(logo_source: str | None) -> bytes | None:
     except (HTTPError, URLError, OSError, ValueError):
         return None
 
-def _prepare_logo(logo_source: str | None,
-                  box_w_in: float = 1.6,
-                  box_h_in: float = 1.0,
-                  target_dpi: int = 150) -> tuple[bytes | None, float, float]:
-    logging.info("Preparing Logo")
+def _encode_logo(raw: bytes,
+                 box_w_in: float,
+                 box_h_in: float,
+                 target_dpi: int) -> tuple[bytes, float, float]:
     """
     Return (processed_image_bytes, draw_w_pt, draw_h_pt) where draw sizes
     fit within the given inch box and preserve aspect ratio.
     If Pillow is available, downscale/re-encode to reduce PDF size.
     """
-    raw = _fetch_logo_bytes(logo_source)
-    if not raw:
-        return None, 0.0, 0.0
-
     box_w_pt, box_h_pt = box_w_in * 72.0, box_h_in * 72.0
 
     if PILImage:
@@ -140,84 +184,148 @@ def _prepare_logo(logo_source: str | None,
     draw_h_pt = px_h * scale_pt
     return raw, draw_w_pt, draw_h_pt
 
+def _logo_disk_path(key: tuple) -> str | None:
+    if not LOGO_CACHE_DIR:
+        return None
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()
+    return os.path.join(LOGO_CACHE_DIR, f"logo-{digest}.bin")
+
+def _prepare_logo(logo_source: str | None,
+                  box_w_in: float = 1.6,
+                  box_h_in: float = 1.0,
+                  target_dpi: int = 150) -> tuple[bytes | None, float, float]:
+    """
+    Cached (processed_image_bytes, draw_w_pt, draw_h_pt) for a logo source.
+
+    The logo is fetched and re-encoded at most once per TTL per process; a
+    processed copy on disk (LOGO_CACHE_DIR) is reused without a fetch.
+    Failed fetches are not cached.
+    """
+    if not logo_source:
+        return None, 0.0, 0.0
+    key = (logo_source, box_w_in, box_h_in, target_dpi)
+    now = time.time()
+    entry = _logo_cache.get(key)
+    if entry and now - entry[0] < LOGO_CACHE_TTL:
+        return entry[1]
+
+    logging.info("Preparing Logo")
+    path = _logo_disk_path(key)
+    asset = None
+    try:
+        if path and now - os.path.getmtime(path) < LOGO_CACHE_TTL:
+            from reportlab.lib.utils import ImageReader
+            with open(path, "rb") as f:
+                data = f.read()
+            px_w, px_h = ImageReader(BytesIO(data)).getSize()
+            scale_pt = min(box_w_in * 72.0 / px_w, box_h_in * 72.0 / px_h)
+            asset = (data, px_w * scale_pt, px_h * scale_pt)
+    except (OSError, ValueError):
+        asset = None
+
+    if asset is None:
+        raw = _fetch_logo_bytes(logo_source)
+        if not raw:
+            return None, 0.0, 0.0
+        asset = _encode_logo(raw, box_w_in, box_h_in, target_dpi)
+        if path:
+            try:
+                os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(asset[0])
+                os.replace(tmp, path)
+            except OSError as e:
+                logging.warning(f"Could not store logo in {LOGO_CACHE_DIR}: {e}")
+
+    _logo_cache[key] = (now, asset)
+    return asset
+
+async def prefetch_logo(logo_source: str | None,
+                        box_w_in: float = 1.6,
+                        box_h_in: float = 1.0,
+                        target_dpi: int = 150) -> tuple[bytes | None, float, float]:
+    """Prepare the logo off the event loop so it can be handed to the report build."""
+    return await asyncio.to_thread(_prepare_logo, logo_source, box_w_in, box_h_in, target_dpi)
+
 
 # ---------- tables ----------
-def _make_main_table(rows, styles):
-    logging.info("Preparing Main Table")
-    cell_style = ParagraphStyle("cell", parent=styles["BodyText"], fontSize=8, leading=9)
-    header_style = ParagraphStyle("header", parent=styles["BodyText"], fontSize=8, leading=9)
-
-    header = ["Unit","Tenant","Current","Guideline Rent","AGI Rent",
-              "Market","Guideline Δ","AGI Δ","Notice %","Calc %","Ignored","Reason"]
-
-    # fixed total width ~9.3"
-    main_col_widths = [w*inch for w in [0.5, 1.0, 0.7, 0.8, 0.7, 0.8, 0.8, 0.7, 0.6, 0.6, 0.5, 1.6]]
-
-    trows = [[Paragraph(h, header_style) for h in header]]
-    for inc in rows:
-        trows.append([
-            Paragraph(inc.get("unitnumber","") or "", cell_style),
-            Paragraph(_short_name(inc.get("tenantname","")), cell_style),
-            Paragraph(_fmt_money(inc.get("current_rent")), cell_style),
-            Paragraph(_fmt_money(inc.get("guidelinerent")), cell_style),
-            Paragraph("" if inc.get("agirent") is None else _fmt_money(inc.get("agirent")), cell_style),
-            Paragraph(_fmt_money(inc.get("marketrent")), cell_style),
-            Paragraph(_fmt_money(inc.get("guidelineincrease")), cell_style),
-            Paragraph("" if inc.get("agiincrease") is None else _fmt_money(inc.get("agiincrease")), cell_style),
-            Paragraph(_fmt_pct(inc.get("percentage")), cell_style),
-            Paragraph(_fmt_pct(inc.get("calculationpercentage")), cell_style),
-            Paragraph(_txt(inc.get("ignored")), cell_style),
-            Paragraph(_txt(inc.get("reason")), cell_style),
-        ])
-
-    tbl = Table(trows, repeatRows=1, colWidths=main_col_widths)
+# Cells are drawn as plain strings, which the table lays out in constant time;
+# only text too wide for its column (in practice the Reason) is wrapped in a
+# Paragraph. Padding is the Table default of 6pt on each side.
+CELL_FONT, CELL_SIZE, CELL_LEADING, CELL_PADDING = "Helvetica", 8, 9, 12
+
+MAIN_HEADER = ["Unit","Tenant","Current","Guideline Rent","AGI Rent",
+               "Market","Guideline Δ","AGI Δ","Notice %","Calc %","Ignored","Reason"]
+MAIN_KEYS = ["unit","tenant","current","guideline","agi",
+             "market","guideline_inc","agi_inc","notice_pct","calc_pct","ignored","reason"]
+# fixed total width ~9.3"
+MAIN_COL_WIDTHS = [w*inch for w in [0.5, 1.0, 0.7, 0.8, 0.7, 0.8, 0.8, 0.7, 0.6, 0.6, 0.5, 1.6]]
+
+IGNORED_HEADER = ["Unit","Tenant","Reason","Current","Guideline Rent","AGI Rent","Notice %","Calc %"]
+IGNORED_KEYS = ["unit","tenant","reason","current","guideline","agi","notice_pct","calc_pct"]
+IGNORED_COL_WIDTHS = [w*inch for w in [0.6, 1.6, 3.2, 0.9, 1.0, 0.9, 0.55, 0.55]]
+
+def _format_row(inc) -> dict:
+    """Format a report row once; the result is shared by every table it appears in."""
+    return {
+        "unit": inc.get("unitnumber","") or "",
+        "tenant": _short_name(inc.get("tenantname","")),
+        "current": _fmt_money(inc.get("current_rent")),
+        "guideline": _fmt_money(inc.get("guidelinerent")),
+        "agi": "" if inc.get("agirent") is None else _fmt_money(inc.get("agirent")),
+        "market": _fmt_money(inc.get("marketrent")),
+        "guideline_inc": _fmt_money(inc.get("guidelineincrease")),
+        "agi_inc": "" if inc.get("agiincrease") is None else _fmt_money(inc.get("agiincrease")),
+        "notice_pct": _fmt_pct(inc.get("percentage")),
+        "calc_pct": _fmt_pct(inc.get("calculationpercentage")),
+        "ignored": _txt(inc.get("ignored")),
+        "reason": _txt(inc.get("reason")),
+    }
+
+def _cell(text: str, width: float, style):
+    if not text or stringWidth(text, CELL_FONT, CELL_SIZE) <= width - CELL_PADDING:
+        return text
+    return Paragraph(escape(text), style)
+
+def _fast_table(formatted, header, keys, col_widths, styles, extra_style):
+    cell_style = ParagraphStyle("cell", parent=styles["BodyText"], fontSize=CELL_SIZE, leading=CELL_LEADING)
+    trows = [[_cell(h, w, cell_style) for h, w in zip(header, col_widths)]]
+    columns = list(zip(keys, col_widths))
+    for row in formatted:
+        trows.append([_cell(row[k], w, cell_style) for k, w in columns])
+
+    tbl = Table(trows, repeatRows=1, colWidths=col_widths)
     tbl.setStyle(TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
         ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("ALIGN", (2, 1), (-3, -1), "RIGHT"),
-        ("ALIGN", (0, 0), (1, -1), "LEFT"),
+        ("FONTNAME", (0, 0), (-1, -1), CELL_FONT),
+        ("FONTSIZE", (0, 0), (-1, -1), CELL_SIZE),
+        ("LEADING", (0, 0), (-1, -1), CELL_LEADING),
+        *extra_style,
         ("VALIGN", (0, 0), (-1, -1), "TOP"),
         ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#EAF2FB"), colors.whitesmoke]),
     ]))
+    return tbl
+
+def _make_main_table(formatted, styles):
+    logging.info("Preparing Main Table")
+    tbl = _fast_table(formatted, MAIN_HEADER, MAIN_KEYS, MAIN_COL_WIDTHS, styles, [
+        ("ALIGN", (2, 1), (-3, -1), "RIGHT"),
+        ("ALIGN", (0, 0), (1, -1), "LEFT"),
+    ])
     logging.info("Completed Main Table")
     return tbl
 
-def _make_ignored_table(rows, styles):
+def _make_ignored_table(formatted, styles):
     logging.info("Preparing Ignored Table")
-    cell_style = ParagraphStyle("cell", parent=styles["BodyText"], fontSize=8, leading=9)
-    header_style = ParagraphStyle("header", parent=styles["BodyText"], fontSize=8, leading=9)
-
-    head = ["Unit","Tenant","Reason","Current","Guideline Rent","AGI Rent","Notice %","Calc %"]
-    col_widths = [w*inch for w in [0.6, 1.6, 3.2, 0.9, 1.0, 0.9, 0.55, 0.55]]
-
-    trows = [[Paragraph(h, header_style) for h in head]]
-    for inc in rows:
-        trows.append([
-            Paragraph(inc.get("unitnumber","") or "", cell_style),
-            Paragraph(_short_name(inc.get("tenantname","")), cell_style),
-            Paragraph(_txt(inc.get("reason")), cell_style),
-            Paragraph(_fmt_money(inc.get("current_rent")), cell_style),
-            Paragraph(_fmt_money(inc.get("guidelinerent")), cell_style),
-            Paragraph("" if inc.get("agirent") is None else _fmt_money(inc.get("agirent")), cell_style),
-            Paragraph(_fmt_pct(inc.get("percentage")), cell_style),
-            Paragraph(_fmt_pct(inc.get("calculationpercentage")), cell_style),
-        ])
-
-    tbl = Table(trows, repeatRows=1, colWidths=col_widths)
-    tbl.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
+    return _fast_table(formatted, IGNORED_HEADER, IGNORED_KEYS, IGNORED_COL_WIDTHS, styles, [
         ("ALIGN", (3, 1), (-1, -1), "RIGHT"),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#EAF2FB"), colors.whitesmoke]),
-    ]))
-    return tbl
+    ])
 
 
 def _building_header_with_logo(building: str, run_date: str, effective_date: str, guideline_pct: str,
-                               styles, logo_source: str | None):
+                               styles, logo: tuple[bytes | None, float, float]):
     # Title + meta (left)
     title = Paragraph("Rent Increase Summary", styles["Title"])
     meta_lines = [
@@ -229,8 +337,9 @@ def _building_header_with_logo(building: str, run_date: str, effective_date: str
     left_block = [title, Spacer(1, 0.12 * inch), *meta_lines, Spacer(1, 0.06 * inch)]
     left = KeepInFrame(6.8 * inch, 1.2 * inch, left_block, hAlign="LEFT", vAlign="TOP")
 
-    # Logo (right) – fit to box, preserve aspect ratio, and downscale pixels if needed
-    img_bytes, draw_w_pt, draw_h_pt = _prepare_logo(logo_source, box_w_in=1.6, box_h_in=1.0, target_dpi=150)
+    # Logo (right) – prepared once per report; ReportLab embeds identical
+    # image data a single time and references it from every header
+    img_bytes, draw_w_pt, draw_h_pt = logo
     if img_bytes:
         logo_img = Image(BytesIO(img_bytes), width=draw_w_pt, height=draw_h_pt)
         logo_img.hAlign = "RIGHT"
@@ -247,7 +356,7 @@ def _building_header_with_logo(building: str, run_date: str, effective_date: str
 
 # ---------- main entry ----------
 def build_increase_report_pdf(
-    path: str,
+    path,
     *,
     run_date: str,
     effective_date: str,
@@ -255,6 +364,7 @@ def build_increase_report_pdf(
     rows: list[dict],
     totals_by_building: dict | None = None,
     logo_source: str | None = None,
+    logo: tuple[bytes | None, float, float] | None = None,
 ):
     logging.info("Preparing Increase Summary Report")
     """
@@ -265,6 +375,9 @@ def build_increase_report_pdf(
           1) Included Increases
           2) Ignored Leases (if any)
           3) All Potential Increases
+
+    ``logo`` is a logo already prepared by :func:`prefetch_logo`; otherwise
+    ``logo_source`` is fetched here (once for the whole report).
     """
     pagesize = landscape(LETTER)
     doc = SimpleDocTemplate(
@@ -273,6 +386,8 @@ def build_increase_report_pdf(
     )
     styles = getSampleStyleSheet()
     story = []
+    if logo is None:
+        logo = _prepare_logo(logo_source, box_w_in=1.6, box_h_in=1.0, target_dpi=150)
 
     # Group rows by building
     by_building = defaultdict(list)
@@ -324,7 +439,7 @@ def build_increase_report_pdf(
 
     story.append(
         _building_header_with_logo(
-            "All Buildings", run_date, effective_date, guideline_pct, styles, logo_source
+            "All Buildings", run_date, effective_date, guideline_pct, styles, logo
         )
     )
     story.append(Spacer(1, 0.18 * inch))
@@ -408,50 +523,102 @@ def build_increase_report_pdf(
     story.append(Spacer(1, 0.22 * inch))
     story.append(PageBreak())
 
-    # Build pages
-    for idx, (building, rs) in enumerate(by_building.items()):
-        # Header + logo (only here → only on first page for this building)
-        story.append(_building_header_with_logo(building, run_date, effective_date, guideline_pct, styles, logo_source))
-        story.append(Spacer(1, 0.18 * inch))
-
-        # Totals
-        t = totals_by_building.get(building, {})
-        tdata = [
-            ["Increases (not ignored)", "Total Increase (not ignored)", "Ignored Count", "Total Ignored Increase"],
-            [str(t.get("count", "")), t.get("total_inc", ""), str(t.get("ignored_count", "")), t.get("ignored_total_inc", "")],
-        ]
-        totals_col_widths = [w * inch for w in [2.0, 2.6, 1.8, 2.9]]  # ≈ 9.3"
-        tt = Table(tdata, colWidths=totals_col_widths)
-        tt.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#EAF2FB"), colors.whitesmoke]),
-        ]))
-        story.append(tt)
-        story.append(Spacer(1, 0.22 * inch))
-
-        # 1) Included increases
-        included_rows = [x for x in rs if x.get("ignored") != "Y"]
-        story.append(Paragraph("Included Increases", styles["Heading3"]))
-        story.append(_make_main_table(included_rows, styles))
-        story.append(Spacer(1, 0.22 * inch))
-
-        # 2) Ignored leases
-        ignored_rows = [x for x in rs if x.get("ignored") == "Y"]
-        if ignored_rows:
-            story.append(Paragraph("Ignored Leases", styles["Heading3"]))
-            story.append(_make_ignored_table(ignored_rows, styles))
+    # Build pages -- one building at a time, as the document asks for more
+    def building_sections():
+        for idx, (building, rs) in enumerate(by_building.items()):
+            story = []
+            # Header + logo (only here → only on first page for this building)
+            story.append(_building_header_with_logo(building, run_date, effective_date, guideline_pct, styles, logo))
+            story.append(Spacer(1, 0.18 * inch))
+
+            # Totals
+            t = totals_by_building.get(building, {})
+            tdata = [
+                ["Increases (not ignored)", "Total Increase (not ignored)", "Ignored Count", "Total Ignored Increase"],
+                [str(t.get("count", "")), t.get("total_inc", ""), str(t.get("ignored_count", "")), t.get("ignored_total_inc", "")],
+            ]
+            totals_col_widths = [w * inch for w in [2.0, 2.6, 1.8, 2.9]]  # ≈ 9.3"
+            tt = Table(tdata, colWidths=totals_col_widths)
+            tt.setStyle(TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#EAF2FB"), colors.whitesmoke]),
+            ]))
+            story.append(tt)
             story.append(Spacer(1, 0.22 * inch))
 
-        # 3) All potential increases
-        story.append(Paragraph("All Potential Increases", styles["Heading3"]))
-        story.append(_make_main_table(rs, styles))
+            # 1) Included increases
+            formatted = [_format_row(x) for x in rs]
+            included_rows = [f for f in formatted if f["ignored"] != "Y"]
+            story.append(Paragraph("Included Increases", styles["Heading3"]))
+            story.append(_make_main_table(included_rows, styles))
+            story.append(Spacer(1, 0.22 * inch))
+
+            # 2) Ignored leases
+            ignored_rows = [f for f in formatted if f["ignored"] == "Y"]
+            if ignored_rows:
+                story.append(Paragraph("Ignored Leases", styles["Heading3"]))
+                story.append(_make_ignored_table(ignored_rows, styles))
+                story.append(Spacer(1, 0.22 * inch))
+
+            # 3) All potential increases
+            story.append(Paragraph("All Potential Increases", styles["Heading3"]))
+            story.append(_make_main_table(formatted, styles))
 
-        if idx < len(by_building) - 1:
-            story.append(PageBreak())
+            if idx < len(by_building) - 1:
+                story.append(PageBreak())
+            yield story
 
     # Build with page numbering canvas
-    doc.build(story, canvasmaker=NumberedCanvas)
+    doc.build(_StreamingStory([story], building_sections()), canvasmaker=NumberedCanvas)
     logging.info("Completed Summary Report")
+
+
+def build_increase_report_bytes(
+    run_date: str,
+    effective_date: str,
+    guideline_pct: str,
+    rows: list[dict],
+    totals_by_building: dict | None = None,
+    logo_source: str | None = None,
+    logo: tuple[bytes | None, float, float] | None = None,
+) -> bytes:
+    """Build the report in memory and return the PDF bytes.
+
+    Positional so it can be handed to ``workers.run_isolated`` as is.
+    """
+    buffer = BytesIO()
+    build_increase_report_pdf(
+        buffer,
+        run_date=run_date,
+        effective_date=effective_date,
+        guideline_pct=guideline_pct,
+        rows=rows,
+        totals_by_building=totals_by_building,
+        logo_source=logo_source,
+        logo=logo,
+    )
+    return buffer.getvalue()
+
+
+def build_increase_report_parts(
+    run_date: str,
+    effective_date: str,
+    guideline_pct: str,
+    rows: list[dict],
+    totals_by_building: dict | None = None,
+    logo_source: str | None = None,
+    logo: tuple[bytes | None, float, float] | None = None,
+    max_part_bytes: int = pdf_split.MAX_PART_BYTES,
+) -> list[bytes]:
+    """Build the report and split it into parts of at most *max_part_bytes*.
+
+    Splitting re-parses the whole document, so it runs here, in the same
+    worker process as the build, rather than on the caller's event loop.
+    """
+    pdf_bytes = build_increase_report_bytes(
+        run_date, effective_date, guideline_pct, rows, totals_by_building, logo_source, logo
+    )
+    return pdf_split.split_pdf_bytes(pdf_bytes, max_part_bytes)
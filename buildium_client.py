@@ -0,0 +1,460 @@
+"""Shared client for the Buildium REST API.
+
+Every module talks to Buildium through :class:`BuildiumClient` so that they
+all behave the same way under throttling:
+
+* each attempt holds one per-account concurrency slot and rate token from
+  :mod:`rate_limiter`, and the slot is released *before* any backoff sleep so
+  waiting coroutines never block others while the API is saturated;
+* 429 and transient 5xx responses are retried with exponential backoff and
+  full jitter, honouring ``Retry-After`` when Buildium sends it; POSTs,
+  which may already have been applied when a 5xx or timeout comes back,
+  are only retried on 429;
+* every 2xx/429 is fed back into the account's AIMD rate controller;
+* timeouts are chosen per endpoint (large list pages and file transfers get
+  more time than single-entity lookups);
+* JSON GETs are revalidated against :mod:`http_cache` when it is enabled,
+  so unchanged resources come back as cheap ``304 Not Modified`` answers.
+
+The defaults can be overridden with ``BUILDIUM_API_BASE``,
+``BUILDIUM_MAX_ATTEMPTS``, ``BUILDIUM_BACKOFF_BASE`` and
+``BUILDIUM_BACKOFF_MAX``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, UTC
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, NamedTuple, Optional
+
+import aiohttp
+
+import http_cache
+import rate_limiter
+
+BASE_URL = os.getenv("BUILDIUM_API_BASE", "https://api.buildium.com/v1").rstrip("/")
+MAX_ATTEMPTS = int(os.getenv("BUILDIUM_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE = float(os.getenv("BUILDIUM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("BUILDIUM_BACKOFF_MAX", "30"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# A 429 is rejected before the request is processed, so it is safe to resend
+NON_IDEMPOTENT_RETRY_STATUSES = frozenset({429})
+
+# Per-endpoint timeouts
+ENTITY_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=20)
+LIST_TIMEOUT = aiohttp.ClientTimeout(total=90, connect=10, sock_read=60)
+UPLOAD_TIMEOUT = aiohttp.ClientTimeout(total=180, connect=15, sock_read=120)
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=120, connect=15, sock_read=90)
+
+PAGE_LIMIT = 1000
+TOTAL_COUNT_HEADER = "X-Total-Count"
+# Pages fetched together while probing a list without a total-count header
+PROBE_WINDOW = int(os.getenv("BUILDIUM_PAGE_PROBE_WINDOW", "4"))
+
+
+class ApiResponse(NamedTuple):
+    """Status, decoded body and headers of a finished request.
+
+    ``status`` is ``None`` when no response was received at all (network
+    error or timeout on every attempt).
+    """
+
+    status: Optional[int]
+    body: Any
+    headers: Mapping[str, str]
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+    def data(self, default=None):
+        """Return the JSON body of a successful response, else *default*."""
+        if self.ok and isinstance(self.body, (dict, list)):
+            return self.body
+        return default
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max(0.0, (when - datetime.now(UTC)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry *attempt* (0-based).
+
+    ``Retry-After`` wins when present; otherwise exponential backoff with
+    full jitter, capped at ``BACKOFF_MAX``.
+    """
+    hinted = _retry_after_seconds(retry_after)
+    if hinted is not None:
+        return min(hinted, BACKOFF_MAX) + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _param_pairs(params) -> list:
+    """Query parameters as ``[(key, value), ...]``; a list of pairs may repeat a key."""
+    if not params:
+        return []
+    return list(params.items() if isinstance(params, dict) else params)
+
+
+async def _read_body(response: aiohttp.ClientResponse, raw: bool):
+    if raw:
+        return await response.read()
+    text = await response.text()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class BuildiumClient:
+    """Typed Buildium endpoints over a shared ``aiohttp`` session.
+
+    The client is a thin, cheap wrapper: create one wherever a ``session``
+    and request ``headers`` are at hand.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        headers: Optional[dict] = None,
+        *,
+        base_url: str = BASE_URL,
+        max_attempts: int = MAX_ATTEMPTS,
+        response_cache: Optional[http_cache.HttpCache] = None,
+    ) -> None:
+        self.session = session
+        self.headers = headers or {}
+        self.base_url = base_url.rstrip("/")
+        self.max_attempts = max(1, max_attempts)
+        self.response_cache = response_cache or http_cache.default_cache()
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    # ------------------------------------------------------------------
+    # core request loop
+    # ------------------------------------------------------------------
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params=None,
+        json=None,
+        data=None,
+        timeout: aiohttp.ClientTimeout = ENTITY_TIMEOUT,
+        authenticated: bool = True,
+        raw: bool = False,
+        max_attempts: Optional[int] = None,
+        cache: bool = True,
+        idempotent: Optional[bool] = None,
+    ) -> ApiResponse:
+        """Issue a request with retry/backoff and return an :class:`ApiResponse`.
+
+        ``authenticated=False`` is used for presigned S3 and download URLs;
+        those responses are not fed into the Buildium rate controller.
+        Authenticated JSON GETs go through the response cache unless
+        ``cache=False``; a ``304`` is returned as a ``200`` with the stored body.
+        Requests that are not ``idempotent`` (by default: POSTs) are retried
+        on 429 only, never after a 5xx, timeout or connection error, so a
+        write the server already committed is not sent twice.
+        """
+        if idempotent is None:
+            idempotent = method != "POST"
+        retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        url = self.url(path)
+        attempts = max_attempts or self.max_attempts
+        headers = self.headers if authenticated else None
+        last = ApiResponse(None, None, {})
+
+        store = self.response_cache if (cache and authenticated and not raw and method == "GET") else None
+        cached = None
+        if store is not None:
+            cache_key = store.key(self.headers, url, params)
+            cached = await store.lookup(cache_key)
+            if cached is not None:
+                headers = {**headers, **cached.conditional_headers()}
+
+        for attempt in range(attempts):
+            retry_after = None
+            final = attempt == attempts - 1
+            try:
+                async with rate_limiter.limit():
+                    issued_at = time.monotonic()
+                    async with self.session.request(
+                        method, url, headers=headers, params=params,
+                        json=json, data=data, timeout=timeout,
+                    ) as response:
+                        status = response.status
+                        if authenticated:
+                            rate_limiter.record_response(status, issued_at=issued_at)
+                        if status == 304 and cached is not None:
+                            entry = store.revalidated(cached)
+                            return ApiResponse(200, entry.body, entry.headers)
+                        body = await _read_body(response, raw)
+                        last = ApiResponse(status, body, response.headers)
+                        if store is not None and status == 200:
+                            store.save(cache_key, response.headers, body, cached)
+                        if status not in retry_statuses or final:
+                            if not last.ok:
+                                logging.error(f"{method} {url} failed: {status} {str(body)[:300]}")
+                            return last
+                        retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not idempotent:
+                    logging.error(f"{method} {url} failed: {e!r}; not retried")
+                    return last
+                if final:
+                    logging.error(f"{method} {url} failed after {attempts} attempts: {e!r}")
+                    return last
+                logging.warning(f"{method} {url} attempt {attempt + 1} error: {e!r}")
+
+            # Sleep outside the limiter so the slot is free for other requests
+            delay = backoff_delay(attempt, retry_after)
+            logging.info(
+                f"{method} {url} -> {last.status}; retrying in {delay:.2f}s "
+                f"(attempt {attempt + 2}/{attempts})"
+            )
+            await asyncio.sleep(delay)
+
+        return last
+
+    async def get_json(self, path: str, params=None, *, timeout=ENTITY_TIMEOUT, default=None):
+        """GET *path* and return its JSON body, or *default* on failure."""
+        resp = await self.request("GET", path, params=params, timeout=timeout)
+        return resp.data(default)
+
+    # ------------------------------------------------------------------
+    # pagination
+    # ------------------------------------------------------------------
+    async def _get_page(self, path: str, params: list, offset: int, page_size: int, timeout) -> tuple[int, list]:
+        resp = await self.request(
+            "GET", path, params=[*params, ("limit", page_size), ("offset", offset)], timeout=timeout
+        )
+        page = resp.data([])
+        if not resp.ok:
+            logging.error(f"Page at offset {offset} of {path} could not be fetched")
+        return offset, (page if isinstance(page, list) else [])
+
+    async def iter_pages(
+        self,
+        path: str,
+        params=None,
+        *,
+        page_size: int = PAGE_LIMIT,
+        timeout: aiohttp.ClientTimeout = LIST_TIMEOUT,
+        max_pending: Optional[int] = None,
+    ):
+        """Yield ``(offset, page)`` for every page of an offset-paginated list.
+
+        The first page is fetched alone; its ``X-Total-Count`` header tells
+        how many pages remain, and those are requested concurrently (the
+        rate limiter keeps them within the account's budget) and yielded as
+        they complete, so callers can start work on the first page while
+        the rest are in flight. Without the header, pages are probed in
+        windows of ``PROBE_WINDOW`` until a short page marks the end.
+        ``max_pending`` caps how many pages are requested ahead of the
+        consumer (default: all of them). ``params`` is a dict or, for keys
+        that repeat, a list of ``(key, value)`` pairs.
+        """
+        params = _param_pairs(params)
+        first = await self.request(
+            "GET", path, params=[*params, ("limit", page_size), ("offset", 0)], timeout=timeout
+        )
+        page = first.data([])
+        if not isinstance(page, list):
+            logging.error(f"Unexpected list response from {path}: {str(page)[:300]}")
+            return
+        if page:
+            yield 0, page
+        if len(page) < page_size:
+            return
+
+        try:
+            total = int(first.headers.get(TOTAL_COUNT_HEADER))
+        except (TypeError, ValueError):
+            total = None
+
+        if total is not None:
+            offsets = iter(range(page_size, total, page_size))
+            window = max_pending or max(1, -(-total // page_size))
+            pending = set()
+            try:
+                while True:
+                    # Keep at most *window* pages in flight; a slow consumer
+                    # therefore also slows down fetching.
+                    for off in offsets:
+                        pending.add(asyncio.ensure_future(
+                            self._get_page(path, params, off, page_size, timeout)
+                        ))
+                        if len(pending) >= window:
+                            break
+                    if not pending:
+                        break
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        off, page = task.result()
+                        if page:
+                            yield off, page
+            finally:
+                for task in pending:
+                    task.cancel()
+            return
+
+        offset = page_size
+        while True:
+            window = [offset + i * page_size for i in range(max(1, PROBE_WINDOW))]
+            pages = await asyncio.gather(
+                *(self._get_page(path, params, off, page_size, timeout) for off in window)
+            )
+            for off, page in pages:
+                if page:
+                    yield off, page
+                if len(page) < page_size:
+                    return
+            offset = window[-1] + page_size
+
+    async def fetch_all(self, path: str, params=None, *, page_size: int = PAGE_LIMIT) -> list:
+        """Return every row of an offset-paginated list, in API order."""
+        pages = [p async for p in self.iter_pages(path, params, page_size=page_size)]
+        pages.sort(key=lambda item: item[0])
+        return [row for _, page in pages for row in page]
+
+    # ------------------------------------------------------------------
+    # tasks
+    # ------------------------------------------------------------------
+    async def get_task(self, task_id) -> ApiResponse:
+        return await self.request("GET", f"tasks/{task_id}")
+
+    async def get_task_history(self, task_id) -> ApiResponse:
+        return await self.request("GET", f"tasks/{task_id}/history", timeout=LIST_TIMEOUT)
+
+    async def get_task_history_files(self, task_id, history_id) -> ApiResponse:
+        return await self.request("GET", f"tasks/{task_id}/history/{history_id}/files")
+
+    async def request_task_file_download(self, task_id, history_id, file_id) -> ApiResponse:
+        return await self.request(
+            "POST", f"tasks/{task_id}/history/{history_id}/files/{file_id}/downloadrequest", json={}
+        )
+
+    async def create_task_history_upload_request(self, task_id, history_id, filename: str) -> ApiResponse:
+        return await self.request(
+            "POST", f"tasks/{task_id}/history/{history_id}/files/uploadrequests",
+            json={"FileName": filename},
+        )
+
+    async def list_task_categories(self) -> ApiResponse:
+        return await self.request("GET", "tasks/categories", params={"limit": PAGE_LIMIT}, timeout=LIST_TIMEOUT)
+
+    async def create_task_category(self, name: str) -> ApiResponse:
+        return await self.request("POST", "tasks/categories", json={"Name": name})
+
+    async def create_todo_request(self, payload: dict) -> ApiResponse:
+        return await self.request("POST", "tasks/todorequests", json=payload)
+
+    async def update_todo_request(self, task_id, payload: dict) -> ApiResponse:
+        return await self.request("PUT", f"tasks/todorequests/{task_id}", json=payload)
+
+    # ------------------------------------------------------------------
+    # files
+    # ------------------------------------------------------------------
+    async def get_file(self, file_id) -> ApiResponse:
+        return await self.request("GET", f"files/{file_id}")
+
+    async def list_file_categories(self) -> ApiResponse:
+        return await self.request("GET", "files/categories", params={"limit": PAGE_LIMIT}, timeout=LIST_TIMEOUT)
+
+    async def create_file_category(self, name: str) -> ApiResponse:
+        return await self.request("POST", "files/categories", json={"Name": name})
+
+    async def create_file_upload_request(self, payload: dict) -> ApiResponse:
+        return await self.request("POST", "files/uploadrequests", json=payload)
+
+    async def upload_to_bucket(self, bucket_url: str, form_data: aiohttp.FormData) -> ApiResponse:
+        """POST a presigned multipart form to S3.
+
+        Single attempt: a consumed ``FormData`` cannot be replayed, and an
+        expired policy needs a fresh presign from the caller anyway.
+        """
+        return await self.request(
+            "POST", bucket_url, data=form_data, timeout=UPLOAD_TIMEOUT,
+            authenticated=False, max_attempts=1,
+        )
+
+    async def download(self, url: str) -> ApiResponse:
+        """GET a presigned download URL and return the raw bytes as ``body``."""
+        return await self.request("GET", url, timeout=DOWNLOAD_TIMEOUT, authenticated=False, raw=True)
+
+    # ------------------------------------------------------------------
+    # leases
+    # ------------------------------------------------------------------
+    async def list_leases(self, params: dict) -> ApiResponse:
+        return await self.request("GET", "leases", params=params, timeout=LIST_TIMEOUT)
+
+    def iter_leases(self, params: Optional[dict] = None, *, max_pending: Optional[int] = None):
+        """Async iterator of ``(offset, page)`` over all leases matching *params*."""
+        return self.iter_pages("leases", params, max_pending=max_pending)
+
+    async def get_all_leases(self, params: Optional[dict] = None) -> list:
+        return await self.fetch_all("leases", params)
+
+    async def get_lease(self, lease_id) -> ApiResponse:
+        return await self.request("GET", f"leases/{lease_id}")
+
+    async def update_lease(self, lease_id, payload: dict) -> ApiResponse:
+        return await self.request("PUT", f"leases/{lease_id}", json=payload)
+
+    async def get_lease_notes(self, lease_id) -> ApiResponse:
+        return await self.request("GET", f"leases/{lease_id}/notes")
+
+    async def get_lease_recurring_transactions(self, lease_id) -> ApiResponse:
+        return await self.request("GET", f"leases/{lease_id}/recurringtransactions")
+
+    async def get_lease_transactions(self, lease_id, params: Optional[dict] = None) -> ApiResponse:
+        return await self.request("GET", f"leases/{lease_id}/transactions", params=params, timeout=LIST_TIMEOUT)
+
+    def iter_lease_transactions(self, lease_id, params: Optional[dict] = None, *, max_pending: Optional[int] = None):
+        """Async iterator of ``(offset, page)`` over a lease's transactions."""
+        return self.iter_pages(f"leases/{lease_id}/transactions", params, max_pending=max_pending)
+
+    async def create_lease_renewal(self, lease_id, payload: dict) -> ApiResponse:
+        return await self.request("POST", f"leases/{lease_id}/renewals", json=payload)
+
+    # ------------------------------------------------------------------
+    # rentals
+    # ------------------------------------------------------------------
+    async def get_rental(self, property_id) -> ApiResponse:
+        return await self.request("GET", f"rentals/{property_id}")
+
+    async def list_rentals(self, property_ids) -> list:
+        """Rentals whose ids are in *property_ids*, from the list endpoint."""
+        return await self.fetch_all("rentals", [("propertyids", property_id) for property_id in property_ids])
+
+    async def get_rental_notes(self, property_id) -> ApiResponse:
+        return await self.request("GET", f"rentals/{property_id}/notes")
+
+    async def get_unit(self, unit_id) -> ApiResponse:
+        return await self.request("GET", f"rentals/units/{unit_id}")
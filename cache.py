@@ -0,0 +1,342 @@
+"""Shared async TTL/LRU cache for Buildium reference data.
+
+Each namespace (building notes, rentals, units, categories, ...) has its own
+time-to-live and size bound. Entries are evicted least-recently-used first
+once a namespace is full, and never served after they expire. Concurrent
+lookups of the same missing key share one load (single-flight), and every
+namespace keeps hit/miss counters.
+
+Namespaces marked persistent can also be backed by a local SQLite file so
+that a warm instance skips most reference lookups after a restart. The disk
+tier is off unless ``REFERENCE_CACHE_DIR`` is set; entries keep their
+original expiry time there too. Secrets and account records are never
+written to disk.
+
+TTLs can be overridden per namespace with ``CACHE_TTL_<NAMESPACE>`` (seconds)
+and sizes with ``CACHE_SIZE_<NAMESPACE>``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+REFERENCE_CACHE_DIR = os.getenv("REFERENCE_CACHE_DIR")
+
+# namespace: (ttl seconds, max entries, persistent)
+NAMESPACE_DEFAULTS = {
+    "building_notes": (900, 5000, True),
+    "rentals": (3600, 5000, True),
+    "units": (3600, 50000, True),
+    "file_categories": (600, 500, False),
+    "task_categories": (600, 500, False),
+    "account_info": (300, 1000, False),
+    "secrets": (300, 200, False),
+    "task_data_files": (86400, 1000, False),
+}
+DEFAULT_SETTINGS = (300, 1000, False)
+
+
+class SQLiteStore:
+    """Tiny key/value table with per-entry expiry, shared by all namespaces."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def get(self, namespace: str, key: str):
+        """Return ``(value, expires_at)`` for a live entry, else ``None``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at <= time.time():
+            self.delete(namespace, key)
+            return None
+        return json.loads(value), expires_at
+
+    def set(self, namespace: str, key: str, value, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str), expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+            self._conn.commit()
+
+
+_store: Optional[SQLiteStore] = None
+
+
+def _disk_store() -> Optional[SQLiteStore]:
+    global _store
+    if _store is None and REFERENCE_CACHE_DIR:
+        try:
+            os.makedirs(REFERENCE_CACHE_DIR, exist_ok=True)
+            _store = SQLiteStore(os.path.join(REFERENCE_CACHE_DIR, "reference_cache.sqlite3"))
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Reference cache disk tier unavailable: {e}")
+            return None
+    return _store
+
+
+class AsyncTTLCache:
+    """In-memory TTL + LRU cache with single-flight loading."""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int, persistent: bool = False) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    # ---- memory tier ----
+    def _get_memory(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _set_memory(self, key, value, expires_at: float) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    # ---- public API ----
+    def get(self, key, default=None):
+        """Return a live cached value without loading it."""
+        entry = self._get_memory(key)
+        if entry is None:
+            return default
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value) -> None:
+        expires_at = time.time() + self.ttl
+        self._set_memory(key, value, expires_at)
+        store = _disk_store() if self.persistent else None
+        if store is not None:
+            try:
+                # Keep the commit off the event loop when there is one
+                asyncio.get_running_loop().run_in_executor(
+                    None, self._persist, store, key, value, expires_at
+                )
+            except RuntimeError:
+                self._persist(store, key, value, expires_at)
+
+    def _persist(self, store: SQLiteStore, key, value, expires_at: float) -> None:
+        try:
+            store.set(self.namespace, str(key), value, expires_at)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.warning(f"Could not persist {self.namespace} cache entry: {e}")
+
+    def invalidate(self, key=None) -> None:
+        """Drop one key (or the whole namespace) from every tier."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+        store = _disk_store() if self.persistent else None
+        if store is not None:
+            store.delete(self.namespace, None if key is None else str(key))
+
+    async def get_or_load(self, key, loader: Callable[[], Awaitable[Any]]):
+        """Return the cached value for *key*, loading it once if missing.
+
+        Concurrent callers for the same key await a single *loader* call.
+        A loader result of ``None`` is returned but not cached, so failed
+        lookups are retried next time; exceptions propagate to every waiter.
+        """
+        entry = self._get_memory(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited failure is not logged as lost
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_many_or_load(self, keys, loader: Callable[[list], Awaitable[Dict[Hashable, Any]]]) -> dict:
+        """Return ``{key: value}`` for *keys*, loading every miss with one *loader* call.
+
+        *loader* receives the keys missing from memory and disk and returns a
+        dict of the values it found; keys it leaves out come back as ``None``
+        and are not cached. Keys already being loaded by another caller are
+        awaited rather than loaded twice.
+        """
+        keys = list(dict.fromkeys(keys))
+        found, waiting, missing = {}, {}, []
+        for key in keys:
+            entry = self._get_memory(key)
+            if entry is not None:
+                self.hits += 1
+                found[key] = entry[0]
+            elif key in self._inflight:
+                self.hits += 1
+                waiting[key] = self._inflight[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._inflight.update(futures)
+            try:
+                loaded = await self._load_many(missing, loader)
+            except asyncio.CancelledError:
+                for future in futures.values():
+                    future.cancel()
+                raise
+            except BaseException as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()
+                raise
+            else:
+                for key, future in futures.items():
+                    future.set_result(loaded.get(key))
+                found.update(loaded)
+            finally:
+                for key in missing:
+                    self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            found[key] = await asyncio.shield(future)
+        return {key: found.get(key) for key in keys}
+
+    async def _load_many(self, keys: list, loader) -> dict:
+        loaded = {}
+        store = _disk_store() if self.persistent else None
+        if store is not None:
+            try:
+                cached = await asyncio.to_thread(
+                    lambda: {key: store.get(self.namespace, str(key)) for key in keys}
+                )
+            except sqlite3.Error as e:
+                logging.warning(f"Reference cache read failed for {self.namespace}: {e}")
+                cached = {}
+            for key, hit in cached.items():
+                if hit is not None:
+                    value, expires_at = hit
+                    self.disk_hits += 1
+                    self._set_memory(key, value, expires_at)
+                    loaded[key] = value
+
+        remaining = [key for key in keys if key not in loaded]
+        if remaining:
+            self.misses += len(remaining)
+            values = await loader(remaining) or {}
+            for key in remaining:
+                value = values.get(key)
+                if value is not None:
+                    self.set(key, value)
+                    loaded[key] = value
+        return loaded
+
+    async def _load(self, key, loader):
+        store = _disk_store() if self.persistent else None
+        if store is not None:
+            try:
+                cached = await asyncio.to_thread(store.get, self.namespace, str(key))
+            except sqlite3.Error as e:
+                logging.warning(f"Reference cache read failed for {self.namespace}: {e}")
+                cached = None
+            if cached is not None:
+                value, expires_at = cached
+                self.disk_hits += 1
+                self._set_memory(key, value, expires_at)
+                return value
+
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._data),
+        }
+
+
+_caches: Dict[str, AsyncTTLCache] = {}
+
+
+def get_cache(namespace: str) -> AsyncTTLCache:
+    """Return the process-wide cache for *namespace*, creating it on first use."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        ttl, maxsize, persistent = NAMESPACE_DEFAULTS.get(namespace, DEFAULT_SETTINGS)
+        env = namespace.upper()
+        ttl = float(os.getenv(f"CACHE_TTL_{env}", ttl))
+        maxsize = int(os.getenv(f"CACHE_SIZE_{env}", maxsize))
+        cache = AsyncTTLCache(namespace, ttl, maxsize, persistent)
+        _caches[namespace] = cache
+    return cache
+
+
+def account_key(headers: Optional[dict], *parts) -> str:
+    """Cache key scoped to the Buildium account identified by *headers*."""
+    client_id = (headers or {}).get("x-buildium-client-id", "")
+    return ":".join([str(client_id), *map(str, parts)])
+
+
+def stats() -> dict:
+    """Hit/miss counters for every namespace in use."""
+    return {name: cache.stats() for name, cache in _caches.items()}
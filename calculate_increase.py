@@ -1,11 +1,24 @@
 from datetime import datetime
 from collections import defaultdict
 import logging
+import os
 from dateutil.relativedelta import relativedelta
 
+import money
+
+try:
+    import increase_engine  # optional; needs NumPy
+except Exception:
+    increase_engine = None
+
+# "python" runs processcharges per lease; "numpy" (opt-in, needs NumPy)
+# computes the charges in one vectorized pass. Both give identical results,
+# and building each lease's output keeps the NumPy engine no faster today.
+INCREASE_ENGINE = os.getenv("INCREASE_ENGINE", "python")
+
 def calculate_rent_increase(amount, percentage):
     """Calculate the new rent based on the percentage increase, rounded to the nearest cent."""
-    return round(amount * (1 + percentage / 100), 2)
+    return money.from_cents(money.increase(money.to_cents(amount), percentage))
 
 def format_currency(value):
     """Format the value to two decimal places for currency display."""
@@ -14,53 +27,37 @@ def format_currency(value):
 def processcharges(recurringinfo, percentage, increasedate, agicheck, secondpercentage):
     newcharge_info = []
     chargestostoplist = []
-    total_current_rent = 0
-    total_current_other = 0
     increasedate = increasedate.strftime('%Y-%m-%d')
-    new_total_other = 0
     percentage = float(percentage)
 
-    # First pass to calculate the totals for rent (GL 3) and other charges
-    for item in recurringinfo:
-        if item['Gl'] != 3:
-            total_current_other += item['Amount']
-        total_current_rent += item['Amount']
-
-    # Calculate the total new amount using the percentage increase
-    new_total_rent = calculate_rent_increase(total_current_rent, percentage)
-
-    # Track rounding difference
-    rent_difference = new_total_rent
-
-    # Second pass to calculate the new individual charges, except rent (GL 3)
-    for item in recurringinfo:
-        newamount = calculate_rent_increase(item['Amount'], percentage)
-
-        if item['Gl'] != 3:
-            rent_difference -= newamount  # Adjust the difference for "other" charges
-            if item['RentId'] is None:
-                chargestostoplist.append(item['Id'])  # Append only the ID
-            newcharge_data = {
-                'Amount': newamount,
-                'GlAccountId': item['Gl'],
-                'NextDueDate': increasedate,
-                'PostDaysInAdvance': 10,
-                'Memo': item['Memo'],
-            }
-            newcharge_info.append(newcharge_data)
-            new_total_other += newamount
+    # Totals for all charges, and the charges other than rent (GL 3), in cents
+    cents = [money.to_cents(item['Amount']) for item in recurringinfo]
+    total_current_rent = sum(cents)
+    others = [(item, c) for item, c in zip(recurringinfo, cents) if item['Gl'] != 3]
+
+    # Raise the total and each other charge; rent takes the remainder so the
+    # new charges add up to the new total exactly
+    new_total_rent, new_others, rent_remainder = money.split_increase(
+        total_current_rent, [c for _, c in others], percentage
+    )
+
+    for (item, _), newamount in zip(others, new_others):
+        if item['RentId'] is None:
+            chargestostoplist.append(item['Id'])  # Append only the ID
+        newcharge_data = {
+            'Amount': money.from_cents(newamount),
+            'GlAccountId': item['Gl'],
+            'NextDueDate': increasedate,
+            'PostDaysInAdvance': 10,
+            'Memo': item['Memo'],
+        }
+        newcharge_info.append(newcharge_data)
 
-    # Finally, process the rent charge (GL 3) last to balance out the difference
+    # The (first) rent charge goes last
     for item in recurringinfo:
         if item['Gl'] == 3:
-            newamount = calculate_rent_increase(item['Amount'], percentage)
-            rent_difference -= newamount  # Adjust the difference for rent charges
-
-            # Adjust the last rent charge by the remaining difference (rent_difference)
-            adjusted_rent = round(newamount + round(rent_difference, 2), 2)
-
             newcharge_data = {
-                'Amount': adjusted_rent,  # Use the adjusted amount
+                'Amount': money.from_cents(rent_remainder),
                 'GlAccountId': item['Gl'],
                 'NextDueDate': increasedate,
                 'PostDaysInAdvance': 10,
@@ -75,18 +72,74 @@ def processcharges(recurringinfo, percentage, increasedate, agicheck, secondperc
 
     if agicheck is True:
         agipercentage = percentage - secondpercentage
-        agirent = round(total_current_rent * (1 + agipercentage / 100), 2)
+        agirent = money.increase(total_current_rent, agipercentage)
         increase = new_total_rent - agirent
 
     # Return chargestostoplist as a list of IDs
-    return new_total_rent, increase, chargestostoplist, newcharge_info, total_current_rent
-
-
-def generate_increases(leases_by_building, increasedate, guidelinerate):
+    return (
+        money.from_cents(new_total_rent),
+        money.from_cents(increase),
+        chargestostoplist,
+        newcharge_info,
+        money.from_cents(total_current_rent),
+    )
+
+
+def processcharges_batch(recurringinfos, percentages, increasedate, agicheck, secondpercentages):
+    """``processcharges`` for many leases, one call each (the reference implementation)."""
+    return [
+        processcharges(recurringinfo, percentage, increasedate, agicheck, secondpercentage)
+        for recurringinfo, percentage, secondpercentage in zip(recurringinfos, percentages, secondpercentages)
+    ]
+
+def _default_batch():
+    if INCREASE_ENGINE == "numpy" and increase_engine is not None:
+        return increase_engine.processcharges_batch
+    return processcharges_batch
+
+def generate_increases(leases_by_building, increasedate, guidelinerate, batch=None):
+    """Build the increase summary; ``batch`` computes the charges (see ``processcharges_batch``)."""
+    batch = batch or _default_batch()
     increase_summary = {}
     totalincrease = 0
     numberofincreases = 0
 
+    # Percentages per lease, then the guideline and AGI charges for all leases at once
+    all_leases = [lease for leases in leases_by_building.values() for lease in leases]
+    percentages = []
+    for lease in all_leases:
+        percentage = lease['total_increase_percentage']
+        agipercentage = lease['calculationpercentage']
+        yearcheck = None
+
+        if lease.get('agi') is not None:
+            yearcheck = lease['agiinfo'][0]['date_of_first_increase']
+            yearcheck = yearcheck + relativedelta(years=1)
+            if increasedate > yearcheck:
+                percentage += 0.25
+        else:
+            percentage = guidelinerate
+            agipercentage = guidelinerate
+        percentages.append((percentage, agipercentage, yearcheck))
+
+    guideline_results = batch(
+        [lease['recurringinfo'] for lease in all_leases],
+        [guidelinerate] * len(all_leases),
+        increasedate,
+        False,
+        [percentage for percentage, _, _ in percentages],
+    )
+    agi_index = [i for i, lease in enumerate(all_leases) if lease['agi'] is not None]
+    agi_results = dict(zip(agi_index, batch(
+        [all_leases[i]['recurringinfo'] for i in agi_index],
+        [percentages[i][1] for i in agi_index],
+        increasedate,
+        True,
+        [percentages[i][0] for i in agi_index],
+    )))
+    logging.info("Finished Processing Guideline and AGI Rents")
+
+    position = 0
     for building_id, leases in leases_by_building.items():
         logging.info(f"Processing Building ID: {building_id}")
         building_increases = []
@@ -96,34 +149,18 @@ def generate_increases(leases_by_building, increasedate, guidelinerate):
 
         for lease in leases:
             logging.info(f"Processing Lease ID: {lease['leaseid']} - Unit: {lease['unitnumber']}")
-            percentage = lease['total_increase_percentage']
-            agipercentage = lease['calculationpercentage']
-            yearcheck = None
-
-            if lease.get('agi') is not None:
-                yearcheck = lease['agiinfo'][0]['date_of_first_increase']
-                yearcheck = yearcheck + relativedelta(years=1)
-                if increasedate > yearcheck:
-                    percentage += 0.25
-            else:
-                percentage = guidelinerate
-                agipercentage = guidelinerate
+            percentage, agipercentage, yearcheck = percentages[position]
             agirent = None
             agiincrease = None
-            agicheck = False
-
 
-            # summaryfileinfo = summaryfilepro
-            guidelinerent, guidelineincrease, chargestostop, recurringinfo, currentrent = processcharges(lease['recurringinfo'], guidelinerate, increasedate, agicheck, percentage)
-            logging.info("Finished Processing Guideline Rent")
+            guidelinerent, guidelineincrease, chargestostop, recurringinfo, currentrent = guideline_results[position]
             rentcheck = guidelinerent + 50
             if chargestostop is not None:
                 chargestostop = ', '.join(map(str, chargestostop))
 
             if lease['agi'] is not None: ### We do nothing with agichargestostop, agirecurringinfo and agicurrentrent
-                agicheck = True
-                agirent, agiincrease, agichargestostop, agirecurringinfo, agicurrentrent = processcharges(lease['recurringinfo'], agipercentage, increasedate, agicheck, percentage)
-                logging.info("Finished Processing AGIRent")
+                agirent, agiincrease, agichargestostop, agirecurringinfo, agicurrentrent = agi_results[position]
+            position += 1
             reason = lease['reason']
             # Calculate the new rent
             if lease['eligible'] == True:
@@ -161,18 +198,19 @@ def generate_increases(leases_by_building, increasedate, guidelinerate):
                 'agitype' : lease['agitype'],
                 'ignored' : ignored,
                 'reason' : reason,
-                'RecurringChargesToStop' : chargestostop
+                'RecurringChargesToStop' : chargestostop,
+                'incomplete' : lease.get('incomplete', False)
             }
                 # 'agi' : lease['agi'],
             building_increases.append(lease_info)
             logging.info(f"New Rent for Lease ID {lease['leaseid']} Processed")
             numberofincreases += 1
-            totalincrease += guidelineincrease
+            totalincrease += money.to_cents(guidelineincrease)
             buildingnumberofincreases += 1
-            buildingtotalincrease += guidelineincrease
+            buildingtotalincrease += money.to_cents(guidelineincrease)
         additionalinfo = {
             'numberofincreases' : buildingnumberofincreases,
-            'totalincrease' :   buildingtotalincrease
+            'totalincrease' :   money.from_cents(buildingtotalincrease)
         }
         increase_summary[building_id] = {
             'increases' : building_increases,
@@ -180,7 +218,7 @@ def generate_increases(leases_by_building, increasedate, guidelinerate):
         }
     
 
-    return increase_summary, numberofincreases, totalincrease
+    return increase_summary, numberofincreases, money.from_cents(totalincrease)
 
 # recurringinfo = [{'Id': 295957, 'Amount': 1633.99, 'Gl': 3, 'PostDaysInAdvance': 11, 'Memo': 'Rent', 'RentId': 122220}, {'Id': 295958, 'Amount': 69.11, 'Gl': 144077, 'PostDaysInAdvance': 11, 'Memo': 'Parking', 'RentId': None}, {'Id': 295959, 'Amount': 57.81, 'Gl': 144073, 'PostDaysInAdvance': 11, 'Memo': 'Garage Parking', 'RentId': None}]
 # percentage = 2.5
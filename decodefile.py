@@ -1,10 +1,12 @@
+import asyncio
 import json
 import os
 import tempfile
 from cryptography.fernet import Fernet
 import logging
 
-from rate_limiter import semaphore, throttle
+import cache
+from buildium_client import BuildiumClient
 
 
 def _best_name(meta: dict) -> str:
@@ -19,104 +21,129 @@ def _best_name(meta: dict) -> str:
 def _ctype(meta: dict) -> str:
     return (meta.get("ContentType") or meta.get("MimeType") or "").lower()
 
+# History entries whose file lists are fetched at once while looking for data.json
+HISTORY_SCAN_WINDOW = int(os.getenv("DECODE_HISTORY_SCAN_WINDOW", "8"))
+
+async def _find_in_entry(client, task_id, hid, seen):
+    """Return ``(file_id, name)`` of the JSON file on history entry *hid*, else ``None``."""
+    rf = await client.get_task_history_files(task_id, hid)
+    if rf.status != 200:
+        logging.warning(f"files GET {hid} failed: {rf.status} {rf.body}")
+        return None
+    files = rf.body or []  # list of dicts; may or may not include names
+
+    # First pass: try to match data.json by any name field present
+    for f in files:
+        name = _best_name(f)
+        seen.append(name or f.get("Id"))
+        if name.lower() == "data.json" and f.get("Id"):
+            return f.get("Id"), name
+
+    # Second pass: some schemas omit names; fall back to metadata per file id
+    fids = [f.get("Id") for f in files if f.get("Id")]
+    metas = await asyncio.gather(*(client.get_file(fid) for fid in fids))
+    for fid, mf in zip(fids, metas):
+        if mf.status != 200:
+            continue
+        meta = mf.body or {}
+        name = _best_name(meta)
+        ctype = _ctype(meta)
+        seen.append(name or fid)
+        if name.lower() == "data.json" or (ctype == "application/json" and name.lower().endswith(".json")):
+            return fid, name or "data.json"
+    return None
+
+async def _scan_history(client, task_id, entries, seen):
+    """Return ``(history_id, file_id, name)`` for the newest of *entries* with the JSON file.
+
+    *entries* are newest first. File lists of up to ``HISTORY_SCAN_WINDOW``
+    entries are in flight at once but taken in history order, so the newest
+    match wins; the requests still pending are cancelled as soon as it is found.
+    """
+    window = max(1, HISTORY_SCAN_WINDOW)
+    hids = [h.get("Id") for h in entries]
+    pending = {}
+    try:
+        for i, hid in enumerate(hids):
+            for j in range(i, min(i + window, len(hids))):
+                if j not in pending:
+                    pending[j] = asyncio.ensure_future(_find_in_entry(client, task_id, hids[j], seen))
+            found = await pending.pop(i)
+            if found:
+                return (hid, *found)
+    finally:
+        for task in pending.values():
+            task.cancel()
+    return None
+
 async def decode(session, headers, task_data, client_secret):
     """
     Find 'data.json' attached to the task history, download, decrypt, parse, return list.
     Returns None if not found or on failure.
+
+    The file found and the newest history entry scanned are remembered per
+    task; later calls only scan entries added since.
     """
     task_id = task_data["Id"]
     decrypted_list = None
 
+    client = BuildiumClient(session, headers)
+    located = cache.get_cache("task_data_files")
+    cache_key = cache.account_key(headers, task_id)
+
     try:
         # 1) Get history (newest first)
-        url_hist = f"https://api.buildium.com/v1/tasks/{task_id}/history"
-        async with semaphore, throttle:
-            async with session.get(url_hist, headers=headers) as resp:
-                if resp.status != 200:
-                    logging.error(f"history GET failed: {resp.status} {await resp.text()}")
-                    return None
-                history = await resp.json()
-            try:
-                history.sort(key=lambda h: h.get("Date") or h.get("CreatedDate") or "", reverse=True)
-            except Exception:
-                pass
-
-            chosen_hid = None
-            chosen_fid = None
-            chosen_name = None
-            seen = []
-
-            # 2) Walk entries; use /history/{hid}/files for names, else fall back to /files/{id}
-            for h in history:
-                hid = h.get("Id")
-                files_url = f"https://api.buildium.com/v1/tasks/{task_id}/history/{hid}/files"
-                async with semaphore, throttle:
-                    async with session.get(files_url, headers=headers) as rf:
-                        if rf.status != 200:
-                            logging.warning(f"files GET {hid} failed: {rf.status} {await rf.text()}")
-                            continue
-                        files = await rf.json()  # list of dicts; may or may not include names
-
-                # First pass: try to match data.json by any name field present
-                for f in files:
-                    name = _best_name(f)
-                    seen.append(name or f.get("Id"))
-                    if name.lower() == "data.json":
-                        chosen_hid = hid
-                        chosen_fid = f.get("Id")
-                        chosen_name = name
-                        break
-                if chosen_fid:
-                    break
-
-                # Second pass: some schemas omit names; fall back to metadata per file id
-                for f in files:
-                    fid = f.get("Id")
-                    if not fid:
-                        continue
-                    meta_url = f"https://api.buildium.com/v1/files/{fid}"
-                    async with semaphore, throttle:
-                        async with session.get(meta_url, headers=headers) as mf:
-                            if mf.status != 200:
-                                continue
-                            meta = await mf.json()
-                    name = _best_name(meta)
-                    ctype = _ctype(meta)
-                    seen.append(name or fid)
-                    if name.lower() == "data.json" or (ctype == "application/json" and name.lower().endswith(".json")):
-                        chosen_hid = hid
-                        chosen_fid = fid
-                        chosen_name = name or "data.json"
-                        break
-                if chosen_fid:
-                    break
-
-            if not chosen_fid:
-                logging.error(f"No JSON file found on task {task_id}. Seen files: {seen}")
-                return None
+        hist_resp = await client.get_task_history(task_id)
+        if hist_resp.status != 200:
+            logging.error(f"history GET failed: {hist_resp.status} {hist_resp.body}")
+            return None
+        history = hist_resp.body or []
+        try:
+            history.sort(key=lambda h: h.get("Date") or h.get("CreatedDate") or "", reverse=True)
+        except Exception:
+            pass
+
+        # 2) Scan the entries added since the last scan of this task (all of
+        # them the first time); use /history/{hid}/files for names, else /files/{id}
+        known = located.get(cache_key)  # (found, newest history id scanned)
+        entries = history
+        if known is not None:
+            ids = [h.get("Id") for h in history]
+            if known[1] in ids and known[0][0] in ids:
+                entries = history[:ids.index(known[1])]
+            else:
+                known = None
+        seen = []
+        found = await _scan_history(client, task_id, entries, seen)
+        if found is None and known is not None:
+            found = known[0]
+        if found is None:
+            logging.error(f"No JSON file found on task {task_id}. Seen files: {seen}")
+            return None
+        chosen_hid, chosen_fid, chosen_name = found
+        if history:
+            located.set(cache_key, (found, history[0].get("Id")))
 
         logging.info(f"Selected file: {chosen_name} (id={chosen_fid}) from history {chosen_hid}")
 
         # 3) Get download URL
-        url_dl_req = f"https://api.buildium.com/v1/tasks/{task_id}/history/{chosen_hid}/files/{chosen_fid}/downloadrequest"
-        async with semaphore, throttle:
-            async with session.post(url_dl_req, headers=headers, json={}) as dr:
-                if dr.status not in (200, 201):
-                    logging.error(f"downloadrequest POST failed: {dr.status} {await dr.text()}")
-                    return None
-                dl = await dr.json()
-                download_url = dl.get("DownloadUrl")
-                if not download_url:
-                    logging.error(f"No DownloadUrl in response: {dl}")
-                    return None
+        dr = await client.request_task_file_download(task_id, chosen_hid, chosen_fid)
+        if dr.status not in (200, 201):
+            logging.error(f"downloadrequest POST failed: {dr.status} {dr.body}")
+            located.invalidate(cache_key)
+            return None
+        dl = dr.body or {}
+        download_url = dl.get("DownloadUrl")
+        if not download_url:
+            logging.error(f"No DownloadUrl in response: {dl}")
+            return None
 
         # 4) Download bytes
-        async with semaphore, throttle:
-            async with session.get(download_url) as df:
-                if df.status != 200:
-                    logging.error(f"download GET failed: {df.status} {await df.text()}")
-                    return None
-                data_bytes = await df.read()
+        df = await client.download(download_url)
+        if df.status != 200:
+            logging.error(f"download GET failed: {df.status} {df.body[:300] if df.body else ''}")
+            return None
+        data_bytes = df.body
 
         # 5) Decrypt & parse
         tmp_dir = tempfile.gettempdir()
@@ -1,4 +1,5 @@
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import io
@@ -7,8 +8,14 @@ import logging
 import os
 from pathlib import Path
 import re
+import asyncio
+from functools import lru_cache
 
-today = datetime.datetime.today().strftime("%d/%m/%Y")
+import pdf_split
+import workers
+
+# Leases rendered per worker call; larger batches amortise the IPC overhead
+N1_RENDER_BATCH_SIZE = int(os.getenv("N1_RENDER_BATCH_SIZE", "20"))
 
 def formatdate(date):
     # Parse the input string into a datetime object
@@ -19,16 +26,13 @@ def formatdate(date):
     return date
 
 def create_text_overlay(data):
-    """Create a text overlay with the provided data at specified coordinates.
+    """Draw the lease-specific fields of the first N1 page.
 
-    Returns a ``BytesIO`` stream positioned at the beginning.
+    Returns a ``BytesIO`` holding a one-page PDF positioned at the beginning.
     """
-    global today
     packet = io.BytesIO()
     c = canvas.Canvas(packet, pagesize=letter)
-    
 
-    # First page content
     c.setFont("Helvetica", 9)
     c.drawString(31, 671, data['alltenantnames'])  # Tenant's name
     c.drawString(31, 652, data['address'])  # Tenant's address
@@ -49,41 +53,99 @@ def create_text_overlay(data):
         if data['agitype'] == "Not Approved":
             c.drawString(162, 148, "X")   
 
-    # End of first page
-    c.showPage()  # End the first page and move to the second page
+    c.save()
+    packet.seek(0)
+    return packet
 
-    # Second page content
+@lru_cache(maxsize=4)
+def date_overlay(date_str):
+    """Second-page overlay (signature date); identical for every notice on a day."""
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=letter)
     c.setFont("Helvetica", 14)
-    today = datetime.datetime.today().strftime("%d / %m / %Y")
-    c.drawString(320, 287, today)  # Today's date on the second page
-
-    # Finalize and return the buffer
+    c.drawString(320, 287, date_str)  # Today's date on the second page
     c.save()
     packet.seek(0)
-    return packet
+    return PdfReader(packet)
 
-def merge_pdfs(original_pdf, overlay_pdf_stream):
-    """Merge the text overlay with the original PDF in-memory.
+class N1Template:
+    """The N1 template, parsed once per process.
 
-    ``original_pdf`` is a path to the template, ``overlay_pdf_stream`` is a
-    ``BytesIO`` from :func:`create_text_overlay`.
-    Returns a ``BytesIO`` containing the merged PDF.
+    Each template page is wrapped as a Form XObject that keeps the original
+    content and resources. A notice page is a blank page that paints the form
+    and then the small overlay on top, so nothing is merged or re-parsed per
+    lease. Pages added to the same ``PdfWriter`` reference one copy of the
+    template fonts and images, since the writer de-duplicates objects it
+    clones from the same source.
     """
-    reader = PdfReader(original_pdf)
-    overlay_reader = PdfReader(overlay_pdf_stream)
-    writer = PdfWriter()
 
-    # Merge overlay with each page
-    for i, page in enumerate(reader.pages):
-        overlay_page = overlay_reader.pages[i]  # Use the corresponding overlay page
-        page.merge_page(overlay_page)
-        writer.add_page(page)
-
-    # Save the merged PDF to an in-memory buffer and return
-    output_stream = io.BytesIO()
-    writer.write(output_stream)
-    output_stream.seek(0)
-    return output_stream
+    TEMPLATE_NAME = "/N1Tpl"
+
+    def __init__(self, path):
+        self.path = str(path)
+        # Both documents must stay alive: writers key cloned objects by id(source)
+        self._reader = PdfReader(self.path)
+        self._forms = PdfWriter()
+        self.pages = []
+        for page in self._reader.pages:
+            contents = page.get_contents()
+            if isinstance(contents, ArrayObject):
+                data = b"\n".join(part.get_object().get_data() for part in contents)
+            else:
+                data = contents.get_data() if contents is not None else b""
+            content = DecodedStreamObject()
+            content.set_data(data)
+            form = content.flate_encode()  # returns a bare stream; keys go on after
+            form.update({
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Form"),
+                NameObject("/FormType"): NumberObject(1),
+                NameObject("/BBox"): page.mediabox,
+                NameObject("/Resources"): page.raw_get("/Resources"),
+            })
+            paint = DecodedStreamObject()
+            paint.set_data(f"q {self.TEMPLATE_NAME} Do Q\n".encode())
+            self.pages.append((
+                self._forms._add_object(form),
+                self._forms._add_object(paint),
+                page.mediabox,
+            ))
+
+    def stamp(self, writer, overlays):
+        """Append one notice to *writer*; ``overlays`` holds one overlay page per template page."""
+        for (form, paint, box), overlay in zip(self.pages, overlays):
+            page = PageObject.create_blank_page(None, box.width, box.height)
+            resources = DictionaryObject()
+            for key, value in overlay.get("/Resources", DictionaryObject()).items():
+                resources[NameObject(key)] = value
+            xobjects = DictionaryObject(resources.get("/XObject", DictionaryObject()))
+            xobjects[NameObject(self.TEMPLATE_NAME)] = form
+            resources[NameObject("/XObject")] = xobjects
+            page[NameObject("/Resources")] = resources
+
+            contents = ArrayObject([paint])
+            overlay_contents = overlay.raw_get("/Contents")
+            if isinstance(overlay_contents.get_object(), ArrayObject):
+                contents.extend(overlay_contents.get_object())
+            else:
+                contents.append(overlay_contents)
+            page[NameObject("/Contents")] = contents
+            writer.add_page(page)
+
+_template = None
+
+def get_template():
+    """Return the process-wide parsed template (located and parsed on first use)."""
+    global _template
+    if _template is None:
+        # find template in image/package, NOT /tmp
+        template_path = _resolve_template_path()
+        if not template_path:
+            msg = "N1.pdf template not found. Set N1_TEMPLATE_PATH or include templates/N1.pdf in the image."
+            logging.error(msg)
+            raise FileNotFoundError(msg)
+        _template = N1Template(template_path)
+    return _template
 
 def formatdollaramount(amount):
     amount = '{:,.2f}'.format(amount)
@@ -133,32 +195,138 @@ def _resolve_template_path() -> Path:
 
     return None
 
-async def create(leaseid, data):
+def _notice_filename(data):
     address = (data.get('address') or '').split(',', 1)[0]  # "1 - 1 Smith Road"
     address_safe = _sanitize_filename(address)
-
     dt = datetime.datetime.strptime(data['increasedate'], "%Y-%m-%d")
     datename = dt.strftime("%B %d, %Y")
+    return f"N1 for Apartment {address_safe} Effective {datename}.pdf"
+
+def _stamp_notice(writer, template, overlay):
+    """Add one lease's notice pages to *writer* from its drawn ``overlay`` PDF bytes."""
+    today = datetime.datetime.today().strftime("%d / %m / %Y")
+    overlays = [PdfReader(io.BytesIO(overlay)).pages[0], date_overlay(today).pages[0]]
+    template.stamp(writer, overlays)
 
-    # find template in image/package, NOT /tmp
-    template_path = _resolve_template_path()
-    if not template_path:
-        msg = "N1.pdf template not found. Set N1_TEMPLATE_PATH or include templates/N1.pdf in the image."
-        logging.error(msg)
-        raise FileNotFoundError(msg)
+def _write(writer):
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
 
-    # 1) create overlay in memory
-    overlay_buffer = create_text_overlay(data)
+def render(data):
+    """Render the N1 for one lease (blocking).
 
-    # 2) merge overlay onto template in memory
-    merged_buffer = merge_pdfs(str(template_path), overlay_buffer)
+    Returns ``(filename, pdf_bytes, overlay)``; ``overlay`` is the lease's
+    drawn first-page fields, which :func:`render_summary` reuses so the
+    notice is drawn only once.
+    """
+    filename = _notice_filename(data)
+    overlay = create_text_overlay(data).getvalue()
+    writer = PdfWriter()
+    _stamp_notice(writer, get_template(), overlay)
+    return filename, _write(writer), overlay
 
-    # 3) return sanitized filename and bytes
-    filename = f"N1 for Apartment {address_safe} Effective {datename}.pdf"
-    return filename, merged_buffer.getvalue()
+def render_batch(items):
+    """Render ``[(key, data), ...]`` in one worker call.
 
-async def create_summary_page(summary_data, buildingname, countbuilding, date):
-    """Create a summary page and return the BytesIO object containing the summary."""
+    ``key`` (a lease id or list index) is passed back untouched. Returns
+    ``[(key, filename, pdf_bytes, overlay, error), ...]`` in input order; a
+    lease that fails has ``None`` bytes and overlay and the error message,
+    so one bad record does not lose the rest of the batch.
+    """
+    out = []
+    for key, data in items:
+        try:
+            filename, pdf_bytes, overlay = render(data)
+            out.append((key, filename, pdf_bytes, overlay, None))
+        except Exception as e:
+            out.append((key, None, None, None, f"{type(e).__name__}: {e}"))
+    return out
+
+def render_summary(items, buildingname, date_label, size_limit=None):
+    """Render a building's summary document: distribution list, then every notice.
+
+    ``items`` is ``[(lease, overlay), ...]`` for the notices that
+    :func:`render_batch` rendered, in the order they should appear, with
+    the lease records of the increase file and the overlays drawn for them.
+    Notices are stamped from those overlays into a single writer and the
+    distribution list pages are inserted in front of them. Returns the
+    document as one PDF or, when it exceeds ``size_limit``, several planned
+    by :mod:`pdf_split` (a notice is never split between parts). Returns
+    ``[]`` when there are no items.
+    """
+    if not items:
+        return []
+    template = get_template()
+    writer = PdfWriter()
+    spans = []
+    for _, overlay in items:
+        first = len(writer.pages)
+        _stamp_notice(writer, template, overlay)
+        spans.append((first, len(writer.pages) - first))
+
+    summary_data = [lease for lease, _ in items]
+    summary = PdfReader(draw_summary_page(summary_data, buildingname, len(summary_data), date_label))
+    for i, page in enumerate(summary.pages):
+        writer.insert_page(page, i)
+    summary_pages = len(summary.pages)
+
+    document = _write(writer)
+    if not size_limit or len(document) <= size_limit:
+        return [document]
+    del document
+    pages = writer.pages
+    units = [[pages[i] for i in range(summary_pages)]] + [
+        [pages[i] for i in range(summary_pages + first, summary_pages + first + count)]
+        for first, count in spans
+    ]
+    return pdf_split.split_units(units, size_limit)
+
+async def create_summary(items, buildingname, date_label, size_limit=None):
+    """Run :func:`render_summary` in the PDF worker pool."""
+    return await workers.run_in_process(render_summary, items, buildingname, date_label, size_limit)
+
+async def create_many(items, batch_size=None, max_pending=None, admit=None):
+    """Render many N1s in the worker pool, yielding each batch as it finishes.
+
+    ``items`` is a list of ``(key, data)``; batches of
+    ``N1_RENDER_BATCH_SIZE`` are rendered concurrently across the pool and
+    yielded in completion order as lists of ``render_batch`` results. At
+    most ``max_pending`` batches (default: all) are submitted at once, and
+    ``admit``, when given, is awaited before each submission so the caller
+    can hold rendering back, e.g. while too many PDFs await upload.
+    """
+    async def render_in_pool(batch):
+        try:
+            return await workers.run_in_process(render_batch, batch)
+        except Exception as e:
+            # A crashed worker fails the whole batch; report each lease
+            return [(key, None, None, None, f"{type(e).__name__}: {e}") for key, _ in batch]
+
+    size = max(1, batch_size or N1_RENDER_BATCH_SIZE)
+    batches = [items[i:i + size] for i in range(0, len(items), size)]
+    window = max(1, max_pending or len(batches))
+    remaining = iter(batches)
+    pending = set()
+    try:
+        while True:
+            for batch in remaining:
+                if admit is not None:
+                    await admit()
+                pending.add(asyncio.ensure_future(render_in_pool(batch)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+def draw_summary_page(summary_data, buildingname, countbuilding, date):
+    """Draw the distribution list for a building and return it as a PDF in a ``BytesIO``."""
     packet = io.BytesIO()
     c = canvas.Canvas(packet, pagesize=letter)
 
@@ -2,96 +2,43 @@ import asyncio
 from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
+import os
 import re
+import time
 
-from rate_limiter import semaphore, throttle
-
-building_notes_cache = {}
-
-async def fetch_data(session, url, headers, params=None):
-    """Fetch data asynchronously with rate limiting and semaphore control."""
-    logging.info("Fetching Data From Buildium")
-    try:
-        # Limit concurrent requests using semaphore
-        async with semaphore, throttle:
-            while True:
-                async with session.get(url, headers=headers, params=params) as response:
-                    status_code = response.status
-                    data = await response.json()
-
-                    if status_code == 429:
-                        logging.info("Rate limit reached, sleeping for 0.201 seconds")
-                        await asyncio.sleep(0.201)  # Rate limit sleep for 429 status
-                        continue  # Retry the request after sleeping
-
-                    # Handle both dict and list responses
-                    if isinstance(data, (dict, list)):
-                        return data  # Return data if it's a dict or list
-                    else:
-                        logging.info(f"Unexpected response format: {data}")
-                        return {}  # Return an empty dict if the format is invalid
-
-    except Exception as e:
-        logging.info(f"Error fetching data from {url}: {e}")
-        return {}
-
-
+from buildium_client import BuildiumClient
+import reference_data
 
 async def get_building_notes(session, building_id, headers):
-    """Retrieve notes for a building to check for AGI status asynchronously, with caching."""
-    # Check if the building notes are already in the cache
-    if building_id in building_notes_cache:
-        logging.info(f"Using cached notes for building {building_id}")
-        return building_notes_cache[building_id]
-
-    # If not cached, fetch the notes from the API
-    url = f"https://api.buildium.com/v1/rentals/{building_id}/notes"
-    notes = await fetch_data(session, url, headers)
-
-    # Cache the result to avoid redundant API calls
-    building_notes_cache[building_id] = notes
-
-    return notes
+    """Retrieve notes for a building to check for AGI status, served from the reference cache."""
+    notes = await reference_data.get_rental_notes(session, headers, building_id)
+    return notes if notes is not None else {}
 
 
 # Example of how to handle the response in other functions
 async def get_lease_notes(session, lease_id, headers):
     """Retrieve notes for a specific lease asynchronously."""
-    url = f"https://api.buildium.com/v1/leases/{lease_id}/notes"
-    notes = await fetch_data(session, url, headers)
+    notes = (await BuildiumClient(session, headers).get_lease_notes(lease_id)).data({})
     if not notes:  # Handle empty or invalid responses
         logging.info(f"No notes found for lease {lease_id}")
     return notes
 
 async def get_unit_details(session, unit_id, headers):
     """Retrieve details of the rental unit, including market rent asynchronously."""
-    url = f"https://api.buildium.com/v1/rentals/units/{unit_id}"
-    return await fetch_data(session, url, headers)
-
-async def get_leases(session, headers, increase_effective_date):
-    """Fetch leases asynchronously with pagination using offset."""
-    url = "https://api.buildium.com/v1/leases"
-    all_leases = []
-    offset = 0
-    limit = 1000
-
-    while True:
-        params = {
-            'leasestatuses': "Active",
-            'leasedateto': increase_effective_date.strftime('%Y-%m-%d'),
-            'limit': limit,
-            'offset': offset,
-        }
-
-        leases = await fetch_data(session, url, headers, params=params)
-        if not leases:
-            break
+    unit = await reference_data.get_unit(session, headers, unit_id)
+    return unit if unit is not None else {}
 
-        all_leases.extend(leases)
-        offset += limit
+def _lease_params(increase_effective_date):
+    return {
+        'leasestatuses': "Active",
+        'leasedateto': increase_effective_date.strftime('%Y-%m-%d'),
+    }
 
-    logging.info(f"Fetched {len(all_leases)} leases")
-    return all_leases
+async def iter_leases(session, headers, increase_effective_date, max_pending=None):
+    """Yield ``(offset, page)`` as lease pages arrive so processing can start on the first one."""
+    client = BuildiumClient(session, headers)
+    async for offset, page in client.iter_leases(_lease_params(increase_effective_date), max_pending=max_pending):
+        yield offset, page
 
 def parse_date(date_str):
     """Parse date strings into datetime objects, handling potential errors."""
@@ -176,8 +123,7 @@ def parse_lease_agi_notes(notes):
 async def getrecurringcharges(leaseid, session, headers):
     try:
         """Retrieve details of the recurring charges asynchronously."""
-        url = f"https://api.buildium.com/v1/leases/{leaseid}/recurringtransactions"
-        return await fetch_data(session, url, headers)
+        return (await BuildiumClient(session, headers).get_lease_recurring_transactions(leaseid)).data({})
     except Exception as e:
             logging.error(f"Error fetching recurring transactions: {e}")
             return None
@@ -242,160 +188,386 @@ def calculate_total_increase(building_agi_info, guideline_increase, lease_agi_in
 
     return total_percentage, calculationpercentage
 
-async def process_single_lease(session, lease, headers, increase_effective_date, guideline_increase, building_agi_info):
-    """Process a single lease asynchronously, checking eligibility and fetching required details."""
+def is_lease_in_scope(lease, increase_effective_date):
+    """A lease is a candidate when it ends before the increase date and has rent."""
+    lease_end_date = datetime.strptime(lease['LeaseToDate'], '%Y-%m-%d')
+    return lease_end_date <= increase_effective_date - timedelta(days=1) and lease['AccountDetails']['Rent'] > 0
+
+async def _no_notes():
+    return []
+
+async def fetch_lease_details(session, lease, headers, building_agi_info):
+    """Fetch the lease notes, unit and recurring charges of a lease concurrently.
+
+    None of the three requests depends on another. A piece that could not be
+    fetched is returned as ``None`` so the caller can report the lease as
+    incomplete instead of guessing.
+    """
+    logging.info(f"Fetching notes, unit and charges for Lease Id: {lease['Id']}")
+    notes, unit_details, recurringchargesinfo = await asyncio.gather(
+        # Only fetch lease notes if the building has AGI information
+        get_lease_notes(session, lease['Id'], headers) if building_agi_info else _no_notes(),
+        get_unit_details(session, lease['UnitId'], headers),
+        getrecurringcharges(lease['Id'], session, headers),
+        return_exceptions=True,
+    )
+    return {
+        'notes': notes if isinstance(notes, list) else None,
+        'unit': unit_details if isinstance(unit_details, dict) and 'PropertyId' in unit_details else None,
+        'recurringcharges': recurringchargesinfo if isinstance(recurringchargesinfo, list) else None,
+    }
+
+def _tenant_fields(lease):
+    """Return (tenantname, alltenantnames, tenantids, address) for a lease."""
+    tenant_namesdata = []
+    tenantidslist = []
+    for tenant in lease['CurrentTenants']:
+        tenant_namesdata.append(f"{tenant['FirstName']} {tenant['LastName']}")
+        tenant_names = str(tenant_namesdata).removeprefix("['").removesuffix("']").replace("'","")
+        tenantids = tenant['Id']
+        tenantidslist.append(tenantids)
+
+    tenant_address_line1 = lease['CurrentTenants'][0]['Address']['AddressLine1']
+    tenant_address_city = lease['CurrentTenants'][0]['Address']['City']
+    tenant_address_state = lease['CurrentTenants'][0]['Address']['State']
+    tenant_address_postalcode = lease['CurrentTenants'][0]['Address']['PostalCode']
+    address = f"{tenant_address_line1}, {tenant_address_city}, {tenant_address_state} {tenant_address_postalcode}"
+
+    tenantname = lease['CurrentTenants'][0]['FirstName'] + ' ' + lease['CurrentTenants'][0]['LastName']
+    return tenantname, tenant_names, tenantidslist, address
+
+_DETAIL_LABELS = {'notes': 'lease notes', 'unit': 'unit', 'recurringcharges': 'recurring charges'}
+
+def incomplete_lease_result(lease, missing, building_agi_info, guideline_increase):
+    """Record for a lease whose details could not all be fetched.
+
+    The lease is carried through as ineligible, with the missing pieces in
+    ``reason``, so it shows up in the review report instead of vanishing.
+    """
+    try:
+        tenantname, tenant_names, tenantidslist, address = _tenant_fields(lease)
+    except Exception:
+        tenantname, tenant_names, tenantidslist, address = "", "", [], ""
+    return {
+        'leaseid': lease['Id'],
+        'buildingid': lease['PropertyId'],
+        'buildingname' : f"Building {lease['PropertyId']}",
+        'unitnumber': lease.get('UnitNumber') or "",
+        'address' : address,
+        'tenantname': tenantname,
+        'alltenantnames' : tenant_names,
+        'tenantids' : tenantidslist,
+        'rent': 0,
+        'recurringinfo' : [],
+        'marketrent': 0,
+        'eligible': False,
+        'total_increase_percentage': guideline_increase,
+        'agi': None,
+        'agiinfo' : building_agi_info,
+        'agitype' : None,
+        'reason' : f"Incomplete data: missing {', '.join(missing)}",
+        'calculationpercentage' : guideline_increase,
+        'incomplete': True,
+        'missing': missing,
+    }
+
+async def evaluate_lease(lease, details, increase_effective_date, guideline_increase, building_agi_info):
+    """Build the increase/eligibility record for a lease from its fetched details."""
+    missing = [label for key, label in _DETAIL_LABELS.items() if details.get(key) is None]
+    if missing:
+        logging.warning(f"Lease {lease['Id']} is incomplete; missing {', '.join(missing)}")
+        return incomplete_lease_result(lease, missing, building_agi_info, guideline_increase)
+
     eligible = True
     reason = ""
     AGItype = None
-    logging.info(f"Processing Lease Id: {lease['Id']}")
     try:
-        lease_end_date = datetime.strptime(lease['LeaseToDate'], '%Y-%m-%d')
-
-        if lease_end_date <= increase_effective_date - timedelta(days=1) and lease['AccountDetails']['Rent'] > 0:
-            calculationpercentage = guideline_increase
-            lease_agi_info = []
-            Noincrease = False
-
-            # Only process lease notes if the building has AGI information
-            if building_agi_info:
-                notes = await get_lease_notes(session, lease['Id'], headers)
-                logging.info(f"Processing Notes for Lease Id: {lease['Id']}")
-                lease_agi_info, Noincrease = parse_lease_agi_notes(notes)
-                try:
-                    if lease_agi_info:
-                        total_increase_percentage, calculationpercentage = calculate_total_increase(building_agi_info, guideline_increase, lease_agi_info, increase_effective_date)
-                        agi = "Yes"
-                        if any(agi_info['approval_status'] == "Not Approved" for agi_info in building_agi_info):
-                            AGItype = "Not Approved"
-                        else:
-                            AGItype = "Approved"
+        calculationpercentage = guideline_increase
+        lease_agi_info = []
+        Noincrease = False
+
+        # Only process lease notes if the building has AGI information
+        if building_agi_info:
+            notes = details['notes']
+            logging.info(f"Processing Notes for Lease Id: {lease['Id']}")
+            lease_agi_info, Noincrease = parse_lease_agi_notes(notes)
+            try:
+                if lease_agi_info:
+                    total_increase_percentage, calculationpercentage = calculate_total_increase(building_agi_info, guideline_increase, lease_agi_info, increase_effective_date)
+                    agi = "Yes"
+                    if any(agi_info['approval_status'] == "Not Approved" for agi_info in building_agi_info):
+                        AGItype = "Not Approved"
                     else:
-                        total_increase_percentage = guideline_increase
-                        agi = None
-                except Exception as e:
-                    logging.error(f"Error processing AGI: {e}")
-            else:
-                total_increase_percentage = guideline_increase
-                agi = None
+                        AGItype = "Approved"
+                else:
+                    total_increase_percentage = guideline_increase
+                    agi = None
+            except Exception as e:
+                logging.error(f"Error processing AGI: {e}")
+        else:
+            total_increase_percentage = guideline_increase
+            agi = None
 
-            logging.info(f"Processing Unit for Lease Id: {lease['Id']}")
-            unit_details = await get_unit_details(session, lease['UnitId'], headers)
+        unit_details = details['unit']
 
-            try:
-                market_rent = unit_details['MarketRent']
-            except Exception as e:
-                logging.error(f"Error processing marketrent {e}")
-            recurringchargesinfo = await getrecurringcharges(lease['Id'], session, headers)
-            recurringcharges, rent = await processrecurringcharges(recurringchargesinfo)
+        try:
+            market_rent = unit_details['MarketRent']
+        except Exception as e:
+            logging.error(f"Error processing marketrent {e}")
+        recurringchargesinfo = details['recurringcharges']
+        recurringcharges, rent = await processrecurringcharges(recurringchargesinfo)
 
 
-            try:
-                if Noincrease is True:
+        try:
+            if Noincrease is True:
+                eligible = False
+                reason = "No Increase Note"
+            elif lease['MoveOutData'] != [] and len(lease["Tenants"]) == len(lease['MoveOutData']):
+                try:
                     eligible = False
-                    reason = "No Increase Note"
-                elif lease['MoveOutData'] != [] and len(lease["Tenants"]) == len(lease['MoveOutData']):
-                    try:
-                        eligible = False
-                        datetest = "2019-08-24"
-                        datemove = ""  # Initialize datemove with a default value
-                        for date in lease['MoveOutData']:
-                            if date['MoveOutDate'] > datetest:
-                                datetest = date['MoveOutDate']
-                            else:
-                                datemove = date['MoveOutDate']
-                        reason = f"Moving Out {datemove}" if datemove else f"Moving Out {datetest}"
-                    except Exception as e:
-                        logging.error(f"Error processing moveout data {e}")
-                else:
-                    eligible = True
-                tenant_namesdata = []
-                tenantidslist = []
-            except Exception as e:
-                logging.error(f"Error processing eligibility: {e}")
-            # eligible = rent <= market_rent or bool(lease_agi_info) if market_rent != 0 else True
-            logging.info(f" Finished Processing Lease Id: {lease['Id']}")
-            for tenant in lease['CurrentTenants']:
-                tenant_namesdata.append(f"{tenant['FirstName']} {tenant['LastName']}")
-                tenant_names = str(tenant_namesdata).removeprefix("['").removesuffix("']").replace("'","")
-                tenantids = tenant['Id']
-                tenantidslist.append(tenantids)
-
-
-
-            tenant_address_line1 = lease['CurrentTenants'][0]['Address']['AddressLine1']
-            tenant_address_city = lease['CurrentTenants'][0]['Address']['City']
-            tenant_address_state = lease['CurrentTenants'][0]['Address']['State']
-            tenant_address_postalcode = lease['CurrentTenants'][0]['Address']['PostalCode']
-            address = f"{tenant_address_line1}, {tenant_address_city}, {tenant_address_state} {tenant_address_postalcode}"
-
-            return {
-                'leaseid': lease['Id'],
-                'buildingid': unit_details['PropertyId'],
-                'buildingname' : unit_details['BuildingName'],
-                'unitnumber': unit_details['UnitNumber'],
-                'address' : address,
-                'tenantname': lease['CurrentTenants'][0]['FirstName'] + ' ' + lease['CurrentTenants'][0]['LastName'],
-                'alltenantnames' : tenant_names,
-                'tenantids' : tenantidslist,
-                'rent': rent,
-                'recurringinfo' : recurringcharges,
-                'marketrent': market_rent,
-                'eligible': eligible,
-                'total_increase_percentage': total_increase_percentage,
-                'agi': agi,
-                'agiinfo' : building_agi_info,
-                'agitype' : AGItype,
-                'reason' : reason,
-                'calculationpercentage' : calculationpercentage
-            }
-        else:
-            return None
+                    datetest = "2019-08-24"
+                    datemove = ""  # Initialize datemove with a default value
+                    for date in lease['MoveOutData']:
+                        if date['MoveOutDate'] > datetest:
+                            datetest = date['MoveOutDate']
+                        else:
+                            datemove = date['MoveOutDate']
+                    reason = f"Moving Out {datemove}" if datemove else f"Moving Out {datetest}"
+                except Exception as e:
+                    logging.error(f"Error processing moveout data {e}")
+            else:
+                eligible = True
+        except Exception as e:
+            logging.error(f"Error processing eligibility: {e}")
+        # eligible = rent <= market_rent or bool(lease_agi_info) if market_rent != 0 else True
+        logging.info(f" Finished Processing Lease Id: {lease['Id']}")
+        tenantname, tenant_names, tenantidslist, address = _tenant_fields(lease)
+
+        return {
+            'leaseid': lease['Id'],
+            'buildingid': unit_details['PropertyId'],
+            'buildingname' : unit_details['BuildingName'],
+            'unitnumber': unit_details['UnitNumber'],
+            'address' : address,
+            'tenantname': tenantname,
+            'alltenantnames' : tenant_names,
+            'tenantids' : tenantidslist,
+            'rent': rent,
+            'recurringinfo' : recurringcharges,
+            'marketrent': market_rent,
+            'eligible': eligible,
+            'total_increase_percentage': total_increase_percentage,
+            'agi': agi,
+            'agiinfo' : building_agi_info,
+            'agitype' : AGItype,
+            'reason' : reason,
+            'calculationpercentage' : calculationpercentage
+        }
 
     except Exception as e:
         logging.error(f"Error processing lease {lease['Id']}: {e}")
         return None
 
+
+class BuildingAgiDirectory:
+    """Parsed building AGI notes keyed by property id.
+
+    Notes for a property are fetched at most once (single-flight): the
+    first request starts a task and every later lookup for the same
+    property awaits that task. Lookups of already-loaded properties are a
+    plain dict hit.
+    """
+
+    def __init__(self, session, headers):
+        self._session = session
+        self._headers = headers
+        self.by_property = {}
+        self._inflight = {}
+
+    def prefetch(self, property_ids):
+        """Start fetching notes for every distinct property in *property_ids*."""
+        for building_id in set(property_ids):
+            self._start(building_id)
+
+    def _start(self, building_id):
+        if building_id in self.by_property or building_id in self._inflight:
+            return
+        self._inflight[building_id] = asyncio.ensure_future(self._load(building_id))
+
+    async def _load(self, building_id):
+        try:
+            building_notes = await get_building_notes(self._session, building_id, self._headers)
+            agi_info = parse_building_agi_notes(building_notes)
+        except Exception as e:
+            logging.error(f"Error loading notes for building {building_id}: {e}")
+            agi_info = []
+        self.by_property[building_id] = agi_info
+        self._inflight.pop(building_id, None)
+        return agi_info
+
+    async def get(self, building_id):
+        """Return the parsed AGI info for *building_id*, fetching it if needed."""
+        if building_id in self.by_property:
+            return self.by_property[building_id]
+        self._start(building_id)
+        return await asyncio.shield(self._inflight[building_id])
+
+    def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+
+# -------------------- streaming pipeline --------------------
+# Worker counts per stage and the size of the queues between stages. The
+# queues are bounded so that page fetching slows down when later stages fall
+# behind, which keeps memory flat regardless of portfolio size.
+PIPELINE_QUEUE_SIZE = int(os.getenv("LEASE_PIPELINE_QUEUE_SIZE", "200"))
+PIPELINE_PAGES_AHEAD = int(os.getenv("LEASE_PIPELINE_PAGES_AHEAD", "4"))
+ENRICH_WORKERS = int(os.getenv("LEASE_PIPELINE_ENRICH_WORKERS", "16"))
+DETAIL_WORKERS = int(os.getenv("LEASE_PIPELINE_DETAIL_WORKERS", "16"))
+ELIGIBILITY_WORKERS = int(os.getenv("LEASE_PIPELINE_ELIGIBILITY_WORKERS", "1"))
+
+_STOP = object()
+
+async def _run_together(*coros):
+    """Await *coros* concurrently; if one raises, cancel and await the rest, then re-raise.
+
+    Unlike a plain ``gather``, no sibling is left running (and calling the
+    API, or blocked on a queue nobody drains) after the first failure.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _run_stage(name, inbox, outbox, workers, downstream_workers, handle):
+    """Run *workers* consumers of *inbox*, forwarding non-None results to *outbox*.
+
+    Each consumer exits on a ``_STOP`` marker; once all have exited, one
+    marker per downstream worker is forwarded so the next stage drains too.
+    A failing item is logged and dropped rather than stalling the pipeline.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _STOP:
+                return
+            try:
+                result = await handle(item)
+            except Exception as e:
+                logging.error(f"Lease pipeline stage '{name}' failed: {e}")
+                continue
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+
+    await _run_together(*(worker() for _ in range(workers)))
+    if outbox is not None:
+        for _ in range(downstream_workers):
+            await outbox.put(_STOP)
+
 async def gather_leases_for_increase(session, headers, guideline_increase):
-    """Main function to gather and process leases asynchronously using a shared session."""
+    """Gather and evaluate leases through a bounded, streaming pipeline.
+
+    Stages: page fetch -> building-notes enrichment -> per-lease detail
+    fetch -> eligibility. Leases are evaluated while later pages are still
+    being fetched.
+    """
     today = datetime.today()
-    buildingidnotetest = 0
-    building_agi_info = {}
     effective_date = datetime(today.year, today.month, 1) + timedelta(days=125)
     effective_date = datetime(effective_date.year, effective_date.month, 1)
     increase_effective_date = effective_date
     guideline_increase = float(guideline_increase)
 
-    leases = await get_leases(session, headers, increase_effective_date)
-    logging.info("Leases Fetched")
+    enrich_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    detail_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    eligibility_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    buildings = BuildingAgiDirectory(session, headers)
+    results = []
+    started = time.monotonic()
+    counts = {'leases': 0}
+
+    async def fetch_pages():
+        # Stage 1: pages -> in-scope leases, tagged with their API position
+        async for offset, page in iter_leases(session, headers, increase_effective_date,
+                                              max_pending=PIPELINE_PAGES_AHEAD):
+            in_scope = []
+            for i, lease in enumerate(page):
+                counts['leases'] += 1
+                try:
+                    if is_lease_in_scope(lease, increase_effective_date):
+                        in_scope.append((offset + i, lease))
+                except Exception as e:
+                    logging.error(f"Error processing lease {lease.get('Id')}: {e}")
+            # Building notes for the whole page load in the background
+            buildings.prefetch(lease['PropertyId'] for _, lease in in_scope)
+            for item in in_scope:
+                await enrich_q.put(item)
+        for _ in range(ENRICH_WORKERS):
+            await enrich_q.put(_STOP)
+
+    async def enrich(item):
+        # Stage 2: attach parsed building AGI notes
+        seq, lease = item
+        return seq, lease, await buildings.get(lease['PropertyId'])
+
+    async def fetch_details(item):
+        # Stage 3: lease notes, unit and recurring charges
+        seq, lease, building_agi_info = item
+        logging.info(f"Processing Lease Id: {lease['Id']}")
+        details = await fetch_lease_details(session, lease, headers, building_agi_info)
+        return seq, lease, building_agi_info, details
+
+    async def evaluate(item):
+        # Stage 4: eligibility
+        seq, lease, building_agi_info, details = item
+        result = await evaluate_lease(lease, details, increase_effective_date, guideline_increase, building_agi_info)
+        if result:
+            if not results:
+                logging.info(f"First lease evaluated after {time.monotonic() - started:.1f}s")
+            results.append((seq, result))
+        return None
 
+    try:
+        # A failing stage cancels the others, so none is left blocked on a queue
+        await _run_together(
+            fetch_pages(),
+            _run_stage("enrich", enrich_q, detail_q, ENRICH_WORKERS, DETAIL_WORKERS, enrich),
+            _run_stage("details", detail_q, eligibility_q, DETAIL_WORKERS, ELIGIBILITY_WORKERS, fetch_details),
+            _run_stage("eligibility", eligibility_q, None, ELIGIBILITY_WORKERS, 0, evaluate),
+        )
+    finally:
+        buildings.close()
+    logging.info(
+        f"Leases Fetched: {counts['leases']} leases, {len(results)} evaluated "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+    # Keep API order within each building regardless of completion order
+    results.sort(key=lambda item: item[0])
     leases_by_building = defaultdict(list)
-
-    if leases:
-        tasks = []
-        for lease in leases:
-            building_id = lease['PropertyId']
-            if building_id != buildingidnotetest:
-                building_notes = await get_building_notes(session, building_id, headers)
-                building_agi_info = parse_building_agi_notes(building_notes)
-                buildingidnotetest = building_id
-
-            tasks.append(
-                process_single_lease(
-                    session,
-                    lease,
-                    headers,
-                    increase_effective_date,
-                    guideline_increase,
-                    building_agi_info,
-                )
-            )
-
-        lease_results = await asyncio.gather(*tasks)
-
-        for result in lease_results:
-            if result:
-                leases_by_building[result['buildingid']].append(result)
-        leases_by_building = {k: leases_by_building[k] for k in sorted(leases_by_building, reverse=True)}
+    for _, result in results:
+        leases_by_building[result['buildingid']].append(result)
+
+    incomplete = [r for _, r in results if r.get('incomplete')]
+    if incomplete:
+        # Borrow the building name from a complete lease in the same building
+        # (or from the rental record when the whole building is incomplete)
+        names = {r['buildingid']: r['buildingname'] for _, r in results if not r.get('incomplete')}
+        unnamed = {r['buildingid'] for r in incomplete} - names.keys()
+        if unnamed:
+            rentals = await reference_data.get_rentals(session, headers, unnamed)
+            names.update({b: rental['Name'] for b, rental in rentals.items() if rental and rental.get('Name')})
+        for r in incomplete:
+            r['buildingname'] = names.get(r['buildingid'], r['buildingname'])
+        logging.warning(
+            f"{len(incomplete)} lease(s) could not be fully fetched and are marked ineligible: "
+            f"{[r['leaseid'] for r in incomplete]}"
+        )
+    leases_by_building = {k: leases_by_building[k] for k in sorted(leases_by_building, reverse=True)}
 
     return leases_by_building, increase_effective_date
 
@@ -1,26 +1,13 @@
 import aiohttp
 
-from rate_limiter import semaphore, throttle
+from buildium_client import BuildiumClient
 
 
 async def get_task_data(session: aiohttp.ClientSession, task_id, headers):
     """Retrieve task data from Buildium API asynchronously using a shared session."""
-    # Replace with the actual Buildium API base URL
-    base_url = "https://api.buildium.com/v1"
-
-    # Construct the URL for retrieving a specific task
-    url = f"{base_url}/tasks/{task_id}"
-
-    try:
-        async with semaphore, throttle:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    print(f"Retrieved task {task_id}: {response.status}")
-                    return await response.json()
-                else:
-                    text = await response.text()
-                    print(f"Failed to retrieve task {task_id}: {response.status} - {text}")
-                    return None
-    except aiohttp.ClientError as e:
-        print(f"Error retrieving task {task_id}: {e}")
-        return None
+    response = await BuildiumClient(session, headers).get_task(task_id)
+    if response.status == 200:
+        print(f"Retrieved task {task_id}: {response.status}")
+        return response.body
+    print(f"Failed to retrieve task {task_id}: {response.status} - {response.body}")
+    return None
@@ -0,0 +1,170 @@
+"""Persistent cache of Buildium GET responses with conditional revalidation.
+
+Portfolio data barely changes between the "Increase Notices" run and the
+later generation run, so GET bodies are kept on disk together with their
+``ETag``/``Last-Modified`` validators. The next identical request is sent
+with ``If-None-Match``/``If-Modified-Since``; a ``304 Not Modified`` answer
+is served from the stored body without downloading it again. Responses
+without validators are not stored, since they could never be revalidated.
+
+The cache is off unless ``BUILDIUM_HTTP_CACHE_DIR`` is set. Entries are keyed
+by Buildium client id, URL and query parameters, so accounts never share
+responses, and entries unused for ``BUILDIUM_HTTP_CACHE_MAX_AGE_DAYS``
+(default 60) are pruned when the cache is opened.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, NamedTuple, Optional
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+HTTP_CACHE_DIR = os.getenv("BUILDIUM_HTTP_CACHE_DIR")
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("BUILDIUM_HTTP_CACHE_MAX_AGE_DAYS", "60"))
+
+# Response headers worth replaying on a cache hit
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "X-Total-Count")
+
+
+class CachedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: Any
+    headers: CIMultiDictProxy
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """SQLite-backed store of validated GET responses plus hit counters."""
+
+    def __init__(self, path: str, max_age_days: float = HTTP_CACHE_MAX_AGE_DAYS) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self.hits = 0          # 304: stored body reused
+        self.misses = 0        # nothing stored for the request
+        self.changed = 0       # stored body replaced by a fresh 200
+        self.stored = 0
+        self.unvalidated = 0   # 200 without ETag/Last-Modified, not storable
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+                " headers TEXT NOT NULL, body TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE used_at < ?",
+                (time.time() - max_age_days * 86400,),
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def key(headers: Optional[dict], url: str, params=None) -> str:
+        client_id = (headers or {}).get("x-buildium-client-id", "")
+        pairs = params.items() if isinstance(params, dict) else (params or [])
+        items = sorted((str(k), str(v)) for k, v in pairs)
+        raw = json.dumps([client_id, url, items])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---- blocking storage, run in a worker thread ----
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return CachedResponse(
+            etag, last_modified, json.loads(body), CIMultiDictProxy(CIMultiDict(json.loads(headers)))
+        )
+
+    def _put(self, key: str, etag, last_modified, headers: list, body) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, etag, last_modified, headers, body, used_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, etag, last_modified, json.dumps(headers), json.dumps(body), time.time()),
+                )
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.warning(f"Could not store cached Buildium response: {e}")
+
+    # ---- async API used by BuildiumClient ----
+    async def lookup(self, key: str) -> Optional[CachedResponse]:
+        try:
+            entry = await asyncio.to_thread(self._get, key)
+        except (sqlite3.Error, ValueError) as e:
+            logging.warning(f"HTTP cache read failed: {e}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+        return entry
+
+    def revalidated(self, entry: CachedResponse) -> CachedResponse:
+        """Count a 304 for *entry* and hand it back for serving."""
+        self.hits += 1
+        return entry
+
+    def save(self, key: str, headers, body, previous: Optional[CachedResponse] = None) -> None:
+        """Store a fresh 200 response in the background if it carries validators."""
+        if previous is not None:
+            self.changed += 1
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            self.unvalidated += 1
+            return
+        self.stored += 1
+        kept = [(name, headers[name]) for name in _KEPT_HEADERS if name in headers]
+        asyncio.get_running_loop().run_in_executor(
+            None, self._put, key, etag, last_modified, kept, body
+        )
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "changed": self.changed,
+            "stored": self.stored,
+            "unvalidated": self.unvalidated,
+        }
+
+
+_cache: Optional[HttpCache] = None
+_disabled = False
+
+
+def default_cache() -> Optional[HttpCache]:
+    """Return the process-wide cache, or ``None`` when it is not configured."""
+    global _cache, _disabled
+    if _cache is None and HTTP_CACHE_DIR and not _disabled:
+        try:
+            os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+            _cache = HttpCache(os.path.join(HTTP_CACHE_DIR, "buildium_http_cache.sqlite3"))
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Buildium HTTP cache unavailable: {e}")
+            _disabled = True
+    return _cache
+
+
+def stats() -> dict:
+    """Hit counters of the process-wide cache (empty when disabled)."""
+    return _cache.stats() if _cache is not None else {}
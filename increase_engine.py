@@ -0,0 +1,101 @@
+"""Columnar form of ``calculate_increase.processcharges``.
+
+All leases' recurring charges are loaded into padded ``int64`` cent arrays
+(one row per lease, one column per charge position) and the guideline/AGI
+rents, the per-charge increases and the remainder assigned to the rent
+charge are computed for every lease at once with the :mod:`money` rules.
+
+Results are identical to :func:`calculate_increase.processcharges`, which
+applies the same rules one value at a time;
+``python -m benchmarks.check_increase_engine`` compares the two. The engine
+is opt-in (``INCREASE_ENGINE=numpy``) and NumPy is not a requirement of the
+service: the per-lease output still dominates, so it is not faster yet.
+"""
+
+import numpy as np
+
+import money
+
+
+class ChargeTable:
+    """Recurring charges of many leases as ``(leases, max_charges)`` arrays."""
+
+    def __init__(self, recurringinfos):
+        n = len(recurringinfos)
+        counts = np.array([len(charges) for charges in recurringinfos], dtype=np.int64)
+        width = int(counts.max()) if n else 0
+        amounts = [item['Amount'] or 0 for charges in recurringinfos for item in charges]
+        rows = np.repeat(np.arange(n), counts)
+        cols = np.arange(len(amounts)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        self.cents = np.zeros((n, width), dtype=np.int64)
+        self.valid = np.zeros((n, width), dtype=bool)
+        self.gl3 = np.zeros((n, width), dtype=bool)
+        self.cents[rows, cols] = money.cents_array(amounts)
+        self.valid[rows, cols] = True
+        self.gl3[rows, cols] = [item['Gl'] == 3 for charges in recurringinfos for item in charges]
+        # first GL 3 charge is the rent charge that takes the remainder
+        self.rent_col = np.where(self.gl3.any(axis=1), self.gl3.argmax(axis=1), -1) if width else np.full(n, -1)
+
+
+def processcharges_batch(recurringinfos, percentages, increasedate, agicheck, secondpercentages):
+    """Vectorized ``processcharges`` over many leases; returns the same tuples, in order."""
+    table = ChargeTable(recurringinfos)
+    units = np.array([money.rate_units(p) for p in percentages], dtype=np.int64)
+
+    total = table.cents.sum(axis=1)
+    new_total = money.increase_array(total, units)
+    other = table.valid & ~table.gl3
+    new_amount = money.increase_array(table.cents, units[:, None])
+    rent = new_total - np.where(other, new_amount, 0).sum(axis=1)
+
+    if agicheck is True:
+        agi_units = np.array(
+            [money.rate_units(float(p) - s) for p, s in zip(percentages, secondpercentages)],
+            dtype=np.int64,
+        )
+        increase = new_total - money.increase_array(total, agi_units)
+    else:
+        increase = new_total - total
+
+    # Back to Python objects once, for the per-lease dictionaries
+    increasedate = increasedate.strftime('%Y-%m-%d')
+    totals = (total / 100).tolist()
+    new_totals = (new_total / 100).tolist()
+    new_amounts = (new_amount / 100).tolist()
+    rents = (rent / 100).tolist()
+    increases = (increase / 100).tolist()
+    rent_cols = table.rent_col.tolist()
+    results = []
+    for i, charges in enumerate(recurringinfos):
+        lease_amounts = new_amounts[i]
+        newcharge_info = []
+        chargestostoplist = []
+        for j, item in enumerate(charges):
+            if item['Gl'] != 3:
+                if item['RentId'] is None:
+                    chargestostoplist.append(item['Id'])
+                newcharge_info.append({
+                    'Amount': lease_amounts[j],
+                    'GlAccountId': item['Gl'],
+                    'NextDueDate': increasedate,
+                    'PostDaysInAdvance': 10,
+                    'Memo': item['Memo'],
+                })
+        if rent_cols[i] >= 0:
+            item = charges[rent_cols[i]]
+            newcharge_info.append({
+                'Amount': rents[i],
+                'GlAccountId': item['Gl'],
+                'NextDueDate': increasedate,
+                'PostDaysInAdvance': 10,
+                'Memo': item['Memo'],
+            })
+        results.append((
+            new_totals[i],
+            increases[i],
+            chargestostoplist or None,
+            newcharge_info,
+            totals[i],
+        ))
+    return results
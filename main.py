@@ -2,11 +2,13 @@
 
 import os
 
-from webhook_handler import app
-
 if __name__ == "__main__":
     import asyncio
     import uvicorn
 
+    # Imported here, not at module level: PDF worker processes re-run this
+    # module and must not build the app and its cloud clients
+    from webhook_handler import app
+
     worker_count = int(os.getenv("WEB_CONCURRENCY", "1"))
     uvicorn.run(app, host="0.0.0.0", port=8080, workers=worker_count)
@@ -0,0 +1,85 @@
+"""Money arithmetic in integer cents.
+
+Amounts arrive from Buildium as JSON numbers; they are converted to whole
+cents once (:func:`to_cents`) and every rule below works on integers, so
+results do not depend on float drift or on the order values are added in.
+Percentages are held as integers in 1/10,000ths of a percent, and every
+division rounds half away from zero. Results go back to floats with
+:func:`from_cents` only when they are written out.
+
+The ``*_array`` functions apply the same rules to NumPy ``int64`` arrays for
+the batch paths (``increase_engine``); they need NumPy, the scalar ones do
+not.
+"""
+
+try:
+    import numpy as np  # optional; only the batch functions need it
+except Exception:
+    np = None
+
+RATE_SCALE = 10_000          # 1 rate unit = 1/10,000 of a percent
+_PERCENT = 100 * RATE_SCALE  # rate units in 100%
+
+
+def to_cents(value) -> int:
+    """Whole cents of an amount (``None`` counts as 0)."""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value * 100
+    return round(float(value) * 100)
+
+
+def from_cents(cents) -> float:
+    """Amount as a float, exact to the cent."""
+    return int(cents) / 100
+
+
+def rate_units(percentage) -> int:
+    """A percentage such as ``2.5`` as integer rate units."""
+    return round(float(percentage) * RATE_SCALE)
+
+
+def _div_half_up(numerator: int, denominator: int) -> int:
+    quotient = (2 * abs(numerator) + denominator) // (2 * denominator)
+    return quotient if numerator >= 0 else -quotient
+
+
+def increase(cents: int, percentage) -> int:
+    """``cents`` raised by ``percentage`` percent, rounded to the cent."""
+    return _div_half_up(cents * (_PERCENT + rate_units(percentage)), _PERCENT)
+
+
+def split_increase(total_cents: int, part_cents: list, percentage) -> tuple:
+    """Raise a total and its parts by ``percentage``.
+
+    Each part is raised on its own; the remainder, which goes to the charge
+    that balances the total (the rent), is the raised total minus the raised
+    parts. Returns ``(new_total, new_parts, remainder)``.
+    """
+    new_total = increase(total_cents, percentage)
+    new_parts = [increase(c, percentage) for c in part_cents]
+    return new_total, new_parts, new_total - sum(new_parts)
+
+
+def interest(balance_cents: int, percentage, days: int, days_in_year: int) -> int:
+    """Simple interest on a balance for ``days`` days at an annual ``percentage``."""
+    return _div_half_up(balance_cents * rate_units(percentage) * days, _PERCENT * days_in_year)
+
+
+# ---------- batch ----------
+
+def cents_array(values):
+    """``to_cents`` for a sequence of amounts, as ``int64``."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.rint(values * 100).astype(np.int64)
+
+
+def _div_half_up_array(numerator, denominator):
+    quotient = (2 * np.abs(numerator) + denominator) // (2 * denominator)
+    return np.where(numerator >= 0, quotient, -quotient)
+
+
+def increase_array(cents, units):
+    """``increase`` for arrays; ``units`` are rate units (see :func:`rate_units`) and broadcast."""
+    return _div_half_up_array(np.asarray(cents, dtype=np.int64) * (_PERCENT + np.asarray(units, dtype=np.int64)), _PERCENT)
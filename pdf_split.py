@@ -0,0 +1,146 @@
+"""Split PDFs into size-bounded parts without re-serializing them page by page.
+
+Buildium rejects uploads over 15 MB, so large reports and building summaries
+are uploaded in parts. Rather than writing a growing PDF after every page to
+see whether it still fits, :func:`plan_parts` estimates what each page adds
+to a part -- the serialized size of the indirect objects it references that
+the part does not hold yet, so fonts, images and template forms shared
+between pages count once per part -- and chooses the boundaries up front.
+Each part is then written exactly once.
+
+Pages are grouped into *units* (lists of pages that must stay together,
+e.g. one lease's notice); a unit is never split across parts.
+"""
+
+import logging
+from io import BytesIO
+from typing import Sequence
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+
+MAX_PART_BYTES = 15 * 1024 * 1024
+
+# Fixed cost of a written file (header, catalog, page tree, trailer) and of
+# each object in it (``n 0 obj``/``endobj`` and its xref entry).
+FILE_OVERHEAD = 1024
+OBJECT_OVERHEAD = 40
+
+# Keys that point back up the document rather than at page content.
+_SKIP_KEYS = {"/Parent", "/P"}
+
+
+class _Sizer:
+    """Serialized sizes of indirect objects, each measured once."""
+
+    def __init__(self):
+        self._sizes = {}
+
+    def size(self, ref: IndirectObject, obj) -> int:
+        key = (id(ref.pdf), ref.idnum, ref.generation)
+        size = self._sizes.get(key)
+        if size is None:
+            buffer = BytesIO()
+            obj.write_to_stream(buffer, None)
+            size = buffer.tell() + OBJECT_OVERHEAD
+            self._sizes[key] = size
+        return size
+
+    def page_cost(self, page, seen: set, added: set) -> int:
+        """Bytes *page* adds to a part holding *seen*; new object keys go into *added*."""
+        cost = OBJECT_OVERHEAD
+        stack = [page]
+        ref = getattr(page, "indirect_reference", None)
+        if ref is not None:
+            added.add((id(ref.pdf), ref.idnum, ref.generation))
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, IndirectObject):
+                key = (id(obj.pdf), obj.idnum, obj.generation)
+                if key in seen or key in added:
+                    continue
+                added.add(key)
+                resolved = obj.get_object()
+                cost += self.size(obj, resolved)
+                stack.append(resolved)
+            elif isinstance(obj, DictionaryObject):
+                stack.extend(v for k, v in obj.items() if k not in _SKIP_KEYS)
+            elif isinstance(obj, ArrayObject):
+                stack.extend(obj)
+        if ref is None:
+            buffer = BytesIO()
+            page.write_to_stream(buffer, None)
+            cost += buffer.tell()
+        return cost
+
+
+def plan_parts(units: Sequence[Sequence], max_bytes: int = MAX_PART_BYTES) -> list[tuple[int, int]]:
+    """Return ``[(start, stop), ...]`` unit ranges whose estimated size fits *max_bytes*.
+
+    A unit that does not fit on its own still gets a part of its own.
+    """
+    sizer = _Sizer()
+    ranges = []
+    start, size, seen = 0, FILE_OVERHEAD, set()
+    for i, pages in enumerate(units):
+        added = set()
+        cost = sum(sizer.page_cost(page, seen, added) for page in pages)
+        if i > start and size + cost > max_bytes:
+            ranges.append((start, i))
+            start, seen, added = i, set(), set()
+            cost = sum(sizer.page_cost(page, seen, added) for page in pages)
+            size = FILE_OVERHEAD
+        seen |= added
+        size += cost
+    if start < len(units):
+        ranges.append((start, len(units)))
+    return ranges
+
+
+def write_pages(pages, metadata=None) -> bytes:
+    """Write *pages* (from a ``PdfReader`` or ``PdfWriter``) as one PDF."""
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(page)
+    if metadata:
+        try:
+            writer.add_metadata(metadata)
+        except Exception:
+            pass
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def split_units(units: Sequence[Sequence], max_bytes: int = MAX_PART_BYTES, metadata=None) -> list[bytes]:
+    """Plan and write the parts for *units*; returns one PDF per part.
+
+    If a written part still comes out over the limit (the estimate is only
+    an estimate), that part alone is re-planned against a proportionally
+    smaller budget.
+    """
+    parts = []
+    for start, stop in plan_parts(units, max_bytes):
+        chunk = units[start:stop]
+        data = write_pages((page for pages in chunk for page in pages), metadata)
+        if len(data) > max_bytes and len(chunk) > 1:
+            logging.info(f"PDF part of {len(data)} bytes exceeded {max_bytes}; re-planning it")
+            budget = int(max_bytes * max_bytes / len(data) * 0.95)
+            for sub_start, sub_stop in plan_parts(chunk, budget):
+                parts.append(write_pages(
+                    (page for pages in chunk[sub_start:sub_stop] for page in pages), metadata
+                ))
+        else:
+            parts.append(data)
+    return parts
+
+
+def split_pdf_bytes(pdf_bytes: bytes, max_bytes: int = MAX_PART_BYTES) -> list[bytes]:
+    """Split a PDF into complete PDFs of at most *max_bytes* each, on page boundaries.
+
+    A PDF that already fits is returned as is.
+    """
+    if len(pdf_bytes) <= max_bytes:
+        return [pdf_bytes]
+    reader = PdfReader(BytesIO(pdf_bytes))
+    return split_units([[page] for page in reader.pages], max_bytes, getattr(reader, "metadata", None))
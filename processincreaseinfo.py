@@ -2,16 +2,15 @@ import aiohttp
 import logging
 import asyncio
 import os
-import io
-import random
 import generateN1notice
-from PyPDF2 import PdfReader, PdfWriter
+import workers
 import aiofiles
 import aiofiles.os
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-from rate_limiter import semaphore, throttle
+from buildium_client import BuildiumClient
+import reference_data
 
 # -------------------- small helpers --------------------
 def _is_ignored(v) -> bool:
@@ -27,86 +26,10 @@ def _safe_get(d: dict, path: list, default=None):
         cur = cur[k]
     return cur
 
-# -------------------- generic fetch with simple 429 handling --------------------
-async def fetch_data(session, url, headers, method: str = "GET"):
-    """Fetch data asynchronously with a small 429 backoff and a semaphore."""
-    logging.info("Fetching Data From Buildium")
-    try:
-        async with semaphore, throttle:
-            while True:
-                async with session.request(method, url, headers=headers) as response:
-                    status_code = response.status
-                    try:
-                        data = await response.json()
-                    except Exception:
-                        text = await response.text()
-                        logging.info(f"Non-JSON response from {url}: {text[:300]}")
-                        data = {}
-
-                    if status_code == 429:
-                        logging.info("Rate limit reached, sleeping for 0.201 seconds")
-                        await asyncio.sleep(0.201)
-                        continue
-
-                    if isinstance(data, (dict, list)):
-                        return data
-                    logging.info(f"Unexpected response format: {data!r}")
-                    return {}
-    except Exception as e:
-        logging.info(f"Error fetching data from {url}: {e}")
-        return {}
-
-# -------------------- POST with retry --------------------
-async def post_with_retry(session, url, *, headers=None, json=None, data=None, max_attempts: int = 5):
-    """POST with basic 429 retry, exponential backoff, and jitter."""
-    delay = 2
-    for attempt in range(max_attempts):
-        async with semaphore, throttle:
-            async with session.post(url, headers=headers, json=json, data=data) as response:
-                status = response.status
-                retry_after_hdr = response.headers.get("Retry-After")
-                if status != 429:
-                    try:
-                        body = await response.json()
-                    except Exception:
-                        body = await response.text()
-                    return status, body
-        try:
-            wait = float(retry_after_hdr) if retry_after_hdr is not None else delay
-        except ValueError:
-            wait = delay
-        await asyncio.sleep(wait + random.uniform(0, 0.5))
-        delay *= 2
-    return None, None
-
 # -------------------- categories --------------------
 async def category(headers, session, date_label: str):
     """Find or create a Files Category named 'Increases {date_label}' and return its Id."""
-    url = "https://api.buildium.com/v1/files/categories"
-    params = {'limit': 1000}
-    async with semaphore, throttle:
-        async with session.get(url, headers=headers, params=params) as response:
-            if response.status != 200:
-                logging.error(f"Failed to fetch file categories: {response.status} {await response.text()}")
-                return None
-
-            category_list = await response.json()
-            category_id = None
-            for cat in category_list:
-                if cat.get('Name') == f'Increases {date_label}':
-                    category_id = cat.get('Id')
-                    break
-
-            if category_id is None:
-                payload = {'Name': f'Increases {date_label}'}
-                async with semaphore, throttle:
-                    async with session.post(url, headers=headers, json=payload) as r2:
-                        if r2.status != 201:
-                            logging.error(f"Failed creating file category: {r2.status} {await r2.text()}")
-                            return None
-                        cat_json = await r2.json()
-                        category_id = cat_json.get('Id')
-    return category_id
+    return await reference_data.file_category_id(session, headers, f'Increases {date_label}')
 
 # -------------------- presigned form helpers --------------------
 _ORDER_TASK = [
@@ -191,21 +114,14 @@ async def amazondatalease(payload):
     bucket_url = payload["BucketUrl"]
     return form_data, bucket_url
 
-# -------------------- PDF generation per lease --------------------
-async def generateN1files(leaseid, leasedata):
-    """Generate an N1 notice for a lease and return (filename, pdf_bytes)."""
-    logging.info(f"Generating Increase Notices for lease {leaseid}")
-    filename, pdf_bytes = await generateN1notice.create(leaseid, leasedata)
-    return filename, pdf_bytes
-
 # -------------------- upload to Lease --------------------
 async def uploadN1filestolease(headers, filename, file_bytes, leaseid, session, categoryid):
     """Upload an in-memory N1 PDF to the given lease."""
     logging.info(f"Uploading N1 File to Lease {leaseid}")
+    client = BuildiumClient(session, headers)
 
     try:
         # 1) Get presign
-        url = "https://api.buildium.com/v1/files/uploadrequests"
         presign_body = {
             "EntityType": "Lease",
             "EntityId": leaseid,
@@ -213,16 +129,14 @@ async def uploadN1filestolease(headers, filename, file_bytes, leaseid, session,
             "Title": filename,
             "CategoryId": categoryid,
         }
-        status, body = await post_with_retry(
-            session, url, headers=headers, json=presign_body
-        )
-        if status != 201:
+        presign = await client.create_file_upload_request(presign_body)
+        if presign.status != 201:
             logging.info(
-                f"Error while submitting lease file metadata: {status} {body}"
+                f"Error while submitting lease file metadata: {presign.status} {presign.body}"
             )
             return False
 
-        payload = body
+        payload = presign.body
         form_data, bucket_url = await amazondatalease(payload)
 
         # 2) Add PDF bytes as LAST field
@@ -231,46 +145,41 @@ async def uploadN1filestolease(headers, filename, file_bytes, leaseid, session,
         )
 
         # 3) Upload to S3
-        async with semaphore, throttle:
-            async with session.post(bucket_url, data=form_data) as upload_response:
-                resp_text = await upload_response.text()
-                if upload_response.status == 204:
-                    logging.info(f"Upload of Notice for {leaseid} successful.")
-                    return True
-                if upload_response.status == 403 and "Invalid according to Policy: Policy expired" in resp_text:
-                    logging.warning(
-                        f"Policy expired for lease {leaseid} upload; requesting new presign and retrying."
-                    )
-                    # Re-request presigned data
-                    status, body = await post_with_retry(
-                        session, url, headers=headers, json=presign_body
-                    )
-                    if status != 201:
-                        logging.info(
-                            f"Retry presign failed for lease {leaseid}: {status} {body}"
-                        )
-                        return False
-                    payload = body
-                    form_data_retry, bucket_url_retry = await amazondatalease(payload)
-                    form_data_retry.add_field(
-                        "file", file_bytes, filename=filename, content_type="application/pdf"
-                    )
-                    async with semaphore, throttle:
-                        async with session.post(bucket_url_retry, data=form_data_retry) as retry_response:
-                            retry_body = await retry_response.text()
-                            if retry_response.status == 204:
-                                logging.info(
-                                    f"Retry upload of Notice for {leaseid} succeeded."
-                                )
-                                return True
-                            logging.info(
-                                f"Retry upload failed for {leaseid}: {retry_response.status} {retry_body}"
-                            )
-                            return False
+        upload = await client.upload_to_bucket(bucket_url, form_data)
+        resp_text = str(upload.body or "")
+        if upload.status == 204:
+            logging.info(f"Upload of Notice for {leaseid} successful.")
+            return True
+        if upload.status == 403 and "Invalid according to Policy: Policy expired" in resp_text:
+            logging.warning(
+                f"Policy expired for lease {leaseid} upload; requesting new presign and retrying."
+            )
+            # Re-request presigned data
+            presign = await client.create_file_upload_request(presign_body)
+            if presign.status != 201:
                 logging.info(
-                    f"Error Uploading Notice for {leaseid}: {upload_response.status} {resp_text}"
+                    f"Retry presign failed for lease {leaseid}: {presign.status} {presign.body}"
                 )
                 return False
+            payload = presign.body
+            form_data_retry, bucket_url_retry = await amazondatalease(payload)
+            form_data_retry.add_field(
+                "file", file_bytes, filename=filename, content_type="application/pdf"
+            )
+            retry = await client.upload_to_bucket(bucket_url_retry, form_data_retry)
+            if retry.status == 204:
+                logging.info(
+                    f"Retry upload of Notice for {leaseid} succeeded."
+                )
+                return True
+            logging.info(
+                f"Retry upload failed for {leaseid}: {retry.status} {retry.body}"
+            )
+            return False
+        logging.info(
+            f"Error Uploading Notice for {leaseid}: {upload.status} {resp_text}"
+        )
+        return False
 
     except Exception as e:
         logging.info(
@@ -282,46 +191,39 @@ async def uploadN1filestolease(headers, filename, file_bytes, leaseid, session,
 async def uploadsummarytotask(headers, filename, file_bytes, taskid, session, categoryid):
     """Upload an in-memory summary PDF to the given task."""
     logging.info(f"Uploading Summary to Task {taskid}")
+    client = BuildiumClient(session, headers)
 
     try:
         # 1) Get latest task history id (newest first)
-        urltaskhistory = f"https://api.buildium.com/v1/tasks/{taskid}/history"
-        async with semaphore, throttle:
-            async with session.get(urltaskhistory, headers=headers) as response:
-                if response.status != 200:
-                    logging.info(
-                        f"Error while getting task history: {response.status} {await response.text()}"
-                    )
-                    return False
+        history = await client.get_task_history(taskid)
+        if history.status != 200:
+            logging.info(
+                f"Error while getting task history: {history.status} {history.body}"
+            )
+            return False
 
-                taskhistorydata = await response.json()
-            try:
-                taskhistorydata.sort(
-                    key=lambda h: h.get("Date") or h.get("CreatedDate") or "",
-                    reverse=True,
-                )
-            except Exception:
-                pass
-            if not taskhistorydata:
-                logging.info("No task history entries found to attach file to.")
-                return False
-            taskhistoryid = taskhistorydata[0]["Id"]
+        taskhistorydata = history.body or []
+        try:
+            taskhistorydata.sort(
+                key=lambda h: h.get("Date") or h.get("CreatedDate") or "",
+                reverse=True,
+            )
+        except Exception:
+            pass
+        if not taskhistorydata:
+            logging.info("No task history entries found to attach file to.")
+            return False
+        taskhistoryid = taskhistorydata[0]["Id"]
 
         # 2) Presign for this history entry
-        url = (
-            f"https://api.buildium.com/v1/tasks/{taskid}/history/{taskhistoryid}/files/uploadrequests"
-        )
-        presign_body = {"FileName": filename}
-        status, body = await post_with_retry(
-            session, url, headers=headers, json=presign_body
-        )
-        if status != 201:
+        presign = await client.create_task_history_upload_request(taskid, taskhistoryid, filename)
+        if presign.status != 201:
             logging.info(
-                f"Error while submitting task file metadata: {status} {body}"
+                f"Error while submitting task file metadata: {presign.status} {presign.body}"
             )
             return False
 
-        payload = body
+        payload = presign.body
         form_data, bucket_url = await amazondatatask(payload)
 
         # 3) Add PDF bytes LAST
@@ -330,45 +232,40 @@ async def uploadsummarytotask(headers, filename, file_bytes, taskid, session, ca
         )
 
         # 4) Upload to S3
-        async with semaphore, throttle:
-            async with session.post(bucket_url, data=form_data) as upload_response:
-                resp_text = await upload_response.text()
-                if upload_response.status == 204:
-                    logging.info(f"Upload successful for Task {taskid}.")
-                    return True
-                if upload_response.status == 403 and "Invalid according to Policy: Policy expired" in resp_text:
-                    logging.warning(
-                        f"Policy expired for task {taskid} upload; requesting new presign and retrying."
-                    )
-                    status, body = await post_with_retry(
-                        session, url, headers=headers, json=presign_body
-                    )
-                    if status != 201:
-                        logging.info(
-                            f"Retry presign failed for task {taskid}: {status} {body}"
-                        )
-                        return False
-                    payload = body
-                    form_data_retry, bucket_url_retry = await amazondatatask(payload)
-                    form_data_retry.add_field(
-                        "file", file_bytes, filename=filename, content_type="application/pdf"
-                    )
-                    async with semaphore, throttle:
-                        async with session.post(bucket_url_retry, data=form_data_retry) as retry_response:
-                            retry_body = await retry_response.text()
-                            if retry_response.status == 204:
-                                logging.info(
-                                    f"Retry upload of Summary for task {taskid} succeeded."
-                                )
-                                return True
-                            logging.info(
-                                f"Retry upload failed for task {taskid}: {retry_response.status} {retry_body}"
-                            )
-                            return False
+        upload = await client.upload_to_bucket(bucket_url, form_data)
+        resp_text = str(upload.body or "")
+        if upload.status == 204:
+            logging.info(f"Upload successful for Task {taskid}.")
+            return True
+        if upload.status == 403 and "Invalid according to Policy: Policy expired" in resp_text:
+            logging.warning(
+                f"Policy expired for task {taskid} upload; requesting new presign and retrying."
+            )
+            presign = await client.create_task_history_upload_request(taskid, taskhistoryid, filename)
+            if presign.status != 201:
                 logging.info(
-                    f"Error Uploading File for Task {taskid}: {upload_response.status} {resp_text}"
+                    f"Retry presign failed for task {taskid}: {presign.status} {presign.body}"
                 )
                 return False
+            payload = presign.body
+            form_data_retry, bucket_url_retry = await amazondatatask(payload)
+            form_data_retry.add_field(
+                "file", file_bytes, filename=filename, content_type="application/pdf"
+            )
+            retry = await client.upload_to_bucket(bucket_url_retry, form_data_retry)
+            if retry.status == 204:
+                logging.info(
+                    f"Retry upload of Summary for task {taskid} succeeded."
+                )
+                return True
+            logging.info(
+                f"Retry upload failed for task {taskid}: {retry.status} {retry.body}"
+            )
+            return False
+        logging.info(
+            f"Error Uploading File for Task {taskid}: {upload.status} {resp_text}"
+        )
+        return False
 
     except Exception as e:
         logging.error(f"Error Uploading Summary to task: {e}")
@@ -377,13 +274,15 @@ async def uploadsummarytotask(headers, filename, file_bytes, taskid, session, ca
 # -------------------- ignored renewal helper --------------------
 async def leaserenewalingored(headers, leaseid, lease, session):
     """When a lease is ignored for increases, extend LeaseToDate by +6 months."""
+    client = BuildiumClient(session, headers)
     try:
-        url = f"https://api.buildium.com/v1/leases/{leaseid}"
-        async with semaphore, throttle:
-            async with session.get(url, headers=headers) as response:
-                data = await response.json()
-                date = datetime.strptime(data["LeaseToDate"], "%Y-%m-%d")
-                date = (date + relativedelta(months=6)).strftime("%Y-%m-%d")
+        response = await client.get_lease(leaseid)
+        data = response.data()
+        if data is None:
+            logging.error(f"Error fetching {leaseid} for extension: {response.status}")
+            return
+        date = datetime.strptime(data["LeaseToDate"], "%Y-%m-%d")
+        date = (date + relativedelta(months=6)).strftime("%Y-%m-%d")
 
         payload = {
             "LeaseType": data["LeaseType"],
@@ -392,12 +291,11 @@ async def leaserenewalingored(headers, leaseid, lease, session):
             "LeaseToDate": date,
             "IsEvictionPending": data['IsEvictionPending'],
         }
-        async with semaphore, throttle:
-            async with session.put(url, json=payload, headers=headers) as response:
-                if response.status == 200:
-                    logging.info(f"Extension Completed for {leaseid}.")
-                else:
-                    logging.error(f"Error extending {leaseid}: {response.status} {await response.text()}")
+        response = await client.update_lease(leaseid, payload)
+        if response.status == 200:
+            logging.info(f"Extension Completed for {leaseid}.")
+        else:
+            logging.error(f"Error extending {leaseid}: {response.status} {response.body}")
     except Exception as e:
         logging.error(f"Error in leaserenewalingored for {leaseid}: {e}")
 
@@ -438,7 +336,7 @@ async def setevictionstatus(leaseid, eviction: bool, session, headers) -> bool:
 async def leaserenewals(headers, leaseid, lease, session, max_retries: int = 3):
     logging.info(f"Processing Lease Renewal for Lease {leaseid}")
 
-    url = f"https://api.buildium.com/v1/leases/{leaseid}/renewals"
+    client = BuildiumClient(session, headers)
 
     try:
         # Compute next LeaseToDate (one year minus a day)
@@ -464,42 +362,40 @@ async def leaserenewals(headers, leaseid, lease, session, max_retries: int = 3):
                 "RecurringChargesToStop": recurring_charges_list
             }
 
-        # Attempts loop (no recursion)
+        # Attempts loop (no recursion). Each request holds a rate-limit slot
+        # only while it is in flight, so the eviction toggles below never
+        # wait for a slot while this lease already holds one.
         for attempt in range(1, max_retries + 1):
-            async with semaphore, throttle:
-                async with session.post(url, json=payloadstr, headers=headers) as response:
-                    if response.status == 201:
-                        logging.info(f"Renewal Completed for {leaseid}.")
-                        return True
-                    if response.status == 409:
-                        logging.warning(
-                            f"Lease {leaseid} renewal 409 (attempt {attempt}/{max_retries}); toggling eviction and retrying..."
-                        )
-                        set_ok = await setevictionstatus(leaseid, True, session, headers)
-                        if not set_ok:
-                            logging.error(
-                                f"Failed to set eviction flag for {leaseid}; aborting renewal."
-                            )
-                            return False
-                        # Retry immediately with eviction set
-                        async with semaphore, throttle:
-                            async with session.post(url, json=payloadstr, headers=headers) as r2:
-                                if r2.status == 201:
-                                    logging.info(
-                                        f"Renewal Completed for {leaseid} after eviction toggle."
-                                    )
-                                    await setevictionstatus(leaseid, False, session, headers)
-                                    return True
-                                else:
-                                    await setevictionstatus(leaseid, False, session, headers)
-                                    logging.error(
-                                        f"Retry after eviction toggle failed for {leaseid}: {r2.status} {await r2.text()}"
-                                    )
-                    else:
-                        logging.error(
-                            f"Error renewing {leaseid}: {response.status} {await response.text()}"
-                        )
-                        return False
+            response = await client.create_lease_renewal(leaseid, payloadstr)
+            if response.status == 201:
+                logging.info(f"Renewal Completed for {leaseid}.")
+                return True
+            if response.status != 409:
+                logging.error(
+                    f"Error renewing {leaseid}: {response.status} {response.body}"
+                )
+                return False
+
+            logging.warning(
+                f"Lease {leaseid} renewal 409 (attempt {attempt}/{max_retries}); toggling eviction and retrying..."
+            )
+            set_ok = await setevictionstatus(leaseid, True, session, headers)
+            if not set_ok:
+                logging.error(
+                    f"Failed to set eviction flag for {leaseid}; aborting renewal."
+                )
+                return False
+            # Retry immediately with eviction set
+            r2 = await client.create_lease_renewal(leaseid, payloadstr)
+            await setevictionstatus(leaseid, False, session, headers)
+            if r2.status == 201:
+                logging.info(
+                    f"Renewal Completed for {leaseid} after eviction toggle."
+                )
+                return True
+            logging.error(
+                f"Retry after eviction toggle failed for {leaseid}: {r2.status} {r2.body}"
+            )
 
             # backoff before next attempt
             await asyncio.sleep(0.5 * attempt)
@@ -515,42 +411,20 @@ async def leaserenewals(headers, leaseid, lease, session, max_retries: int = 3):
 async def createtask(headers, buildingid, session, date_label):
     """Create a task for delivering increase notices for a given building (if needed)."""
     logging.info(f"Creating Task for Building {buildingid}")
-    url_rental = f"https://api.buildium.com/v1/rentals/{buildingid}"
-    url_cat = "https://api.buildium.com/v1/tasks/categories"
-    url_task = "https://api.buildium.com/v1/tasks/todorequests"
-    params = {'limit': 1000}
+    client = BuildiumClient(session, headers)
 
     try:
         # Get rental (for AssignedToUserId and Name)
-        async with semaphore, throttle:
-            async with session.get(url_rental, headers=headers) as response:
-                if response.status != 200:
-                    logging.error(f"Failed to fetch building data. Status: {response.status}")
-                    return None
-                rental = await response.json()
-                userid = _safe_get(rental, ['RentalManager', 'Id'])
-                buildingname = rental.get('Name')
+        rental = await reference_data.get_rental(session, headers, buildingid)
+        if rental is None:
+            logging.error(f"Failed to fetch building data for {buildingid}")
+            return None
+        userid = _safe_get(rental, ['RentalManager', 'Id'])
 
         # Find/create task category 'Increase Notices'
-        async with semaphore, throttle:
-            async with session.get(url_cat, params=params, headers=headers) as response:
-                if response.status != 200:
-                    logging.error(f"Failed to fetch task categories. Status: {response.status}")
-                    return None
-                category_list = await response.json()
-                category_id = None
-                for c in category_list:
-                    if c.get('Name') == 'Increase Notices':
-                        category_id = c.get('Id')
-                        break
-                if category_id is None:
-                    payload = {'Name': 'Increase Notices'}
-                    async with semaphore, throttle:
-                        async with session.post(url_cat, headers=headers, json=payload) as r2:
-                            if r2.status != 201:
-                                logging.error(f"Failed to create task category. Status: {r2.status}")
-                                return None
-                            category_id = (await r2.json()).get('Id')
+        category_id = await reference_data.task_category_id(session, headers, 'Increase Notices')
+        if category_id is None:
+            return None
 
         # Create the task
         payloadtask = {
@@ -563,65 +437,47 @@ async def createtask(headers, buildingid, session, date_label):
             'Priority': "High",
             'DueDate': datetime.now().strftime("%Y-%m-%d")
         }
-        async with semaphore, throttle:
-            async with session.post(url_task, json=payloadtask, headers=headers) as response:
-                if response.status != 201:
-                    logging.error(f"Failed to create task. Status: {response.status} {await response.text()}")
-                    return None
-                task_data = await response.json()
-                taskid = task_data.get('Id', 0)
-                logging.info(f"Task created successfully with ID: {taskid}")
-                return taskid
+        response = await client.create_todo_request(payloadtask)
+        if response.status != 201:
+            logging.error(f"Failed to create task. Status: {response.status} {response.body}")
+            return None
+        taskid = (response.data() or {}).get('Id', 0)
+        logging.info(f"Task created successfully with ID: {taskid}")
+        return taskid
 
     except Exception as e:
         logging.error(f"Error creating task: {e}")
         return None
 
-# -------------------- summary helpers --------------------
-async def add_summary_page(summary_data, summary_writer, buildingname, countbuilding, date_label):
-    """Generate summary page(s) and prepend them to existing lease pages.
-
-    The incoming ``summary_writer`` already holds the individual lease PDFs. This
-    function creates the distribution list page(s) and returns a combined PDF
-    where those pages appear *before* the lease documents.
-    """
-    try:
-        # Generate the summary page(s)
-        summary_page_buffer = await generateN1notice.create_summary_page(
-            summary_data, buildingname, countbuilding, date_label
-        )
-        summary_pdf = PdfReader(summary_page_buffer)
-
-        # Build a new writer that starts with the summary page(s)
-        combined_writer = PdfWriter()
-        for page in summary_pdf.pages:
-            combined_writer.add_page(page)
-
-        # Append all existing lease pages afterwards
-        for page in summary_writer.pages:
-            combined_writer.add_page(page)
-
-        buffer = io.BytesIO()
-        combined_writer.write(buffer)
-        buffer.seek(0)
-        return buffer.getvalue()
-    except Exception as e:
-        logging.error(f"Error adding summary pages: {e}")
-        return b""
-
-async def addtosummary(file_bytes, summary_writer):
-    """Append a lease PDF's pages into the in-memory summary."""
-    try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        for page in reader.pages:
-            summary_writer.add_page(page)
-        return True
-    except Exception as e:
-        logging.error(f"Error adding to summary: {e}")
-        return False
-
-
 # -------------------- per-building processing --------------------
+# Rendered N1 bytes allowed to wait for upload, across all buildings, and
+# uploads run at once per building
+N1_MEMORY_BUDGET = int(float(os.getenv("N1_MEMORY_BUDGET_MB", "64")) * 1024 * 1024)
+LEASE_UPLOAD_WORKERS = int(os.getenv("LEASE_UPLOAD_WORKERS", "8"))
+
+class N1Budget:
+    """Bytes of rendered N1s held in memory until their upload finishes."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._room = asyncio.Event()
+        self._room.set()
+
+    def take(self, size):
+        self.used += size
+        if self.used >= self.limit:
+            self._room.clear()
+
+    def release(self, size):
+        self.used -= size
+        if self.used < self.limit:
+            self._room.set()
+
+    async def wait(self):
+        """Return once the budget has room again."""
+        await self._room.wait()
+
 async def process_building(
     buildingid,
     data,
@@ -631,6 +487,7 @@ async def process_building(
     categoryid,
     counter,
     count_lock,
+    budget=None,
 ):
     """Handle all leases for a single building and update global counters."""
 
@@ -654,156 +511,175 @@ async def process_building(
         taskid = await createtask(headers, buildingid, session, datelabel)
 
     # Fresh summary state per building
-    summary_writer = PdfWriter()
-    summary_index = 1
-    summary_data = []
-    countbuilding = 0
-    current_summary_size = 0
     summary_parts = []  # list of (filename, bytes)
-    had_split = False
     size_limit = 15 * 1024 * 1024  # ~15MB
-
-    # Per-lease processing -- concurrently generate & upload
+    with_summary = bool(taskid)
+    budget = budget or N1Budget(N1_MEMORY_BUDGET)
+
+    # Per-lease processing -- N1s render in batches in the PDF worker pool
+    # and are handed to LEASE_UPLOAD_WORKERS uploaders as each batch
+    # finishes; rendering pauses while the budget of rendered-but-not-uploaded
+    # bytes is used up. The summary document is then built from the
+    # overlays of the notices that rendered, so it matches the uploads.
     total_leases = len(data["lease_info"])
+    jobs = asyncio.Queue()  # (coroutine, bytes held), None to stop
 
-    async def handle_lease(i, lease):
+    async def handle_ignored(lease):
         leaseid = lease["leaseid"]
+        await leaserenewalingored(headers, leaseid, lease, session)
         logging.info(
-            f"[{buildingid}] Lease {i}/{total_leases} → id={leaseid}, ignored={lease.get('ignored')!r}"
+            f"[{buildingid}] Processed Ignored Lease Renewal for lease {leaseid}."
         )
 
-        if _is_ignored(lease.get("ignored")):
-            await leaserenewalingored(headers, leaseid, lease, session)
-            logging.info(
-                f"[{buildingid}] Processed Ignored Lease Renewal for lease {leaseid}."
-            )
-            return None
-
-        leaseincreaseinfo = lease["increasenotice"]
-
-        # Generate individual N1
-        filename, file_bytes = await generateN1files(leaseid, leaseincreaseinfo)
-        if not file_bytes:
-            logging.error(f"Failed N1 generation for {leaseid}")
-            return None
+    async def deliver(lease, filename, file_bytes):
+        leaseid = lease["leaseid"]
 
         # Upload individual N1 to the lease
-        confirmlease = False
         if categoryid is None:
             logging.error("No category id available for lease uploads.")
         else:
-            confirmlease = await uploadN1filestolease(
+            await uploadN1filestolease(
                 headers, filename, file_bytes, leaseid, session, categoryid
             )
         await leaserenewals(headers, leaseid, lease["renewal"], session)
 
-        return lease, file_bytes, confirmlease
-
-    tasks = [handle_lease(i, lease) for i, lease in enumerate(data["lease_info"], 1)]
-    results = await asyncio.gather(*tasks)
-
-    # Integrate results sequentially for summary creation
-    for res in results:
-        if not res:
-            continue
-
-        lease, file_bytes, confirmlease = res
-
-        # Determine size of this lease PDF
-        lease_size = len(file_bytes or b"")
-
-        # If adding this lease would exceed the limit, flush current summary to disk
-        if (
-            current_summary_size + lease_size > size_limit
-            and len(summary_writer.pages) > 0
-        ):
-            summary_buffer = io.BytesIO()
-            summary_writer.write(summary_buffer)
-            had_split = True
-            part_filename = f"Part {summary_index}.pdf"
-            part_bytes = summary_buffer.getvalue()
-            part_path = os.path.join("/tmp", part_filename)
-            async with aiofiles.open(part_path, "wb") as f:
-                await f.write(part_bytes)
-            if await aiofiles.os.path.exists(part_path):
-                summary_parts.append((part_filename, part_bytes))
-            else:
-                logging.error(
-                    f"Failed to verify summary part {part_filename} at {part_path}"
-                )
-            summary_index += 1
-            summary_writer = PdfWriter()
-            current_summary_size = 0
-
-        ok = await addtosummary(file_bytes, summary_writer)
-
-        if ok:
-            current_summary_size += lease_size
-            async with count_lock:
-                counter["countall"] += 1
-            countbuilding += 1
-            summary_data.append(lease)
-
-    # Finalize & upload building summary (if any non-ignored leases and not ignoring building)
-    if summary_data and data.get("ignorebuilding") != "Y" and taskid:
-        if had_split:
-            part_filename = f"Part {summary_index}.pdf"
-        else:
-            part_filename = f"Notices for {buildingname} {datelabel}.pdf"
-
-        summary_bytes = await add_summary_page(
-            summary_data,
-            summary_writer,
-            buildingname,
-            countbuilding,
-            datelabel,
+    async def uploader():
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            work, size = job
+            try:
+                await work
+            except Exception as e:
+                logging.error(f"[{buildingid}] Lease delivery failed: {e}")
+            finally:
+                budget.release(size)
+
+    to_render = []
+    for idx, lease in enumerate(data["lease_info"]):
+        logging.info(
+            f"[{buildingid}] Lease {idx + 1}/{total_leases} → id={lease['leaseid']}, ignored={lease.get('ignored')!r}"
         )
-
-        part_path = os.path.join("/tmp", part_filename)
-        async with aiofiles.open(part_path, "wb") as f:
-            await f.write(summary_bytes)
-        if await aiofiles.os.path.exists(part_path):
-            summary_parts.append((part_filename, summary_bytes))
+        if _is_ignored(lease.get("ignored")):
+            jobs.put_nowait((handle_ignored(lease), 0))
         else:
-            logging.error(
-                f"Failed to verify summary file {part_filename} at {part_path}"
-            )
+            to_render.append((idx, lease))
 
-        total_parts = len(summary_parts)
-        logging.info(
-            f"[{buildingid}] Prepared {total_parts} summary part(s) for upload"
-        )
+    uploaders = [asyncio.create_task(uploader()) for _ in range(max(1, LEASE_UPLOAD_WORKERS))]
+    countbuilding = 0
+    # idx -> (lease, overlay) for the summary. Overlays are ~1.5 KB and are
+    # not charged to the budget: this building holds them until its own
+    # rendering ends, so charging them could leave admit() waiting forever
+    rendered = {}
+    try:
+        async for results in generateN1notice.create_many(
+            [(idx, lease["increasenotice"]) for idx, lease in to_render],
+            max_pending=workers.PDF_WORKERS,
+            admit=budget.wait,
+        ):
+            for idx, filename, file_bytes, overlay, error in results:
+                lease = data["lease_info"][idx]
+                if not file_bytes:
+                    logging.error(f"Failed N1 generation for {lease['leaseid']}: {error}")
+                    continue
+                countbuilding += 1
+                if with_summary:
+                    rendered[idx] = (lease, overlay)
+                budget.take(len(file_bytes))
+                jobs.put_nowait((deliver(lease, filename, file_bytes), len(file_bytes)))
+        async with count_lock:
+            counter["countall"] += countbuilding
+
+        for _ in uploaders:
+            jobs.put_nowait(None)
+        await asyncio.gather(*uploaders)
+    finally:
+        for task in uploaders:
+            task.cancel()
+        # Deliveries never started (on failure) still hold their bytes
+        while not jobs.empty():
+            job = jobs.get_nowait()
+            if job is not None:
+                job[0].close()
+                budget.release(job[1])
+
+    # Stamped from the overlays already drawn, in lease order, for exactly
+    # the notices that rendered
+    parts = []
+    try:
+        if rendered:
+            parts = await generateN1notice.create_summary(
+                [rendered[idx] for idx in sorted(rendered)], buildingname, datelabel, size_limit
+            )
+    except Exception as e:
+        logging.error(f"[{buildingid}] Failed N1 summary for building: {e}")
+    finally:
+        rendered.clear()
+    # Held until uploaded; taken after this building's rendering is done,
+    # so it can only hold back other buildings, not itself
+    held = sum(map(len, parts))
+    budget.take(held)
 
-        for idx, (fname, bytes_data) in enumerate(summary_parts, 1):
-            for attempt in range(1, 3):
-                ok_summary = await uploadsummarytotask(
-                    headers, fname, bytes_data, taskid, session, categoryid
-                )
-                if ok_summary:
-                    logging.info(
-                        f"[{buildingid}] Uploaded summary part {idx}/{total_parts}: {fname} (attempt {attempt})"
-                    )
-                    break
-                if attempt < 2:
-                    logging.warning(
-                        f"[{buildingid}] Upload failed for part {idx}/{total_parts}: {fname}; retrying..."
-                    )
-                    await asyncio.sleep(1)
+    try:
+        # Upload building summary (if any non-ignored leases and not ignoring building)
+        if parts:
+            for part_index, part_bytes in enumerate(parts, 1):
+                if len(parts) > 1:
+                    part_filename = f"Part {part_index}.pdf"
+                else:
+                    part_filename = f"Notices for {buildingname} {datelabel}.pdf"
+                # Buildings run concurrently and part names repeat across them
+                part_path = os.path.join("/tmp", f"{buildingid} {part_filename}")
+                async with aiofiles.open(part_path, "wb") as f:
+                    await f.write(part_bytes)
+                if await aiofiles.os.path.exists(part_path):
+                    summary_parts.append((part_filename, part_bytes))
                 else:
                     logging.error(
-                        f"[{buildingid}] Summary upload failed for part {idx}/{total_parts}: {fname}"
+                        f"Failed to verify summary file {part_filename} at {part_path}"
                     )
-    else:
-        if data.get("ignorebuilding") == "Y":
-            logging.info(
-                f"Skipping PDF summary & task for building {buildingid} (ignorebuilding=Y)"
-            )
-        elif not summary_data:
+
+            total_parts = len(summary_parts)
             logging.info(
-                f"No non-ignored leases for building {buildingid}; no summary uploaded."
+                f"[{buildingid}] Prepared {total_parts} summary part(s) for upload"
             )
 
+            for idx, (fname, bytes_data) in enumerate(summary_parts, 1):
+                for attempt in range(1, 3):
+                    ok_summary = await uploadsummarytotask(
+                        headers, fname, bytes_data, taskid, session, categoryid
+                    )
+                    if ok_summary:
+                        logging.info(
+                            f"[{buildingid}] Uploaded summary part {idx}/{total_parts}: {fname} (attempt {attempt})"
+                        )
+                        break
+                    if attempt < 2:
+                        logging.warning(
+                            f"[{buildingid}] Upload failed for part {idx}/{total_parts}: {fname}; retrying..."
+                        )
+                        await asyncio.sleep(1)
+                    else:
+                        logging.error(
+                            f"[{buildingid}] Summary upload failed for part {idx}/{total_parts}: {fname}"
+                        )
+        else:
+            if data.get("ignorebuilding") == "Y":
+                logging.info(
+                    f"Skipping PDF summary & task for building {buildingid} (ignorebuilding=Y)"
+                )
+            elif not countbuilding:
+                logging.info(
+                    f"No non-ignored leases for building {buildingid}; no summary uploaded."
+                )
+    finally:
+        budget.release(held)
+
 # -------------------- main entry --------------------
+# Buildings processed at once
+BUILDING_CONCURRENCY = int(os.getenv("BUILDING_CONCURRENCY", "4"))
+
 async def process(session, headers, increaseinfo, accountid):
     """Main orchestration: generate N1s, roll summaries, upload to leases & tasks."""
     counter = {"countall": 0}
@@ -830,28 +706,50 @@ async def process(session, headers, increaseinfo, accountid):
             if datelabel:
                 break
 
-        # Process buildings sequentially to avoid overwhelming the
-        # Buildium API with task creation bursts.  The per-request
-        # rate limiters still apply, but spacing out buildings helps
-        # keep task creation smooth.
-        for buildingdata in increaseinfo:
-            for buildingid, data in buildingdata.items():
-                if not data.get("lease_info"):
-                    continue
-
-                await process_building(
-                    buildingid,
-                    data,
-                    headers,
-                    session,
-                    datelabel,
-                    categoryid,
-                    counter,
-                    count_lock,
-                )
+        # Resolve every building's rental up front in bulk; createtask then
+        # reads it from the reference cache
+        await reference_data.get_rentals(session, headers, [
+            buildingid
+            for buildingdata in increaseinfo
+            for buildingid, data in buildingdata.items()
+            if data.get("lease_info")
+        ])
+
+        # Largest buildings first so the long tail finishes early; task
+        # creation and uploads are paced by the rate limiter
+        buildings = sorted(
+            (
+                (buildingid, data)
+                for buildingdata in increaseinfo
+                for buildingid, data in buildingdata.items()
+                if data.get("lease_info")
+            ),
+            key=lambda item: len(item[1]["lease_info"]),
+            reverse=True,
+        )
+        queue = iter(buildings)  # shared by the workers
+        budget = N1Budget(N1_MEMORY_BUDGET)
+
+        async def worker():
+            for buildingid, data in queue:
+                try:
+                    await process_building(
+                        buildingid,
+                        data,
+                        headers,
+                        session,
+                        datelabel,
+                        categoryid,
+                        counter,
+                        count_lock,
+                        budget,
+                    )
+                except Exception as e:
+                    logging.error(f"Error processing building {buildingid}: {e}")
 
-                # Small pause between buildings to further throttle task creation
-                await asyncio.sleep(2)
+        await asyncio.gather(
+            *(worker() for _ in range(max(1, min(BUILDING_CONCURRENCY, len(buildings)))))
+        )
     except Exception as e:
         logging.error(f"Error processing leases data: {e}")
 
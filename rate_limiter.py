@@ -1,18 +1,271 @@
-"""Global controls for Buildium API rate limiting.
+"""Per-account controls for Buildium API rate limiting.
 
-The defaults can be overridden with the environment variables
-``BUILDIUM_MAX_CONCURRENT_REQUESTS`` (concurrency) and
-``BUILDIUM_REQS_PER_SEC`` (token bucket rate).
+Traffic is keyed by Buildium account so that one large portfolio cannot
+starve other accounts handled by the same instance. Every account gets its
+own concurrency slots and an adaptive token bucket that follows AIMD rules:
+the rate is cut multiplicatively when Buildium answers 429 and grown back
+additively after a run of successful responses. A process-wide ceiling
+still caps the total concurrency and request rate of the instance.
+
+Requests go through ``async with limit():``, which holds one concurrency
+slot and takes one rate token for a single request; the account is resolved
+from :data:`current_account`, which ``task_processor.process_task`` sets for
+the lifetime of a task.
+
+The defaults can be overridden with these environment variables:
+
+``BUILDIUM_MAX_CONCURRENT_REQUESTS``
+    concurrency per account (default 9)
+``BUILDIUM_REQS_PER_SEC``
+    starting and maximum token rate per account (default 9)
+``BUILDIUM_MIN_REQS_PER_SEC``
+    lowest rate AIMD may shrink an account to (default 1)
+``BUILDIUM_GLOBAL_MAX_CONCURRENT_REQUESTS``
+    concurrency across all accounts (default 50)
+``BUILDIUM_GLOBAL_REQS_PER_SEC``
+    token rate across all accounts (default 100)
+``BUILDIUM_AIMD_DECREASE``
+    factor applied to the rate on a 429 (default 0.5)
+``BUILDIUM_AIMD_INCREASE``
+    least requests/sec added after a successful window (default 0.5)
+``BUILDIUM_AIMD_INCREASE_FRACTION``
+    share of the account's maximum rate added after a successful window,
+    when larger than ``BUILDIUM_AIMD_INCREASE`` (default 0.1)
+``BUILDIUM_AIMD_SUCCESS_WINDOW``
+    consecutive 2xx responses that complete a successful window (default 20)
+``BUILDIUM_AIMD_RECOVERY_INTERVAL``
+    seconds without a 429 that also complete a window, so a slow account
+    does not wait for 20 responses per step (default 1)
+``BUILDIUM_LIMITER_DEBUG``
+    set to ``1`` to raise when a task asks for a concurrency slot while it
+    already holds one (default off)
+
+A slot must only be held for the duration of a single request. Waiting for
+a second slot while holding the first caps real concurrency and, once every
+slot is held by such a task, deadlocks; debug mode turns that into an
+immediate ``RuntimeError`` at the offending call site. Tasks started while a
+slot is held inherit the flag, so they are reported too.
 """
 
 import asyncio
+import contextvars
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
 from aiolimiter import AsyncLimiter
 
 MAX_CONCURRENT_REQUESTS = int(os.getenv("BUILDIUM_MAX_CONCURRENT_REQUESTS", "9"))
 TOKENS_PER_SECOND = float(os.getenv("BUILDIUM_REQS_PER_SEC", "9"))
+MIN_TOKENS_PER_SECOND = float(os.getenv("BUILDIUM_MIN_REQS_PER_SEC", "1"))
+GLOBAL_MAX_CONCURRENT_REQUESTS = int(os.getenv("BUILDIUM_GLOBAL_MAX_CONCURRENT_REQUESTS", "50"))
+GLOBAL_TOKENS_PER_SECOND = float(os.getenv("BUILDIUM_GLOBAL_REQS_PER_SEC", "100"))
+AIMD_DECREASE = float(os.getenv("BUILDIUM_AIMD_DECREASE", "0.5"))
+AIMD_INCREASE = float(os.getenv("BUILDIUM_AIMD_INCREASE", "0.5"))
+AIMD_INCREASE_FRACTION = float(os.getenv("BUILDIUM_AIMD_INCREASE_FRACTION", "0.1"))
+AIMD_SUCCESS_WINDOW = int(os.getenv("BUILDIUM_AIMD_SUCCESS_WINDOW", "20"))
+AIMD_RECOVERY_INTERVAL = float(os.getenv("BUILDIUM_AIMD_RECOVERY_INTERVAL", "1"))
+LIMITER_DEBUG = os.getenv("BUILDIUM_LIMITER_DEBUG", "").strip().lower() in ("1", "true", "yes")
+
+# Account whose traffic is currently being issued. Child tasks created with
+# asyncio.gather/create_task inherit it automatically.
+current_account: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "buildium_account", default=None
+)
+
+# Whether the current task holds a concurrency slot (tracked in debug mode).
+_holding_slot: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "buildium_holding_slot", default=False
+)
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate adapts to 429 feedback (AIMD)."""
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, clock=time.monotonic) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._clock = clock
+        self._tokens = max(1.0, rate)
+        self._updated = clock()
+        self._successes = 0
+        self._last_decrease = float("-inf")
+        self._last_change = self._updated
+        self._lock = asyncio.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate)
+
+    @property
+    def step(self) -> float:
+        """Requests/sec added per successful window."""
+        return max(AIMD_INCREASE, self.max_rate * AIMD_INCREASE_FRACTION)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it (FIFO order)."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_throttled(self, issued_at: Optional[float] = None) -> None:
+        """Multiplicative decrease after a 429.
+
+        Requests already in flight when the limit was hit tend to 429 in a
+        burst; a 429 for a request issued before the last cut (``issued_at``,
+        on the bucket's clock) was sent at the old rate and is not cut for
+        again. Without ``issued_at`` only one cut per refill interval applies.
+        """
+        now = self._clock()
+        self._successes = 0
+        if issued_at is not None:
+            if issued_at <= self._last_decrease:
+                return
+        elif now - self._last_decrease < 1.0 / self.rate:
+            return
+        self._last_decrease = now
+        self._last_change = now
+        self.rate = max(self.min_rate, self.rate * AIMD_DECREASE)
+        self._tokens = min(self._tokens, 0.0)
+        logging.info(f"Rate limited by Buildium; reducing rate to {self.rate:.2f} req/s")
+
+    def on_success(self) -> None:
+        """Additive increase after a window of successful responses.
+
+        A window is ``AIMD_SUCCESS_WINDOW`` responses or
+        ``AIMD_RECOVERY_INTERVAL`` seconds since the last change, whichever
+        comes first, and grows the rate by :attr:`step`.
+        """
+        if self.rate >= self.max_rate:
+            return
+        self._successes += 1
+        now = self._clock()
+        if self._successes >= AIMD_SUCCESS_WINDOW or now - self._last_change >= AIMD_RECOVERY_INTERVAL:
+            self._successes = 0
+            self._last_change = now
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+
+class AccountLimiter:
+    """Concurrency slots and adaptive token bucket for a single account."""
+
+    def __init__(self, account_id: str) -> None:
+        self.account_id = account_id
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.bucket = AdaptiveTokenBucket(
+            TOKENS_PER_SECOND,
+            min_rate=min(MIN_TOKENS_PER_SECOND, TOKENS_PER_SECOND),
+            max_rate=TOKENS_PER_SECOND,
+        )
+        self.throttled = 0
+
+
+class RateController:
+    """Registry of per-account limiters behind a process-wide ceiling."""
+
+    def __init__(self) -> None:
+        self._accounts: Dict[str, AccountLimiter] = {}
+        self.global_semaphore = asyncio.Semaphore(GLOBAL_MAX_CONCURRENT_REQUESTS)
+        self.global_throttle = AsyncLimiter(GLOBAL_TOKENS_PER_SECOND, time_period=1)
+
+    def for_account(self, account_id: Optional[str] = None) -> AccountLimiter:
+        """Return the limiter for *account_id* (default: the current account)."""
+        if account_id is None:
+            account_id = current_account.get()
+        key = str(account_id) if account_id is not None else "shared"
+        limiter = self._accounts.get(key)
+        if limiter is None:
+            limiter = AccountLimiter(key)
+            self._accounts[key] = limiter
+        return limiter
+
+    async def acquire_slot(self, account_id: Optional[str] = None) -> None:
+        if LIMITER_DEBUG:
+            if _holding_slot.get():
+                raise RuntimeError(
+                    "Re-entrant Buildium slot acquisition: this task already holds a "
+                    "concurrency slot; finish that request before issuing another"
+                )
+        await self.global_semaphore.acquire()
+        try:
+            await self.for_account(account_id).semaphore.acquire()
+        except BaseException:
+            self.global_semaphore.release()
+            raise
+        if LIMITER_DEBUG:
+            _holding_slot.set(True)
+
+    def release_slot(self, account_id: Optional[str] = None) -> None:
+        self.for_account(account_id).semaphore.release()
+        self.global_semaphore.release()
+        if LIMITER_DEBUG:
+            _holding_slot.set(False)
+
+    async def acquire_token(self, account_id: Optional[str] = None) -> None:
+        await self.for_account(account_id).bucket.acquire()
+        await self.global_throttle.acquire()
+
+    def record_response(
+        self, status: Optional[int], account_id: Optional[str] = None, issued_at: Optional[float] = None
+    ) -> None:
+        """Feed an HTTP status back into the account's AIMD controller.
+
+        ``issued_at`` is the ``time.monotonic()`` at which the request was sent.
+        """
+        if status is None:
+            return
+        limiter = self.for_account(account_id)
+        if status == 429:
+            limiter.throttled += 1
+            limiter.bucket.on_throttled(issued_at)
+        elif 200 <= status < 300 or status == 304:
+            limiter.bucket.on_success()
+
+    def snapshot(self) -> dict:
+        """Current rate and 429 count per account, for logging and metrics."""
+        return {
+            key: {"rate": round(l.bucket.rate, 2), "throttled": l.throttled}
+            for key, l in self._accounts.items()
+        }
+
+
+controller = RateController()
+
+
+def set_account(account_id) -> contextvars.Token:
+    """Route subsequent requests in this context through *account_id*'s limiter."""
+    return current_account.set(str(account_id) if account_id is not None else None)
+
+
+def reset_account(token: contextvars.Token) -> None:
+    current_account.reset(token)
+
 
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-throttle = AsyncLimiter(TOKENS_PER_SECOND, time_period=1)
+def record_response(
+    status: Optional[int], account_id: Optional[str] = None, issued_at: Optional[float] = None
+) -> None:
+    """Report a response status for AIMD adaptation of the current account."""
+    controller.record_response(status, account_id, issued_at)
 
 
+@asynccontextmanager
+async def limit(account_id: Optional[str] = None):
+    """Hold a concurrency slot and a rate token for a single request."""
+    await controller.acquire_slot(account_id)
+    try:
+        await controller.acquire_token(account_id)
+        yield
+    finally:
+        controller.release_slot(account_id)
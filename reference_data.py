@@ -0,0 +1,111 @@
+"""Cached lookups of Buildium reference data.
+
+Rentals, units, building notes and category ids change rarely compared to
+how often a run asks for them, so they are served from :mod:`cache` and only
+fetched from Buildium when missing or expired. Keys are scoped to the
+Buildium account so that instances serving several accounts never mix data.
+Failed lookups are not cached.
+"""
+
+import asyncio
+import logging
+import os
+
+import cache
+from buildium_client import BuildiumClient
+
+
+async def _fetch(call):
+    response = await call
+    return response.data()
+
+
+async def get_rental(session, headers, property_id):
+    """Return the rental (building) record, or ``None`` if it cannot be fetched."""
+    client = BuildiumClient(session, headers)
+    return await cache.get_cache("rentals").get_or_load(
+        cache.account_key(headers, property_id),
+        lambda: _fetch(client.get_rental(property_id)),
+    )
+
+
+# Property ids per /rentals list request when resolving many rentals at once
+RENTAL_BATCH_SIZE = int(os.getenv("RENTAL_BATCH_SIZE", "100"))
+
+
+async def get_rentals(session, headers, property_ids) -> dict:
+    """Return ``{property_id: rental or None}`` for many buildings at once.
+
+    Cached rentals cost nothing; the misses are fetched through the
+    ``/rentals`` list endpoint in batches of ``RENTAL_BATCH_SIZE`` ids, and
+    any the list does not return are fetched one by one.
+    """
+    client = BuildiumClient(session, headers)
+    ids = {cache.account_key(headers, property_id): property_id for property_id in property_ids}
+
+    async def load(keys):
+        wanted = [ids[key] for key in keys]
+        batches = [wanted[i:i + RENTAL_BATCH_SIZE] for i in range(0, len(wanted), RENTAL_BATCH_SIZE)]
+        pages = await asyncio.gather(*(client.list_rentals(batch) for batch in batches))
+        # ids may arrive as strings (JSON object keys)
+        by_id = {str(rental.get('Id')): rental for page in pages for rental in page}
+        leftover = [key for key in keys if str(ids[key]) not in by_id]
+        singles = await asyncio.gather(*(_fetch(client.get_rental(ids[key])) for key in leftover))
+        loaded = {key: by_id.get(str(ids[key])) for key in keys}
+        loaded.update(zip(leftover, singles))
+        return loaded
+
+    rentals = await cache.get_cache("rentals").get_many_or_load(ids, load)
+    return {ids[key]: rental for key, rental in rentals.items()}
+
+
+async def get_rental_notes(session, headers, property_id):
+    """Return the notes of a building (used for AGI detection)."""
+    client = BuildiumClient(session, headers)
+    return await cache.get_cache("building_notes").get_or_load(
+        cache.account_key(headers, property_id),
+        lambda: _fetch(client.get_rental_notes(property_id)),
+    )
+
+
+async def get_unit(session, headers, unit_id):
+    """Return the rental unit record, or ``None`` if it cannot be fetched."""
+    client = BuildiumClient(session, headers)
+    return await cache.get_cache("units").get_or_load(
+        cache.account_key(headers, unit_id),
+        lambda: _fetch(client.get_unit(unit_id)),
+    )
+
+
+async def _find_or_create_category(list_call, create_call, name: str, kind: str):
+    categories = (await list_call()).data()
+    if categories is None:
+        logging.error(f"Failed to fetch {kind} categories")
+        return None
+    for cat in categories:
+        if cat.get('Name') == name:
+            return cat.get('Id')
+
+    response = await create_call(name)
+    if response.status != 201:
+        logging.error(f"Failed creating {kind} category '{name}': {response.status} {response.body}")
+        return None
+    return (response.data() or {}).get('Id')
+
+
+async def file_category_id(session, headers, name: str):
+    """Return the id of the Files category *name*, creating it if needed."""
+    client = BuildiumClient(session, headers)
+    return await cache.get_cache("file_categories").get_or_load(
+        cache.account_key(headers, name),
+        lambda: _find_or_create_category(client.list_file_categories, client.create_file_category, name, "file"),
+    )
+
+
+async def task_category_id(session, headers, name: str):
+    """Return the id of the task category *name*, creating it if needed."""
+    client = BuildiumClient(session, headers)
+    return await cache.get_cache("task_categories").get_or_load(
+        cache.account_key(headers, name),
+        lambda: _find_or_create_category(client.list_task_categories, client.create_task_category, name, "task"),
+    )
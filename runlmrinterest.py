@@ -1,10 +1,14 @@
 from datetime import date as _date, timedelta, datetime, UTC
+import asyncio
 import logging
+import os
 import aiohttp
 from collections import defaultdict
 from session_manager import session_manager
 
-from rate_limiter import semaphore, throttle
+from buildium_client import BuildiumClient
+import money
+import reference_data
 
 # ---------------- dates ----------------
 async def getdates():
@@ -25,90 +29,68 @@ async def getdates():
 
 # ---------------- leases ----------------
 async def get_leases(session: aiohttp.ClientSession, headers: dict):
-    """Fetch active Fixed / FixedWithRollover leases with offset pagination."""
-    url = "https://api.buildium.com/v1/leases"
-    all_leases = []
-    offset = 0
-    limit = 1000
-
-    while True:
-        params = {
-            "leasestatuses": "Active",
-            "leasetypes": "Fixed,FixedWithRollover",
-            "limit": limit,
-            "offset": offset,
-        }
-        async with semaphore, throttle:
-            async with session.get(url, headers=headers, params=params) as resp:
-                if resp.status != 200:
-                    txt = await resp.text()
-                    logging.error(f"get_leases failed: {resp.status} {txt}")
-                    break
-                batch = await resp.json()
-        if not batch:
-            break
-        all_leases.extend(batch)
-        offset += limit
-
+    """Fetch active Fixed / FixedWithRollover leases; later pages are fetched concurrently."""
+    params = {
+        "leasestatuses": "Active",
+        "leasetypes": "Fixed,FixedWithRollover",
+    }
+    all_leases = await BuildiumClient(session, headers).get_all_leases(params)
     logging.info(f"Fetched {len(all_leases)} leases")
     return all_leases
 
 # ---------------- LMR balance per lease ----------------
+LMRGLID = 191645
+INTEREST_APPLIED_MEMO = "Last Month's Rent Interest Applied to Balances"
+# Leases whose transactions are fetched at once, and pages requested ahead
+# per lease; the rate limiter keeps the total within the account's budget.
+LMR_WORKERS = int(os.getenv("LMR_FETCH_WORKERS", "16"))
+LMR_PAGES_AHEAD = int(os.getenv("LMR_FETCH_PAGES_AHEAD", "2"))
+
+def lmr_cents(transactions: list) -> int:
+    """LMR balance contributed by a page of transactions, in cents."""
+    balance = 0
+    for tx in transactions:
+        ttype = tx.get("TransactionType")
+        journal = tx.get("Journal") or {}
+        memo = (journal.get("Memo") or "").strip()
+        for line in (journal.get("Lines") or []):
+            gl_id = ((line.get("GLAccount") or {}).get("Id"))
+            amount = money.to_cents(line.get("Amount"))
+
+            if gl_id == LMRGLID:
+                if ttype in ("Payment", "Credit"):
+                    balance -= amount
+            elif ttype == "Applied Deposit":
+                # exclude the periodic interest application line itself
+                if memo != INTEREST_APPLIED_MEMO:
+                    balance += amount
+    return balance
+
+async def lease_lmrbalance(client: BuildiumClient, lease: dict) -> dict:
+    """Current LMR balance of one lease, reduced page by page as transactions arrive."""
+    leaseid = lease["Id"]
+    logging.info(f"Grabbing all transactions for {leaseid}")
+    balance = 0
+    async for _, page in client.iter_lease_transactions(leaseid, max_pending=LMR_PAGES_AHEAD):
+        balance += lmr_cents(page)
+    return {"leaseid": leaseid, "lmrbalance": money.from_cents(balance), "propertyid": lease["PropertyId"]}
+
 async def lmrbalance(headers: dict, leases: list, session: aiohttp.ClientSession):
     """
     For each lease, sum LMR-related transactions to compute current LMR balance.
+
+    ``LMR_WORKERS`` leases are fetched concurrently; results keep the order
+    of *leases*.
     """
-    LMRGLID = 191645
-    results = []
-
-    for lease in leases:
-        leaseid = lease["Id"]
-        propertyid = lease["PropertyId"]
-        logging.info(f"Grabbing all transactions for {leaseid}")
-
-        # fetch transactions with pagination (if supported)
-        url = f"https://api.buildium.com/v1/leases/{leaseid}/transactions"
-        offset = 0
-        limit = 1000
-        all_tx = []
-
-        while True:
-            params = {"limit": limit, "offset": offset}
-            async with semaphore, throttle:
-                async with session.get(url, headers=headers, params=params) as resp:
-                    if resp.status != 200:
-                        logging.error(f"Tx fetch {leaseid} failed: {resp.status} {await resp.text()}")
-                        break
-                    batch = await resp.json()
-            if not batch:
-                break
-            all_tx.extend(batch)
-            offset += limit
-
-        payment_amount = 0.0
-        credit_amount = 0.0
-        applied_deposit_amount = 0.0
-
-        for tx in all_tx:
-            ttype = tx.get("TransactionType")
-            journal = tx.get("Journal") or {}
-            memo = (journal.get("Memo") or "").strip()
-            for line in (journal.get("Lines") or []):
-                gl_id = ((line.get("GLAccount") or {}).get("Id"))
-                amount = float(line.get("Amount") or 0.0)
-
-                if gl_id == LMRGLID:
-                    if ttype == "Payment":
-                        payment_amount -= amount
-                    elif ttype == "Credit":
-                        credit_amount -= amount
-                elif ttype == "Applied Deposit":
-                    # exclude the periodic interest application line itself
-                    if memo != "Last Month's Rent Interest Applied to Balances":
-                        applied_deposit_amount += amount
-
-        current_lmr = round(payment_amount + credit_amount + applied_deposit_amount, 2)
-        results.append({"leaseid": leaseid, "lmrbalance": current_lmr, "propertyid": propertyid})
+    client = BuildiumClient(session, headers)
+    results = [None] * len(leases)
+    queue = iter(enumerate(leases))  # shared by the workers
+
+    async def worker():
+        for i, lease in queue:
+            results[i] = await lease_lmrbalance(client, lease)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(LMR_WORKERS, len(leases))))))
     logging.info("Retrieved LMR Balances")
 
     return results
@@ -119,21 +101,18 @@ async def calculate(lmr_rows: list, percentage: float, date_1: _date, date_2: _d
     lmr_rows: list of {leaseid, lmrbalance, propertyid}
     returns: list of {leaseid, interest, propertyid}
     """
-    interestrate = float(percentage) / 100.0
-    daily_interest = interestrate / float(days_in_year)
-
     numberofdays = (date_2 - date_1).days + 1
     out = []
 
     for row in lmr_rows:
-        lmr = float(row.get("lmrbalance") or 0.0)
+        lmr = money.to_cents(row.get("lmrbalance"))
         if lmr <= 0:
             continue
-        interest_total = round(lmr * daily_interest * numberofdays, 2)
+        interest_total = money.interest(lmr, percentage, numberofdays, days_in_year)
         if interest_total > 0:
             out.append({
                 "leaseid": row["leaseid"],
-                "interest": interest_total,           # <-- use key 'interest'
+                "interest": money.from_cents(interest_total),  # <-- use key 'interest'
                 "propertyid": row["propertyid"],
             })
     logging.info("Calculated LMR Interest for all leases")
@@ -145,23 +124,21 @@ async def reportbuildingtotals(session: aiohttp.ClientSession, interest_and_ids:
     Return dict { property_name: total_interest }.
     """
     logging.info("Running Building LMR Interest Breakdown")
-    totals_by_property_id = defaultdict(float)
+    totals_by_property_id = defaultdict(int)  # cents
     for row in interest_and_ids:
-        totals_by_property_id[row["propertyid"]] += float(row["interest"])
+        totals_by_property_id[row["propertyid"]] += money.to_cents(row["interest"])
 
-    # resolve names
+    # resolve names in bulk (cached rentals need no request)
+    rentals = await reference_data.get_rentals(session, headers, totals_by_property_id)
     result = {}
     for prop_id, total in totals_by_property_id.items():
-        url = f"https://api.buildium.com/v1/rentals/{prop_id}"
-        async with semaphore, throttle:
-            async with session.get(url, headers=headers) as resp:
-                if resp.status != 200:
-                    logging.error(f"rental GET {prop_id} failed: {resp.status} {await resp.text()}")
-                    name = f"Property {prop_id}"
-                else:
-                    data = await resp.json()
-                    name = data.get("Name") or f"Property {prop_id}"
-        result[name] = round(total, 2)
+        rental = rentals.get(prop_id)
+        if rental is None:
+            logging.error(f"rental GET {prop_id} failed")
+            name = f"Property {prop_id}"
+        else:
+            name = rental.get("Name") or f"Property {prop_id}"
+        result[name] = money.from_cents(total)
     logging.info("Completed Building LMR Interest Breakdown")
     return result
 
@@ -169,7 +146,6 @@ async def reportbuildingtotals(session: aiohttp.ClientSession, interest_and_ids:
 async def _put_task_message(session, task_id: int, headers: dict,
                             title: str, assigned_to_user_id: int, taskcatid: int, msg: str) -> bool:
     logging.info("Updating Task")
-    url_task = f"https://api.buildium.com/v1/tasks/todorequests/{task_id}"
     payload = {
         "Title": title,
         "AssignedToUserId": assigned_to_user_id,
@@ -180,12 +156,11 @@ async def _put_task_message(session, task_id: int, headers: dict,
         "Message": msg,
         "Date": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
     }
-    async with semaphore, throttle:
-        async with session.put(url_task, json=payload, headers=headers) as r:
-            if r.status == 200:
-                return True
-            logging.error(f"Task PUT failed: {r.status} {await r.text()}")
-            return False
+    r = await BuildiumClient(session, headers).update_todo_request(task_id, payload)
+    if r.status == 200:
+        return True
+    logging.error(f"Task PUT failed: {r.status} {r.body}")
+    return False
 
 async def updatetask(task_data, headers, session, lmr_report_data: dict, month_label: str):
     try:
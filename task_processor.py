@@ -16,6 +16,9 @@ import build_increase_json
 import decodefile
 import processincreaseinfo
 import runlmrinterest
+import rate_limiter
+import http_cache
+import cache
 from session_manager import session_manager
 
 
@@ -70,6 +73,8 @@ async def process_task(task_id, task_type, account_id, event_name, account_info)
 
     logging.info(f"Retrieved headers for Task: {task_id}")
 
+    # Route every Buildium request made for this task through the account's limiter
+    account_token = rate_limiter.set_account(account_id)
     session = await session_manager.get_session(account_id)
     try:
         # Retrieve task data from get_tasks.py
@@ -108,6 +113,8 @@ async def process_task(task_id, task_type, account_id, event_name, account_info)
                 await process_generate_notices(session, task_data, headers, guideline_percentage, client_secret, account_id)
     finally:
         await session_manager.release_session(account_id)
+        rate_limiter.reset_account(account_token)
+        logging.info(f"Buildium response cache: {http_cache.stats()}; reference cache: {cache.stats()}")
 
 async def process_increase_notices(session, task_data, headers, guideline_percentage, client_secret, account_id):
     """Handle Increase Notices task."""
@@ -2,17 +2,17 @@ import asyncio
 import aiohttp
 import os
 import signal
-from io import BytesIO
 import logging
 import json
 from datetime import datetime, UTC
-from tempfile import NamedTemporaryFile
 from typing import Optional
 from pathlib import Path
 
-from rate_limiter import semaphore, throttle
+from buildium_client import BuildiumClient
 
-from build_prelim_increase_report import build_increase_report_pdf
+from build_prelim_increase_report import build_increase_report_parts, prefetch_logo
+import reference_data
+import workers
 
 # -----------------------------------------------------------------------------
 # Logging (won't override if you've already configured handlers elsewhere)
@@ -40,15 +40,10 @@ except Exception:
 
 
 # -----------------------------------------------------------------------------
-# API bases
-#   - To-Do Requests live under /v1/tasks/todorequests
-#   - Task history & file uploads live under /v1/tasks
-#     (per Buildium OpenAPI; upload presign is:
-#      POST /v1/tasks/{taskId}/history/{taskHistoryId}/files/uploadrequests)
+# Session timeout (requests themselves go through BuildiumClient, which sets
+# per-endpoint timeouts; To-Do Requests live under /v1/tasks/todorequests,
+# task history and file uploads under /v1/tasks)
 # -----------------------------------------------------------------------------
-BASE_API = "https://api.buildium.com/v1"
-TODO_RESOURCE = "tasks/todorequests"
-TASKS_RESOURCE = "tasks"
 HTTP_TIMEOUT = aiohttp.ClientTimeout(
     total=120,        # whole request
     connect=15,       # DNS + TCP connect
@@ -56,20 +51,35 @@ HTTP_TIMEOUT = aiohttp.ClientTimeout(
     sock_read=90,     # server processing / body read
 )
 
+# Seconds the review report build may run before it is stopped.
+REPORT_BUILD_TIMEOUT = float(os.getenv("REPORT_BUILD_TIMEOUT", "600"))
+
 
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
-def _flatten_rows_from_summary(increase_summary: dict) -> list[dict]:
+def _flatten_rows_from_summary(increase_summary: dict, names: Optional[dict] = None) -> list[dict]:
     rows = []
     for b_id, data in (increase_summary or {}).items():
         for inc in data.get("increases", []):
             if not inc.get("buildingname"):
-                inc["buildingname"] = f"Building {b_id}"
+                inc["buildingname"] = (names or {}).get(b_id) or f"Building {b_id}"
             rows.append(inc)
     return rows
 
 
+async def _missing_building_names(session, headers, increase_summary: dict) -> dict:
+    """Rental names for buildings whose rows carry no building name."""
+    unnamed = [
+        b_id for b_id, data in (increase_summary or {}).items()
+        if any(not inc.get("buildingname") for inc in data.get("increases", []))
+    ]
+    if not unnamed:
+        return {}
+    rentals = await reference_data.get_rentals(session, headers, unnamed)
+    return {b_id: rental.get("Name") for b_id, rental in rentals.items() if rental}
+
+
 def _parse_iso(dt_str: Optional[str]) -> datetime:
     if not dt_str:
         return datetime.min.replace(tzinfo=UTC)
@@ -89,7 +99,6 @@ async def _put_task_message(
     msg: str,
 ) -> bool:
     logging.info("Updating task message/title/assignee...")
-    url_task = f"{BASE_API}/{TODO_RESOURCE}/{task_id}"
     payload = {
         "Title": title,
         "AssignedToUserId": assigned_to_user_id,
@@ -100,46 +109,92 @@ async def _put_task_message(
         "Message": msg,
         "Date": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
     }
-    async with semaphore, throttle:
-        async with session.put(url_task, json=payload, headers=headers) as r:
-            body = await r.text()
-            if r.status == 200:
-                logging.info("Task updated (PUT todorequests).")
-                return True
-            logging.error(f"Task PUT failed: {r.status} {body[:500]}")
-            return False
+    r = await BuildiumClient(session, headers).update_todo_request(task_id, payload)
+    if r.status == 200:
+        logging.info("Task updated (PUT todorequests).")
+        return True
+    logging.error(f"Task PUT failed: {r.status} {str(r.body)[:500]}")
+    return False
 
 
 async def _get_latest_history_id(
     session: aiohttp.ClientSession, task_id: int, headers: dict
 ) -> Optional[int]:
     # History is under /v1/tasks
-    url_hist = f"{BASE_API}/{TASKS_RESOURCE}/{task_id}/history"
-    logging.info(f"Fetching latest task history id for task_id={task_id} ({url_hist})")
-    async with semaphore, throttle:
-        async with session.get(url_hist, headers=headers) as r_hist:
-            body = await r_hist.text()
-            if r_hist.status != 200:
-                logging.error(f"History GET failed: {r_hist.status} {body[:500]}")
-                return None
-            try:
-                hist = json.loads(body)
-            except Exception as e:
-                logging.error(f"History JSON parse error: {e} body={body[:500]}")
-                return None
-
-        if not hist:
-            logging.error("History list empty; cannot lock an entry.")
-            return None
+    logging.info(f"Fetching latest task history id for task_id={task_id}")
+    r_hist = await BuildiumClient(session, headers).get_task_history(task_id)
+    hist = r_hist.data()
+    if not isinstance(hist, list):
+        logging.error(f"History GET failed: {r_hist.status} {str(r_hist.body)[:500]}")
+        return None
+
+    if not hist:
+        logging.error("History list empty; cannot lock an entry.")
+        return None
+
+    try:
+        hist.sort(key=lambda h: _parse_iso(h.get("Date") or h.get("CreatedDate")), reverse=True)
+    except Exception:
+        pass
+
+    hid = hist[0].get("Id")
+    logging.info(f"Locked history_id={hid}")
+    return hid
 
-        try:
-            hist.sort(key=lambda h: _parse_iso(h.get("Date") or h.get("CreatedDate")), reverse=True)
-        except Exception:
-            pass
 
-        hid = hist[0].get("Id")
-        logging.info(f"Locked history_id={hid}")
-        return hid
+_FORM_ORDER = [
+    "Key", "ACL", "Policy", "Content-Type", "Content-Disposition",
+    "X-Amz-Algorithm", "X-Amz-Credential", "X-Amz-Date", "X-Amz-Signature",
+    "X-Amz-Meta-Buildium-Entity-Type", "X-Amz-Meta-Buildium-Entity-Id",
+    "X-Amz-Meta-Buildium-File-Source", "X-Amz-Meta-Buildium-File-Description",
+    "X-Amz-Meta-Buildium-Account-Id", "X-Amz-Meta-Buildium-File-Name",
+    "X-Amz-Meta-Buildium-File-Title", "X-Amz-Meta-Buildium-Child-Entity-Id",
+    "X-Amz-Meta-Buildium-Finalize-Upload-Message-Version",
+    "success_action_status", "success_action_redirect",
+]
+
+
+async def _presigned_form(
+    client: BuildiumClient,
+    task_id: int,
+    history_id: int,
+    filename: str,
+    file_bytes: bytes,
+    content_type: str,
+    label: str,
+):
+    """Presign an upload and return ``(bucket_url, form_data, file_name)``, or ``None``."""
+    r_pre = await client.create_task_history_upload_request(task_id, history_id, filename)
+    pre = r_pre.data()
+    if r_pre.status != 201 or not isinstance(pre, dict):
+        logging.error(f"[{label}] FAIL {r_pre.status} {str(r_pre.body)[:500]}")
+        return None
+
+    form = pre.get("FormData") or {}
+    bucket_url = pre.get("BucketUrl")
+    if not bucket_url or not form:
+        logging.error(f"[{label}] Missing BucketUrl or FormData.")
+        return None
+
+    # Normalize + mirror presigned values
+    form = {str(k): ("" if v is None else str(v)) for k, v in form.items()}
+    file_ct   = form.get("Content-Type", content_type)
+    file_name = form.get("X-Amz-Meta-Buildium-File-Name", filename)
+
+    logging.info(f"[{label}] ok Key={form.get('Key')} CT={file_ct} BuildiumName='{file_name}'")
+
+    # Avoid surprising quoting that can break S3 policies
+    form_data = aiohttp.FormData(quote_fields=False)
+    for k in _FORM_ORDER:
+        if k in form:
+            form_data.add_field(k, form[k])
+    for k, v in form.items():
+        if k not in _FORM_ORDER:
+            form_data.add_field(k, v)
+
+    # file LAST; match presigned CT/name if present
+    form_data.add_field("file", file_bytes, filename=file_name, content_type=file_ct)
+    return bucket_url, form_data, file_name
 
 
 async def _upload_file_for_history(
@@ -156,112 +211,41 @@ async def _upload_file_for_history(
     2) POST multipart/form-data to S3 BucketUrl with EXACT fields from FormData, file LAST
     Mirrors presigned Content-Type and X-Amz-Meta-Buildium-File-Name to satisfy S3 policy and Buildium finalize.
     """
+    client = BuildiumClient(session, headers)
     try:
         logging.info(f"[presign] start filename='{filename}', size={len(file_bytes)} bytes")
 
-        url_presign = f"{BASE_API}/{TASKS_RESOURCE}/{task_id}/history/{history_id}/files/uploadrequests"
-        async with semaphore, throttle:
-            async with session.post(url_presign, json={"FileName": filename}, headers=headers) as r_pre:
-                pre_text = await r_pre.text()
-                if r_pre.status != 201:
-                    logging.error(f"[presign] FAIL {r_pre.status} {pre_text[:500]}")
-                    return False
-                try:
-                    pre = json.loads(pre_text)
-                except Exception as e:
-                    logging.error(f"[presign] JSON parse error: {e} body={pre_text[:500]}")
-                    return False
-
-        form = pre.get("FormData") or {}
-        bucket_url = pre.get("BucketUrl")
-        if not bucket_url or not form:
-            logging.error("[presign] Missing BucketUrl or FormData.")
+        presigned = await _presigned_form(client, task_id, history_id, filename, file_bytes, content_type, "presign")
+        if presigned is None:
             return False
-
-        # Normalize + mirror presigned values
-        form = {str(k): ("" if v is None else str(v)) for k, v in form.items()}
-        file_ct   = form.get("Content-Type", content_type)
-        file_name = form.get("X-Amz-Meta-Buildium-File-Name", filename)
-
-        logging.info(f"[presign] ok Key={form.get('Key')} CT={file_ct} BuildiumName='{file_name}'")
-
-        ordered_keys = [
-            "Key", "ACL", "Policy", "Content-Type", "Content-Disposition",
-            "X-Amz-Algorithm", "X-Amz-Credential", "X-Amz-Date", "X-Amz-Signature",
-            "X-Amz-Meta-Buildium-Entity-Type", "X-Amz-Meta-Buildium-Entity-Id",
-            "X-Amz-Meta-Buildium-File-Source", "X-Amz-Meta-Buildium-File-Description",
-            "X-Amz-Meta-Buildium-Account-Id", "X-Amz-Meta-Buildium-File-Name",
-            "X-Amz-Meta-Buildium-File-Title", "X-Amz-Meta-Buildium-Child-Entity-Id",
-            "X-Amz-Meta-Buildium-Finalize-Upload-Message-Version",
-            "success_action_status", "success_action_redirect",
-        ]
-
-        # Avoid surprising quoting that can break S3 policies
-        form_data = aiohttp.FormData(quote_fields=False)
-        for k in ordered_keys:
-            if k in form:
-                form_data.add_field(k, form[k])
-        for k, v in form.items():
-            if k not in ordered_keys:
-                form_data.add_field(k, v)
-
-        # file LAST; match presigned CT/name if present
-        form_data.add_field("file", file_bytes, filename=file_name, content_type=file_ct)
+        bucket_url, form_data, file_name = presigned
 
         logging.info(f"[upload] POST {bucket_url}")
-        async with semaphore, throttle:
-            async with session.post(bucket_url, data=form_data) as resp:
-                body = await resp.text()
-                status = resp.status
+        resp = await client.upload_to_bucket(bucket_url, form_data)
+        body = str(resp.body or "")
 
-        if status in (204, 200, 201):
-            logging.info(f"[upload] OK {status} '{file_name}' body={body[:200]}")
+        if resp.status in (204, 200, 201):
+            logging.info(f"[upload] OK {resp.status} '{file_name}' body={body[:200]}")
             return True
-        if status == 403 and "Invalid according to Policy: Policy expired" in body:
+        if resp.status == 403 and "Invalid according to Policy: Policy expired" in body:
             logging.warning("[upload] Policy expired; refreshing presign and retrying once.")
-            async with semaphore, throttle:
-                async with session.post(url_presign, json={"FileName": filename}, headers=headers) as r_pre2:
-                    pre_text2 = await r_pre2.text()
-                    if r_pre2.status != 201:
-                        logging.error(f"[presign-retry] FAIL {r_pre2.status} {pre_text2[:500]}")
-                        return False
-                    try:
-                        pre2 = json.loads(pre_text2)
-                    except Exception as e:
-                        logging.error(f"[presign-retry] JSON parse error: {e} body={pre_text2[:500]}")
-                        return False
-
-            form2 = pre2.get("FormData") or {}
-            bucket_url2 = pre2.get("BucketUrl")
-            if not bucket_url2 or not form2:
-                logging.error("[presign-retry] Missing BucketUrl or FormData.")
+            presigned = await _presigned_form(
+                client, task_id, history_id, filename, file_bytes, content_type, "presign-retry"
+            )
+            if presigned is None:
                 return False
-
-            form2 = {str(k): ("" if v is None else str(v)) for k, v in form2.items()}
-            file_ct = form2.get("Content-Type", content_type)
-            file_name = form2.get("X-Amz-Meta-Buildium-File-Name", filename)
-
-            form_data2 = aiohttp.FormData(quote_fields=False)
-            for k in ordered_keys:
-                if k in form2:
-                    form_data2.add_field(k, form2[k])
-            for k, v in form2.items():
-                if k not in ordered_keys:
-                    form_data2.add_field(k, v)
-
-            form_data2.add_field("file", file_bytes, filename=file_name, content_type=file_ct)
+            bucket_url2, form_data2, file_name = presigned
 
             logging.info(f"[upload-retry] POST {bucket_url2}")
-            async with semaphore, throttle:
-                async with session.post(bucket_url2, data=form_data2) as resp2:
-                    body2 = await resp2.text()
-                    if resp2.status in (204, 200, 201):
-                        logging.info(f"[upload-retry] OK {resp2.status} '{file_name}' body={body2[:200]}")
-                        return True
-                    logging.error(f"[upload-retry] FAIL {resp2.status} '{file_name}' body={body2[:500]}")
-                    return False
-
-        logging.error(f"[upload] FAIL {status} '{file_name}' body={body[:500]}")
+            resp2 = await client.upload_to_bucket(bucket_url2, form_data2)
+            body2 = str(resp2.body or "")
+            if resp2.status in (204, 200, 201):
+                logging.info(f"[upload-retry] OK {resp2.status} '{file_name}' body={body2[:200]}")
+                return True
+            logging.error(f"[upload-retry] FAIL {resp2.status} '{file_name}' body={body2[:500]}")
+            return False
+
+        logging.error(f"[upload] FAIL {resp.status} '{file_name}' body={body[:500]}")
         return False
 
     except asyncio.CancelledError:
@@ -284,84 +268,24 @@ async def _wait_for_files(
     Optional: poll for attachments to appear on the history entry.
     """
     import time
-    url = f"{BASE_API}/{TASKS_RESOURCE}/{task_id}/history/{history_id}/files"
+    client = BuildiumClient(session, headers)
     deadline = time.monotonic() + timeout_s
     want = set([n.strip() for n in expected_names])
 
     logging.info(f"Polling for files to appear on history {history_id}: {sorted(want)}")
     while time.monotonic() < deadline:
-        async with semaphore, throttle:
-            async with session.get(url, headers=headers) as r:
-                body = await r.text()
-                if r.status == 200:
-                    try:
-                        items = json.loads(body) or []
-                    except Exception:
-                        items = []
-                    names = {(i.get("FileName") or i.get("Title") or "").strip() for i in items}
-                    if want.issubset(names):
-                        logging.info("All attachments visible on history.")
-                        return True
+        r = await client.get_task_history_files(task_id, history_id)
+        items = r.data()
+        if isinstance(items, list):
+            names = {(i.get("FileName") or i.get("Title") or "").strip() for i in items}
+            if want.issubset(names):
+                logging.info("All attachments visible on history.")
+                return True
         await asyncio.sleep(1.5)
     logging.warning("Attachments did not appear within timeout.")
     return False
 
 
-def split_pdf_bytes(pdf_bytes: bytes, max_bytes: int = 15 * 1024 * 1024) -> list[bytes]:
-    """
-    Split a PDF (as bytes) into multiple PDFs, each <= max_bytes, on page boundaries.
-    Returns list[bytes]; each element is a complete PDF file.
-    """
-    try:
-        from pypdf import PdfReader, PdfWriter
-    except Exception:
-        from PyPDF2 import PdfReader, PdfWriter  # type: ignore
-
-    reader = PdfReader(BytesIO(pdf_bytes))
-    n = len(reader.pages)
-    parts: list[bytes] = []
-
-    i = 0
-    while i < n:
-        writer = PdfWriter()
-        # carry metadata if available
-        try:
-            if getattr(reader, "metadata", None):
-                writer.add_metadata(reader.metadata)
-        except Exception:
-            pass
-
-        last_good = None
-        last_end = None
-
-        j = i
-        while j < n:
-            writer.add_page(reader.pages[j])
-            buf = BytesIO()
-            writer.write(buf)
-            size_now = buf.tell()
-            if size_now <= max_bytes:
-                last_good = buf.getvalue()
-                last_end = j + 1
-                j += 1
-            else:
-                break
-
-        if last_good is not None:
-            parts.append(last_good)
-            i = last_end
-        else:
-            # Single page > limit: emit it alone
-            writer = PdfWriter()
-            writer.add_page(reader.pages[i])
-            buf = BytesIO()
-            writer.write(buf)
-            parts.append(buf.getvalue())
-            i += 1
-
-    return parts
-
-
 # -----------------------------------------------------------------------------
 # Shielded post-PUT work (history fetch + uploads)
 # -----------------------------------------------------------------------------
@@ -437,7 +361,8 @@ async def update_task(
         assigned_to_user_id = int(task_data["AssignedToUserId"])
         title = f"Increase Notices for {increase_effective_date.strftime('%B %d, %Y')} - Review"
 
-        rows = _flatten_rows_from_summary(increase_summary)
+        names = await _missing_building_names(session, headers, increase_summary)
+        rows = _flatten_rows_from_summary(increase_summary, names)
         if not rows:
             logging.error("No rows to include in the PDF; aborting.")
             return False
@@ -447,29 +372,19 @@ async def update_task(
         pdf_filename  = f"Increase Review Report {eff_str}.pdf"
         json_filename = "data.json"
 
-        # Build the PDF to a temp file and read bytes
-        with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-            pdf_path = tmp_pdf.name
-
+        # Build the PDF and split it to <=15MB parts in a worker process so
+        # webhooks keep being served; the logo is fetched here (cached per
+        # process) and passed in
+        logo = await prefetch_logo(logo_source)
         try:
-            build_increase_report_pdf(
-                pdf_path,
-                run_date=run_date,
-                effective_date=eff_str,
-                guideline_pct=str(percentage),
-                rows=rows,
-                logo_source=logo_source,
+            parts = await workers.run_isolated(
+                build_increase_report_parts,
+                run_date, eff_str, str(percentage), rows, None, None, logo, 15 * 1024 * 1024,
+                timeout=REPORT_BUILD_TIMEOUT,
             )
-            with open(pdf_path, "rb") as f:
-                pdf_bytes = f.read()
-        finally:
-            try:
-                os.remove(pdf_path)
-            except Exception:
-                pass
-
-        # Split to <=15MB parts
-        parts = split_pdf_bytes(pdf_bytes, max_bytes=15 * 1024 * 1024)
+        except asyncio.TimeoutError:
+            logging.error(f"Review report build exceeded {REPORT_BUILD_TIMEOUT}s; aborting.")
+            return False
 
         # Name parts predictably (foo.pdf -> foo_part01.pdf, etc.; single-part keeps original)
         orig_name = Path(pdf_filename).name
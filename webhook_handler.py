@@ -20,6 +20,9 @@ import asyncio
 import json
 import os
 from session_manager import session_manager
+import cache
+import http_cache
+import workers
 
 app = Quart(__name__)
 
@@ -40,32 +43,31 @@ async def create_clients():
     app.tasks_client = tasks_v2.CloudTasksAsyncClient()
     app.db = FirestoreAsyncClient(project=PROJECT_ID)
 
-_secret_cache = {}
 async def get_secret(secret_name):
-    """Retrieve the secret key from Google Secret Manager."""
-    if secret_name in _secret_cache:
-        return _secret_cache[secret_name]
-    name = f"projects/{PROJECT_ID}/secrets/{secret_name}/versions/latest"
-    response = await app.secret_client.access_secret_version(request={"name": name})
-    secret = response.payload.data.decode("UTF-8")
-    _secret_cache[secret_name] = secret
-    return secret
+    """Retrieve the secret key from Google Secret Manager (cached for a few minutes)."""
+    async def load():
+        name = f"projects/{PROJECT_ID}/secrets/{secret_name}/versions/latest"
+        response = await app.secret_client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+    return await cache.get_cache("secrets").get_or_load(secret_name, load)
 
 
-_account_info_cache = {}
 async def get_account_info(account_id):
     """Retrieve account information from Firestore based on AccountId."""
-    if account_id in _account_info_cache:
-        return _account_info_cache[account_id]
+    return await cache.get_cache("account_info").get_or_load(
+        str(account_id), lambda: _load_account_info(account_id)
+    )
+
+
+async def _load_account_info(account_id):
     try:
         logging.info(f"Fetching account info for Account ID: {account_id}")
         doc_ref = app.db.collection('buildium_accounts').document(str(account_id))
         doc = await doc_ref.get()
         if doc.exists:
             logging.info(f"Account info found for Account ID: {account_id}")
-            data = doc.to_dict()
-            _account_info_cache[account_id] = data
-            return data
+            return doc.to_dict()
         else:
             logging.info(f"No account info found for Account ID: {account_id}")
             return None
@@ -226,6 +228,12 @@ async def index():
     return "Buildium Webhook Handler is running!", 200
 
 
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Cache hit counters for the Buildium response and reference caches."""
+    return jsonify({'http_cache': http_cache.stats(), 'reference_cache': cache.stats()}), 200
+
+
 @app.after_serving
 async def close_clients():
     """Close Google Cloud clients when the app stops."""
@@ -236,8 +244,9 @@ async def close_clients():
 
 @app.after_serving
 async def shutdown_session_manager():
-    """Ensure all aiohttp sessions are closed when the app stops."""
+    """Ensure all aiohttp sessions and PDF workers are closed when the app stops."""
     await session_manager.close_all()
+    workers.shutdown()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
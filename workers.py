@@ -0,0 +1,149 @@
+"""Process pool for CPU-bound PDF work.
+
+ReportLab drawing and PyPDF2 merging hold the GIL, so running them on the
+event loop (or in a thread) stalls uploads and webhooks. :func:`run_in_process`
+hands a picklable, module-level function to a shared ``ProcessPoolExecutor``
+and only awaits the finished result.
+
+``PDF_WORKERS`` sets the pool size (default: the CPUs this process may use,
+going by its affinity and cgroup CPU quota, capped at ``PDF_WORKERS_MAX``);
+``0`` runs jobs in a thread instead, for environments without
+multiprocessing. Workers are started with ``PDF_WORKER_START_METHOD``
+(default ``forkserver``, which is safe with the threads gRPC and asyncio keep
+in this process). The fork server preloads only the PDF modules, so workers
+start warm without importing the web app; for the same reason ``main.py``
+imports the app only under its ``__main__`` guard, since every worker
+re-runs the parent's main module.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+PDF_WORKER_PRELOAD = ["generateN1notice"]
+
+
+def _available_cpus() -> int:
+    """CPUs usable by this process: its affinity, bounded by a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+PDF_WORKERS_MAX = int(os.getenv("PDF_WORKERS_MAX", "8"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(_available_cpus(), PDF_WORKERS_MAX))))
+PDF_WORKER_START_METHOD = os.getenv("PDF_WORKER_START_METHOD", "forkserver")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _mp_context():
+    ctx = multiprocessing.get_context(PDF_WORKER_START_METHOD)
+    if PDF_WORKER_START_METHOD == "forkserver":
+        ctx.set_forkserver_preload(PDF_WORKER_PRELOAD)
+    return ctx
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared pool, creating it on first use (``None`` when disabled)."""
+    global _pool
+    if PDF_WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS,
+            mp_context=_mp_context(),
+        )
+        logging.info(f"Started PDF worker pool with {PDF_WORKERS} processes")
+    return _pool
+
+
+async def run_in_process(fn, *args, timeout: Optional[float] = None):
+    """Run ``fn(*args)`` in the worker pool and return its result.
+
+    A pool broken by a crashed worker is discarded so the next call starts a
+    fresh one; the failing call still raises.
+    """
+    global _pool
+    pool = get_pool()
+    if pool is None:
+        return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout)
+    future = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except BrokenProcessPool:
+        logging.error("PDF worker pool broke; it will be restarted on next use")
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+
+async def run_isolated(fn, *args, timeout: Optional[float] = None):
+    """Run ``fn(*args)`` in a dedicated worker process that can be stopped.
+
+    For long jobs (the review report) that must honour a timeout or the
+    caller's cancellation: a job already running in the shared pool cannot
+    be interrupted, so this one gets its own process, which is terminated if
+    the await is abandoned. With ``PDF_WORKERS=0`` it runs in a thread and is
+    only abandoned, not stopped.
+    """
+    if PDF_WORKERS <= 0:
+        return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout)
+    pool = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=_mp_context(),
+    )
+    future = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        logging.warning(f"Stopping worker process for {getattr(fn, '__name__', fn)}")
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _peak_rss_kb() -> int:
+    # Stay busy briefly so sibling calls land on the other workers
+    time.sleep(0.1)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def peak_rss_kb() -> int:
+    """Largest peak RSS (KiB) among the shared pool's workers; 0 when no pool is running.
+
+    Workers forked by the fork server are not children of this process, so
+    ``RUSAGE_CHILDREN`` does not cover them; each worker is asked instead.
+    """
+    if _pool is None:
+        return 0
+    return max(await asyncio.gather(*(run_in_process(_peak_rss_kb) for _ in range(PDF_WORKERS))))
+
+
+def shutdown(wait: bool = False) -> None:
+    """Stop the worker processes (called on application shutdown).
+
+    With ``wait`` the call blocks until the workers have exited.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None